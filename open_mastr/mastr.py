@@ -1,4 +1,5 @@
 import os
+import threading
 from sqlalchemy import inspect, create_engine
 
 # import xml dependencies
@@ -8,7 +9,11 @@ from open_mastr.xml_download.utils_write_to_database import (
 )
 
 # import soap_API dependencies
+from open_mastr.soap_api.credential_pool import CredentialPool
+from open_mastr.soap_api.download import MaStRAPI
+from open_mastr.soap_api.metrics import JSONSink
 from open_mastr.soap_api.mirror import MaStRMirror
+from open_mastr.soap_api.orchestrate import api_download_orchestrator
 
 from open_mastr.utils.helpers import (
     print_api_settings,
@@ -23,6 +28,8 @@ from open_mastr.utils.helpers import (
     create_db_query,
     db_query_to_csv,
     reverse_fill_basic_units,
+    record_watermarks,
+    get_watermarks,
 )
 from open_mastr.utils.config import (
     create_data_dir,
@@ -112,6 +119,7 @@ class Mastr:
         api_chunksize=1000,
         api_data_types=None,
         api_location_types=None,
+        api_metrics_sinks=None,
         **kwargs,
     ) -> None:
         """
@@ -120,11 +128,15 @@ class Mastr:
 
         Parameters
         ----------
-        method : 'API' or 'bulk', optional
-            Either "API" or "bulk". Determines whether the data is downloaded via the
+        method : 'API', 'bulk' or 'hybrid', optional
+            Either "API", "bulk" or "hybrid". Determines whether the data is downloaded via the
             zipped bulk download or via the MaStR API. The latter requires an account
             from marktstammdatenregister.de,
             (see :ref:`Configuration <Configuration>`). Default to 'bulk'.
+            "hybrid" updates the extended unit tables of a previous bulk download
+            with units changed since then from the API. Technologies without
+            a previous bulk download are downloaded in bulk first, see
+            [`MaStRMirror.sync_extended_unit_data`][open_mastr.soap_api.mirror.MaStRMirror.sync_extended_unit_data].
         data : str or list or None, optional
             Determines which types of data are written to the database. If None, all data is
             used. If it is a list, possible entries are listed below with respect to the download method. Missing categories are
@@ -162,27 +174,22 @@ class Mastr:
             | datetime.datetime(2020, 11, 27)      | -  | Retrieve data that is newer than this time stamp   |
             | None      | set date="today"  | set date="latest"   |
 
-            Default to `None`.
+            Default to `None`. For method "hybrid", `date` is used like for "bulk".
         bulk_cleansing : bool, optional
             If set to True, data cleansing is applied after the download (which is recommended).
             In its original format, many entries in the MaStR are encoded with IDs. Columns like
             `state` or `fueltype` do not contain entries such as "Hessen" or "Braunkohle", but instead
             only contain IDs. Cleansing replaces these IDs with their corresponding original entries.
         api_processes : int or None or "max", optional
-            Number of parallel processes used to download additional data.
-            Defaults to `None`. If set to "max", the maximum number of possible processes
-            is used.
-
-            !!! warning
-
-                The implementation of parallel processes is currently under construction.
-                Please let the argument `api_processes` at the default value `None`.
+            Number of parallel threads used to download additional data.
+            Defaults to `None`. If set to "max", the number of cores is used.
         api_limit : int or None, optional
             Limit the number of units that data is downloaded for. Defaults to `None` which refers
             to query data for existing data requests, for example created by
             [`create_additional_data_requests`][open_mastr.soap_api.mirror.MaStRMirror.create_additional_data_requests]. Note: There is a limited number of
             requests you are allowed to have per day, so setting api_limit to a value is
             recommended.
+            For method "hybrid", it limits the number of changed units per technology.
         api_chunksize : int or None, optional
             Data is downloaded and inserted into the database in chunks of `chunksize`.
             Defaults to 1000.
@@ -193,6 +200,12 @@ class Mastr:
             Select the type of location that should be retrieved. Choose from
             "location_elec_generation", "location_elec_consumption", "location_gas_generation",
             "location_gas_consumption". Defaults to all.
+        api_metrics_sinks : list or None, optional
+            Sinks the metrics of all API requests are written to at the end of the
+            download with method "API" or "hybrid", for example a
+            [`PrometheusTextfileSink`][open_mastr.soap_api.metrics.PrometheusTextfileSink].
+            Defaults to `None` which means a JSON summary is written to
+            `$HOME/.open-MaStR/logs/api_metrics.json`.
         """
 
         if self.is_translated:
@@ -224,7 +237,15 @@ class Mastr:
 
         date = transform_date_parameter(self, method, date, **kwargs)
 
-        if method == "bulk":
+        if method == "hybrid":
+            validate_api_credentials()
+            # Technologies without watermark get a bulk download as baseline
+            watermarks = get_watermarks(self.engine, data)
+            bulk_data = [tech for tech in data if tech not in watermarks]
+        else:
+            bulk_data = data
+
+        if method in ["bulk", "hybrid"] and bulk_data:
             # Find the name of the zipped xml folder
             bulk_download_date = parse_date_string(date)
             xml_folder_path = os.path.join(self.output_dir, "data", "xml_download")
@@ -238,23 +259,24 @@ class Mastr:
             write_mastr_xml_to_database(
                 engine=self.engine,
                 zipped_xml_file_path=zipped_xml_file_path,
-                data=data,
+                data=bulk_data,
                 bulk_cleansing=bulk_cleansing,
                 bulk_download_date=bulk_download_date,
             )
+            record_watermarks(self.engine, bulk_data)
+
+        if method == "hybrid":
+            mastr_mirror = MaStRMirror(
+                engine=self.engine,
+                parallel_processes=api_processes,
+                restore_dump=None,
+            )
+            mastr_mirror.sync_extended_unit_data(data, limit=api_limit or 10**8)
+            self._write_api_metrics(mastr_mirror.mastr_dl._mastr_api, api_metrics_sinks)
 
         if method == "API":
             validate_api_credentials()
 
-            # Set api_processes to None in order to avoid the malfunctioning usage
-            if api_processes:
-                api_processes = None
-                print(
-                    "Warning: The implementation of parallel processes "
-                    "is currently under construction. Please let "
-                    "the argument api_processes at the default value None."
-                )
-
             print_api_settings(
                 harmonisation_log=harm_log,
                 data=data,
@@ -266,31 +288,57 @@ class Mastr:
                 api_location_types=api_location_types,
             )
 
-            mastr_mirror = MaStRMirror(
-                engine=self.engine,
-                parallel_processes=api_processes,
-                restore_dump=None,
-            )
-            # Download basic unit data
-            mastr_mirror.backfill_basic(data, limit=api_limit, date=date)
-
-            # Download additional unit data
-            for tech in data:
-                # mastr_mirror.create_additional_data_requests(data)
-                for data_type in api_data_types:
-                    mastr_mirror.retrieve_additional_data(
-                        tech, data_type, chunksize=api_chunksize, limit=api_limit
-                    )
-
-            # Download basic location data
-            mastr_mirror.backfill_locations_basic(limit=api_limit, date="latest")
-
-            # Download extended location data
-            if api_location_types:
-                for location_type in api_location_types:
-                    mastr_mirror.retrieve_additional_location_data(
-                        location_type, limit=api_limit
+            # All steps share the daily request contingent of all MaStR accounts
+            # configured in credentials.cfg. Its account is returned on exit
+            with MaStRAPI(
+                credential_pool=CredentialPool.from_config(reserve=0)
+            ) as mastr_api:
+                workers = threading.local()
+                worker_apis = []
+
+                def mastr_mirror():
+                    # zeep clients are not thread-safe, hence each step thread gets its own.
+                    # Each copy checks out another account of the credential pool
+                    if not hasattr(workers, "mastr_mirror"):
+                        worker_api = mastr_api.copy()
+                        worker_apis.append(worker_api)
+                        workers.mastr_mirror = MaStRMirror(
+                            engine=self.engine,
+                            parallel_processes=api_processes,
+                            mastr_api=worker_api,
+                            restore_dump=None,
+                        )
+                    return workers.mastr_mirror
+
+                # Additional data of each technology is downloaded once its basic
+                # unit data is, independent steps run concurrently
+                try:
+                    api_download_orchestrator(
+                        mastr_mirror,
+                        data,
+                        api_data_types,
+                        api_location_types,
+                        date=date,
+                        limit=api_limit,
+                        chunksize=api_chunksize,
+                    ).run(
+                        report_file=os.path.join(
+                            self.home_directory, "logs", "api_download_report.json"
+                        )
                     )
+                finally:
+                    # Return the accounts of the step threads to the credential pool
+                    for worker_api in worker_apis:
+                        worker_api.close()
+                self._write_api_metrics(mastr_api, api_metrics_sinks)
+
+    def _write_api_metrics(self, mastr_api, sinks):
+        """Writes the metrics of all requests of `mastr_api` and its copies."""
+        if sinks is None:
+            sinks = [
+                JSONSink(os.path.join(self.home_directory, "logs", "api_metrics.json"))
+            ]
+        mastr_api.metrics.write(sinks, retries=mastr_api.retry_policy.metrics)
 
     def to_csv(
         self, tables: list = None, chunksize: int = 500000, limit: int = None
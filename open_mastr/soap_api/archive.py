@@ -0,0 +1,190 @@
+"""
+Archive raw responses of the MaStR SOAP API
+
+Responses are stored before they are flattened, such that tables can be rebuilt
+with [`MaStRMirror.reprocess`][open_mastr.soap_api.mirror.MaStRMirror.reprocess]
+after the flattening rules changed, without requesting the data again.
+Requires the optional dependency `zstandard`.
+
+SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+
+import datetime
+import decimal
+import io
+import json
+import os
+import threading
+
+from open_mastr.utils.config import setup_logger
+
+log = setup_logger()
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            "The response archive requires zstandard. "
+            "Install it with `pip install open_mastr[archive]`."
+        ) from e
+    return zstandard
+
+
+class _ResponseEncoder(json.JSONEncoder):
+    """Encodes types of zeep responses that JSON does not know, such that they can be restored."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return {"__datetime__": o.isoformat()}
+        if isinstance(o, datetime.date):
+            return {"__date__": o.isoformat()}
+        if isinstance(o, decimal.Decimal):
+            return {"__decimal__": str(o)}
+        return super().default(o)
+
+
+def _decode_response_types(obj):
+    if "__datetime__" in obj:
+        return datetime.datetime.fromisoformat(obj["__datetime__"])
+    if "__date__" in obj:
+        return datetime.date.fromisoformat(obj["__date__"])
+    if "__decimal__" in obj:
+        return decimal.Decimal(obj["__decimal__"])
+    return obj
+
+
+class ResponseArchive:
+    """
+    Zstandard-compressed JSON lines files of raw API responses
+
+    Responses are partitioned by technology, data type and download date
+
+    ```
+    directory/
+    └── solar/
+        └── unit_data/
+            ├── 2022-01-01.jsonl.zst
+            └── 2022-01-02.jsonl.zst
+    ```
+
+    Each call of `write` appends a compressed frame to the file of the day.
+
+    ```python
+
+        archive = ResponseArchive("mastr-archive")
+        mastr_mirror = MaStRMirror(engine, archive=archive)
+        mastr_mirror.retrieve_additional_data("solar", "unit_data")
+
+        # after the flattening rules changed
+        mastr_mirror.reprocess(archive, data="solar")
+    ```
+    """
+
+    suffix = ".jsonl.zst"
+
+    def __init__(self, directory, level=3):
+        """
+        Parameters
+        ----------
+        directory : str or path-like
+            Root directory of the archive.
+        level : int, optional
+            Zstandard compression level. Defaults to 3.
+        """
+        self.directory = directory
+        self.level = level
+        self._lock = threading.Lock()
+
+    def write(self, technology, data_type, responses, download_date=None):
+        """
+        Append responses to the archive.
+
+        Parameters
+        ----------
+        technology : str
+            Technology of the units, for example "solar".
+        data_type : str
+            Type of additional data, for example "unit_data".
+        responses : list of dict
+            Serialized, not flattened responses of the API.
+        download_date : datetime.date, optional
+            Defaults to today.
+        """
+        if not responses:
+            return
+        download_date = download_date or datetime.date.today()
+        lines = "".join(
+            json.dumps(response, cls=_ResponseEncoder) + "\n" for response in responses
+        )
+        compressed = (
+            _zstandard()
+            .ZstdCompressor(level=self.level)
+            .compress(lines.encode("utf-8"))
+        )
+
+        partition = os.path.join(self.directory, technology, data_type)
+        os.makedirs(partition, exist_ok=True)
+        with self._lock, open(
+            os.path.join(partition, f"{download_date.isoformat()}{self.suffix}"), "ab"
+        ) as f:
+            f.write(compressed)
+
+    def partitions(self, technology=None, data_type=None):
+        """
+        List partitions of the archive.
+
+        Parameters
+        ----------
+        technology : str, optional
+            Only list partitions of this technology. Defaults to all.
+        data_type : str, optional
+            Only list partitions of this data type. Defaults to all.
+
+        Returns
+        -------
+        list of tuple
+            Technology, data type and download date of each partition, ordered
+            by download date.
+        """
+        partitions = []
+        if not os.path.isdir(self.directory):
+            return partitions
+        for tech in sorted(os.listdir(self.directory)):
+            if technology and tech != technology:
+                continue
+            for dtype in sorted(os.listdir(os.path.join(self.directory, tech))):
+                if data_type and dtype != data_type:
+                    continue
+                for filename in os.listdir(os.path.join(self.directory, tech, dtype)):
+                    if filename.endswith(self.suffix):
+                        download_date = datetime.date.fromisoformat(
+                            filename[: -len(self.suffix)]
+                        )
+                        partitions.append((tech, dtype, download_date))
+        return sorted(partitions, key=lambda partition: partition[2])
+
+    def read(self, technology, data_type, download_date):
+        """
+        Read the responses of one partition.
+
+        Yields
+        ------
+        dict
+            Response as written, with dates, datetimes and decimals restored.
+        """
+        path = os.path.join(
+            self.directory,
+            technology,
+            data_type,
+            f"{download_date.isoformat()}{self.suffix}",
+        )
+        with open(path, "rb") as f:
+            reader = (
+                _zstandard()
+                .ZstdDecompressor()
+                .stream_reader(f, read_across_frames=True)
+            )
+            for line in io.TextIOWrapper(reader, encoding="utf-8"):
+                yield json.loads(line, object_hook=_decode_response_types)
@@ -0,0 +1,200 @@
+"""
+Spread requests to the MaStR SOAP API over several MaStR accounts
+
+Each MaStR account has its own daily request contingent. A
+[`CredentialPool`][open_mastr.soap_api.credential_pool.CredentialPool] tracks the
+remaining contingent of each account and sends each request with the credentials
+of an account that has contingent left, such that the number of requests per day
+scales with the number of accounts.
+
+SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+
+import functools
+import os
+import threading
+
+from open_mastr.soap_api.rate_limit import ContingentExhausted, ContingentRateLimiter
+from open_mastr.utils import credentials as cred
+from open_mastr.utils.config import setup_logger
+
+log = setup_logger()
+
+
+class Credential:
+    """User and token of one MaStR account and its daily request contingent"""
+
+    def __init__(self, name, user, key, rate_limiter):
+        self.name = name
+        self.user = user
+        self.key = key
+        self.rate_limiter = rate_limiter
+        # Number of MaStRAPI instances that use this account by default
+        self.workers = 0
+
+    @property
+    def remaining(self):
+        """Number of requests that can still be sent today, `None` if unknown."""
+        return self.rate_limiter.remaining
+
+    def __repr__(self):
+        return f"Credential(name={self.name!r}, user={self.user!r})"
+
+
+class CredentialPool:
+    """
+    Pool of MaStR accounts that share the work of a download
+
+    Accounts are configured in `credentials.cfg` with one section per account
+
+    ```
+        [MaStR:institute]
+        user = SOM123456789012
+        token = ...
+
+        [MaStR:project]
+        user = SOM210987654321
+        token = ...
+    ```
+
+    Pass the pool to [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI]. Each
+    instance and each of its copies checks out the account used by the fewest
+    instances until it is closed. Its requests are sent with this account until its contingent is
+    used up, afterwards with the account with most remaining contingent.
+    [`ContingentExhausted`][open_mastr.soap_api.rate_limit.ContingentExhausted]
+    is raised once the contingent of all accounts is used up.
+
+    ```python
+
+        credential_pool = CredentialPool.from_config()
+        mastr_api = MaStRAPI(credential_pool=credential_pool)
+        mastr_mirror = MaStRMirror(engine, mastr_api=mastr_api, parallel_processes=4)
+    ```
+    """
+
+    def __init__(self, credentials, reserve=100, state_dir=None):
+        """
+        Parameters
+        ----------
+        credentials : list of tuple
+            Name, user and token of each account.
+        reserve : int, optional
+            Number of requests of the daily contingent of each account that are
+            not used. Defaults to 100.
+        state_dir : str or path-like, optional
+            Directory the state of the contingent of each account is saved to,
+            see [`ContingentRateLimiter`][open_mastr.soap_api.rate_limit.ContingentRateLimiter].
+            Defaults to `None` which means the state is not saved.
+        """
+        self.credentials = []
+        for name, user, key in credentials:
+            if not key:
+                log.warning(f"No token is configured for MaStR account {name}.")
+                continue
+            state_file = (
+                os.path.join(state_dir, f"contingent_{name}.json")
+                if state_dir
+                else None
+            )
+            rate_limiter = ContingentRateLimiter(
+                state_file=state_file, reserve=reserve, pace=False
+            )
+            self.credentials.append(Credential(name, user, key, rate_limiter))
+        if not self.credentials:
+            raise ValueError("No MaStR account with user and token is configured.")
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, reserve=100, state_dir=None):
+        """
+        Create a pool of the accounts in `credentials.cfg`, see
+        [`get_mastr_credentials`][open_mastr.utils.credentials.get_mastr_credentials].
+        """
+        return cls(cred.get_mastr_credentials(), reserve=reserve, state_dir=state_dir)
+
+    def __len__(self):
+        return len(self.credentials)
+
+    @property
+    def remaining(self):
+        """
+        Number of requests that can still be sent today with all accounts, `None`
+        if the contingent of an account is unknown.
+        """
+        remaining = [credential.remaining for credential in self.credentials]
+        if None in remaining:
+            return None
+        return sum(remaining)
+
+    @property
+    def reset_time(self):
+        """Time at which the first daily contingent is reset."""
+        return min(
+            credential.rate_limiter.reset_time for credential in self.credentials
+        )
+
+    def attach(self, contingent_source):
+        """
+        Read the contingent of each account with `contingent_source`, usually
+        `MaStRAPI.GetAktuellerStandTageskontingent`.
+        """
+        for credential in self.credentials:
+            credential.rate_limiter.attach(
+                functools.partial(
+                    contingent_source,
+                    apiKey=credential.key,
+                    marktakteurMastrNummer=credential.user,
+                )
+            )
+
+    def checkout(self) -> Credential:
+        """Assign the account used by the fewest workers to a new worker."""
+        with self._lock:
+            credential = min(self.credentials, key=lambda c: c.workers)
+            credential.workers += 1
+        log.info(f"Use MaStR account {credential.name}")
+        return credential
+
+    def release(self, credential):
+        """Return an account checked out by a worker that stopped."""
+        with self._lock:
+            credential.workers = max(credential.workers - 1, 0)
+        log.debug(f"Release MaStR account {credential.name}")
+
+    def acquire(self, preferred=None) -> Credential:
+        """
+        Take one request of the contingent of an account.
+
+        Parameters
+        ----------
+        preferred : Credential, optional
+            Account that is used if it has contingent left.
+
+        Returns
+        -------
+        Credential
+            Account the request is sent with.
+
+        Raises
+        ------
+        ContingentExhausted
+            If the contingent of all accounts is used up.
+        """
+        candidates = sorted(
+            self.credentials,
+            key=lambda c: (
+                c is not preferred,
+                -(c.remaining if c.remaining is not None else float("inf")),
+            ),
+        )
+        resume_at = []
+        for credential in candidates:
+            try:
+                credential.rate_limiter.acquire()
+                return credential
+            except ContingentExhausted as e:
+                resume_at.append(e.resume_at)
+        raise ContingentExhausted(
+            f"Daily request contingent of all {len(self)} MaStR accounts is used up.",
+            min(resume_at),
+        )
@@ -0,0 +1,178 @@
+"""
+Deserialize responses of the MaStR SOAP API without zeep object graphs
+
+zeep builds an object tree for each response, which
+[`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI] converts to dicts
+afterwards. For large list responses, most client CPU time is spent on these
+two steps. A
+[`ResponseDeserializer`][open_mastr.soap_api.deserialize.ResponseDeserializer]
+converts the raw XML of a response directly into the same dicts with a field
+map compiled once per operation from the XSD types parsed by zeep.
+
+SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+
+from lxml import etree
+from zeep import xsd
+from zeep.xsd.types.simple import AnySimpleType
+
+SOAP_ENVELOPE_NAMESPACES = [
+    "http://schemas.xmlsoap.org/soap/envelope/",
+    "http://www.w3.org/2003/05/soap-envelope",
+]
+XSI_NIL = "{http://www.w3.org/2001/XMLSchema-instance}nil"
+
+_PARSER = etree.XMLParser(
+    resolve_entities=False, no_network=True, huge_tree=True, remove_blank_text=True
+)
+
+
+class _UnexpectedElement(Exception):
+    """Raised for elements that are not defined in the XSD."""
+
+
+class ResponseDeserializer:
+    """
+    Converts raw responses of one SOAP operation into dicts
+
+    The result equals `zeep.helpers.serialize_object(response, target_cls=dict)`
+    of the response parsed by zeep, hence, it can be passed to
+    [`flatten_dict`][open_mastr.soap_api.download.flatten_dict] as well.
+
+    Raises `NotImplementedError` for operations whose response types use XSD
+    features that are not supported, like attributes, `xsd:choice` or
+    `xsd:any`. Use zeep for these operations.
+    """
+
+    def __init__(self, operation):
+        """
+        Parameters
+        ----------
+        operation : zeep.wsdl.definitions.Operation
+            Operation of a zeep binding, for example
+            `client.service._binding._operations["GetEinheitSolar"]`.
+        """
+        body = operation.output.body
+        if body is None or not isinstance(body, xsd.Element):
+            raise NotImplementedError(f"Unsupported response of {operation.name}")
+
+        self.name = operation.name
+        self._tag = body.qname.text
+        self._parse_body = _compile_type(body.type)
+        self._unwrap = None
+
+        # zeep returns the only child of the response element instead of
+        # the response element itself
+        elements = body.type.elements
+        if len(elements) == 1 and not body.type.attributes:
+            self._unwrap = elements[0][0]
+
+    def deserialize(self, content):
+        """
+        Deserialize a response.
+
+        Parameters
+        ----------
+        content : bytes
+            Raw XML of the SOAP envelope.
+
+        Returns
+        -------
+        dict or None
+            Response data. `None`, if the content is no valid XML, the envelope
+            contains a SOAP Fault or no response element, or the response
+            contains elements that are not defined in the XSD. These responses
+            are left to zeep to be handled.
+        """
+        try:
+            envelope = etree.fromstring(content, _PARSER)
+        except etree.XMLSyntaxError:
+            return None
+        body = None
+        for namespace in SOAP_ENVELOPE_NAMESPACES:
+            body = envelope.find(f"{{{namespace}}}Body")
+            if body is not None:
+                break
+        if body is None:
+            return None
+
+        response = body.find(self._tag)
+        if response is None:
+            return None
+        try:
+            result = self._parse_body(response)
+        except _UnexpectedElement:
+            return None
+        if self._unwrap is not None:
+            return result[self._unwrap]
+        return result
+
+
+def _compile_type(xsd_type, compiled=None):
+    """Creates a function that converts an XML element of `xsd_type`."""
+    if isinstance(xsd_type, AnySimpleType):
+        return _compile_simple_type(xsd_type)
+
+    # Types that contain themselves reuse the function that is being compiled
+    compiled = {} if compiled is None else compiled
+    if id(xsd_type) in compiled:
+        return compiled[id(xsd_type)]
+
+    if getattr(xsd_type, "attributes", None):
+        raise NotImplementedError(f"Attributes of {xsd_type.name} are not supported")
+    for _, particle in xsd_type.elements_nested:
+        if not _is_plain_particle(particle):
+            raise NotImplementedError(f"Particles of {xsd_type.name} are not supported")
+
+    # Tag -> (key, parser, is_list), in the order of the XSD
+    fields = {}
+    keys = [(name, element.max_occurs != 1) for name, element in xsd_type.elements]
+
+    def parse_complex(node):
+        if node.get(XSI_NIL) in ("true", "1"):
+            return None
+        result = {key: [] if is_list else None for key, is_list in keys}
+        for child in node:
+            field = fields.get(child.tag)
+            if field is None:
+                raise _UnexpectedElement(child.tag)
+            key, parse, is_list = field
+            if is_list:
+                result[key].append(parse(child))
+            else:
+                result[key] = parse(child)
+        return result
+
+    compiled[id(xsd_type)] = parse_complex
+    for name, element in xsd_type.elements:
+        fields[element.qname.text] = (
+            name,
+            _compile_type(element.type, compiled),
+            element.max_occurs != 1,
+        )
+    return parse_complex
+
+
+def _is_plain_particle(particle):
+    """Elements, and sequences of elements that occur once, as in type extensions."""
+    if isinstance(particle, xsd.Any):
+        return False
+    if isinstance(particle, xsd.Element):
+        return True
+    if isinstance(particle, (xsd.Sequence, xsd.All)) and particle.max_occurs == 1:
+        return all(_is_plain_particle(child) for child in particle)
+    return False
+
+
+def _compile_simple_type(xsd_type):
+    pythonvalue = xsd_type.pythonvalue
+
+    def parse_simple(node):
+        if node.get(XSI_NIL) in ("true", "1"):
+            return None
+        text = node.text
+        if text is None:
+            return None
+        return pythonvalue(text)
+
+    return parse_simple
@@ -1,29 +1,157 @@
+import asyncio
 import json
 import logging
 import multiprocessing
 import os
+import threading
 import time
-from functools import wraps
-from itertools import product
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache, wraps
+from importlib.metadata import PackageNotFoundError, version
+from itertools import islice, product
 
 import pandas as pd
 import requests
+from open_mastr.soap_api.deserialize import ResponseDeserializer
+from open_mastr.soap_api.metrics import APIMetrics
+from open_mastr.soap_api.retry import (
+    RETRYABLE_ERRORS,
+    CredentialsRejected,
+    RetryPolicy,
+    is_timeout,
+)
 from open_mastr.utils import credentials as cred
 from open_mastr.utils.config import (
     create_data_dir,
     get_data_version_dir,
     get_filenames,
+    get_project_home_dir,
     setup_logger,
 )
+from open_mastr.xml_download.utils_download_bulk import gen_version
 from tqdm import tqdm
-from zeep import Client, Settings
+from zeep import AsyncClient, Client, Settings
 from zeep.cache import SqliteCache
 from zeep.exceptions import Fault, XMLParseError
 from zeep.helpers import serialize_object
-from zeep.transports import Transport
+from zeep.transports import AsyncTransport, Transport
+from zeep.wsdl import Document
 
 log = setup_logger()
 
+# WSDL file of the MaStR SOAP API
+MASTR_WSDL_URL = "https://www.marktstammdatenregister.de/MaStRAPI/wsdl/mastr.wsdl"
+
+# Specify which additional data for each unit type is available
+# and which SOAP service has to be used to query it
+UNIT_DATA_SPECS = {
+    "biomass": {
+        "unit_data": "GetEinheitBiomasse",
+        "energietraeger": ["Biomasse"],
+        "kwk_data": "GetAnlageKwk",
+        "eeg_data": "GetAnlageEegBiomasse",
+        "permit_data": "GetEinheitGenehmigung",
+    },
+    "combustion": {
+        "unit_data": "GetEinheitVerbrennung",
+        "energietraeger": [
+            "Steinkohle",
+            "Braunkohle",
+            "Erdgas",
+            "AndereGase",
+            "Mineraloelprodukte",
+            "NichtBiogenerAbfall",
+            "Waerme",
+        ],
+        "kwk_data": "GetAnlageKwk",
+        "permit_data": "GetEinheitGenehmigung",
+    },
+    "gsgk": {
+        "unit_data": "GetEinheitGeothermieGrubengasDruckentspannung",
+        "energietraeger": [
+            "Geothermie",
+            "Solarthermie",
+            "Grubengas",
+            "Klaerschlamm",
+        ],
+        "kwk_data": "GetAnlageKwk",
+        "eeg_data": "GetAnlageEegGeothermieGrubengasDruckentspannung",
+        "permit_data": "GetEinheitGenehmigung",
+    },
+    "nuclear": {
+        "unit_data": "GetEinheitKernkraft",
+        "energietraeger": ["Kernenergie"],
+        "permit_data": "GetEinheitGenehmigung",
+    },
+    "solar": {
+        "unit_data": "GetEinheitSolar",
+        "energietraeger": ["SolareStrahlungsenergie"],
+        "eeg_data": "GetAnlageEegSolar",
+        "permit_data": "GetEinheitGenehmigung",
+    },
+    "wind": {
+        "unit_data": "GetEinheitWind",
+        "energietraeger": ["Wind"],
+        "eeg_data": "GetAnlageEegWind",
+        "permit_data": "GetEinheitGenehmigung",
+    },
+    "hydro": {
+        "unit_data": "GetEinheitWasser",
+        "energietraeger": ["Wasser"],
+        "eeg_data": "GetAnlageEegWasser",
+        "permit_data": "GetEinheitGenehmigung",
+    },
+    "storage": {
+        "unit_data": "GetEinheitStromSpeicher",
+        "energietraeger": ["Speicher"],
+        "eeg_data": "GetAnlageEegSpeicher",
+        # todo: additional data request not created for permit, create manually
+        "permit_data": "GetEinheitGenehmigung",
+    },
+    "gas_storage": {
+        "unit_data": "GetEinheitGasSpeicher",
+        "energietraeger": ["Speicher"],
+    },
+    # TODO: unsure if energietraeger Ergdas makes sense
+    "gas_consumer": {
+        "unit_data": "GetEinheitGasVerbraucher",
+        "energietraeger": ["Erdgas"],
+    },
+    "electricity_consumer": {
+        "unit_data": "GetEinheitStromVerbraucher",
+        "energietraeger": ["Strom"],
+    },
+    "gas_producer": {
+        "unit_data": "GetEinheitGasErzeuger",
+        "energietraeger": [None],
+    },
+    "location_elec_generation": "GetLokationStromErzeuger",
+    "location_elec_consumption": "GetLokationStromVerbraucher",
+    "location_gas_generation": "GetLokationGasErzeuger",
+    "location_gas_consumption": "GetLokationGasVerbraucher",
+}
+
+# HTTP sessions shared by all MaStRAPI instances, see `_shared_session`
+_SHARED_SESSIONS = {}
+_SHARED_SESSIONS_LOCK = threading.Lock()
+# Size of the last response received by the shared sessions in each thread
+_last_response = threading.local()
+
+# Parsed WSDL documents shared by all zeep clients, see `_wsdl_document`
+_WSDL_DOCUMENTS = {}
+_WSDL_DOCUMENTS_LOCK = threading.Lock()
+
+# Response deserializers per WSDL and service port, see `_response_deserializers`
+_RESPONSE_DESERIALIZERS = {}
+_RESPONSE_DESERIALIZERS_LOCK = threading.Lock()
+
+# Maximum age of cached WSDL and XSD files in seconds
+WSDL_CACHE_TIMEOUT = 7 * 24 * 3600
+
+# SOAP functions that do not count against the daily request contingent
+UNLIMITED_SOAP_FUNCTIONS = ["GetAktuellerStandTageskontingent", "GetLokaleUhrzeit"]
+
 
 class MaStRAPI(object):
     """
@@ -70,7 +198,21 @@ class MaStRAPI(object):
         wrapped SOAP queries. This is handled internally.
     """
 
-    def __init__(self, user=None, key=None, service_port="Anlage"):
+    def __init__(
+        self,
+        user=None,
+        key=None,
+        service_port="Anlage",
+        wsdl=MASTR_WSDL_URL,
+        plugins=None,
+        operation_timeout=600,
+        connect_timeout=30,
+        rate_limiter=None,
+        fast_deserializer=False,
+        retry_policy=None,
+        credential_pool=None,
+        metrics=None,
+    ):
         """
         Parameters
         ----------
@@ -86,74 +228,489 @@ class MaStRAPI(object):
             full list:
             https://www.marktstammdatenregister.de/MaStRHilfe/subpages/webdienst.html
             Defaults to "Anlage".
+        wsdl : str , optional
+            URL of the WSDL file. Change it to use a local stand-in server, see
+            [`open_mastr.soap_api.replay`][open_mastr.soap_api.replay].
+            Defaults to the WSDL file of the MaStR SOAP API.
+        plugins : list of zeep.Plugin , optional
+            Plugins passed to the zeep client, for example
+            [`SOAPRecorder`][open_mastr.soap_api.replay.SOAPRecorder].
+        operation_timeout : int , optional
+            Timeout for reading the response of each SOAP request in seconds.
+            Defaults to 600.
+        connect_timeout : int , optional
+            Timeout for establishing a connection to the SOAP API in seconds.
+            Connections are kept alive and shared by all instances.
+            Defaults to 30.
+        rate_limiter : ContingentRateLimiter , optional
+            Paces all requests according to the daily request contingent, see
+            [`ContingentRateLimiter`][open_mastr.soap_api.rate_limit.ContingentRateLimiter].
+            Defaults to `None` which means requests are not paced.
+        fast_deserializer : bool , optional
+            If True, responses are converted from raw XML directly into dicts by a
+            [`ResponseDeserializer`][open_mastr.soap_api.deserialize.ResponseDeserializer]
+            instead of zeep. This saves most of the client CPU time for large
+            responses. SOAP Faults and operations with unsupported response types
+            are still handled by zeep. Ingress plugins are not applied to
+            responses that are deserialized this way. Defaults to False.
+        retry_policy : RetryPolicy , optional
+            Retries requests that failed because of temporary errors, see
+            [`RetryPolicy`][open_mastr.soap_api.retry.RetryPolicy]. It is shared
+            by all copies of this instance. Defaults to a `RetryPolicy()` with
+            three retries and no circuit breaker.
+        credential_pool : CredentialPool , optional
+            Spreads requests over several MaStR accounts, see
+            [`CredentialPool`][open_mastr.soap_api.credential_pool.CredentialPool].
+            Each instance and each copy checks out an account from the pool, `user`
+            and `key` are ignored. Defaults to `None` which means all requests are
+            sent with `user` and `key`.
+        metrics : APIMetrics , optional
+            Records latency, response size and errors of each request, see
+            [`APIMetrics`][open_mastr.soap_api.metrics.APIMetrics]. It is shared
+            by all copies of this instance. Defaults to a new `APIMetrics()`.
         """
 
+        self._service_port = service_port
+        self._wsdl = wsdl
+        self._plugins = plugins
+        self._operation_timeout = operation_timeout
+        self._connect_timeout = connect_timeout
+        self.rate_limiter = rate_limiter
+        self._fast_deserializer = fast_deserializer
+        self.retry_policy = retry_policy if retry_policy else RetryPolicy()
+        self.credential_pool = credential_pool
+        self.metrics = metrics if metrics else APIMetrics()
+
         # Bind MaStR SOAP API functions as instance methods
-        client, client_bind = _mastr_bindings(service_port=service_port)
+        client, client_bind = _mastr_bindings(
+            service_port=service_port,
+            wsdl=wsdl,
+            operation_timeout=operation_timeout,
+            connect_timeout=connect_timeout,
+            plugins=plugins,
+        )
+
+        self._client = client
+        self._binding = client_bind._binding
+        deserializers = (
+            _response_deserializers(wsdl, service_port, self._binding)
+            if fast_deserializer
+            else {}
+        )
 
         # First, all services of registered service_port (i.e. 'Anlage')
         for n, f in client_bind:
-            setattr(self, n, self._mastr_wrapper(f))
+            setattr(
+                self,
+                n,
+                self._mastr_wrapper(
+                    f, n not in UNLIMITED_SOAP_FUNCTIONS, deserializers.get(n)
+                ),
+            )
 
         # Second, general functions like 'GetLokaleUhrzeit'
         for n, f in client.service:
             if n == "GetLokaleUhrzeit":
                 setattr(self, n, f)
             else:
-                setattr(self, n, self._mastr_wrapper(f))
+                setattr(
+                    self, n, self._mastr_wrapper(f, n not in UNLIMITED_SOAP_FUNCTIONS)
+                )
 
         # Assign MaStR credentials
+        self.credential = None
+        if credential_pool is not None:
+            self.credential = credential_pool.checkout()
+            user, key = self.credential.user, self.credential.key
+            credential_pool.attach(self.GetAktuellerStandTageskontingent)
 
         self._user = user if user else cred.get_mastr_user()
         self._key = key if key else cred.get_mastr_token(self._user)
 
-    def _mastr_wrapper(self, soap_func):
+        if rate_limiter is not None:
+            rate_limiter.attach(self.GetAktuellerStandTageskontingent)
+
+    def _mastr_wrapper(self, soap_func, rate_limited=True, deserializer=None):
         """
         Decorates MaStR SOAP API methods with a wrapper automatically passing
-        credentials and serializing return value
+        credentials, pacing requests if `rate_limited` and serializing return value.
+        If a `deserializer` is given, it converts the raw response instead of zeep.
+        Each attempt is recorded to `metrics`.
         """
 
+        def request(*args, **kwargs):
+            if deserializer is None:
+                return serialize_object(soap_func(*args, **kwargs), target_cls=dict)
+
+            with self._client.settings(raw_response=True):
+                http_response = soap_func(*args, **kwargs)
+            if http_response.status_code == 200:
+                response = deserializer.deserialize(http_response.content)
+                if response is not None:
+                    return response
+            # SOAP Faults and unexpected responses are handled by zeep
+            operation = self._binding._operations[deserializer.name]
+            return serialize_object(
+                self._binding.process_reply(self._client, operation, http_response),
+                target_cls=dict,
+            )
+
+        operation = _operation_name(soap_func)
+
         @wraps(soap_func)
         def wrapper(*args, **kwargs):
+            pooled = rate_limited and _use_credential_pool(self, kwargs)
             kwargs.setdefault("apiKey", self._key)
             kwargs.setdefault("marktakteurMastrNummer", self._user)
 
-            # Catch weird MaStR SOAP response
+            def attempt():
+                if pooled:
+                    _pooled_credentials(self, kwargs)
+                if rate_limited and self.rate_limiter is not None:
+                    self.rate_limiter.acquire()
+                _last_response.size = None
+                start = time.perf_counter()
+                try:
+                    response = request(*args, **kwargs)
+                except Exception as e:
+                    self.metrics.observe(
+                        operation,
+                        time.perf_counter() - start,
+                        _last_response.size,
+                        error=e,
+                        contingent=rate_limited,
+                    )
+                    raise
+                self.metrics.observe(
+                    operation,
+                    time.perf_counter() - start,
+                    _last_response.size,
+                    contingent=rate_limited,
+                )
+                return response
+
+            # Retry weird MaStR SOAP responses
             try:
-                response = soap_func(*args, **kwargs)
-            except Fault:
-                time.sleep(1.5)
+                return self.retry_policy.call(attempt)
+            except CredentialsRejected:
+                raise
+            except Fault as e:
+                raise Fault(_retry_failed_message(e)) from e
+
+        return wrapper
+
+    def close(self):
+        """
+        Return the account checked out from the `credential_pool`, such that it is
+        assigned to the next new worker again. The instance can still be used.
+        """
+        if self.credential_pool is not None and self.credential is not None:
+            self.credential_pool.release(self.credential)
+            self.credential = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def copy(self, **kwargs):
+        """
+        Create a new instance with the same credentials and settings.
+
+        The underlying zeep client is not thread-safe. Use one copy per thread
+        to query the API from multiple threads. Close the copy once its thread is
+        done, see `close`.
+
+        Parameters
+        ----------
+        **kwargs
+            Parameters of [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI]
+            that differ from this instance, e.g. `operation_timeout`.
+
+        Returns
+        -------
+        MaStRAPI
+        """
+        parameters = {
+            "user": self._user,
+            "key": self._key,
+            "service_port": self._service_port,
+            "wsdl": self._wsdl,
+            "plugins": self._plugins,
+            "operation_timeout": self._operation_timeout,
+            "connect_timeout": self._connect_timeout,
+            "rate_limiter": self.rate_limiter,
+            "fast_deserializer": self._fast_deserializer,
+            "retry_policy": self.retry_policy,
+            "credential_pool": self.credential_pool,
+            "metrics": self.metrics,
+        }
+        parameters.update(kwargs)
+        return type(self)(**parameters)
+
+    def async_api(self, max_connections=100, operation_timeout=None):
+        """
+        Create an [`AsyncMaStRAPI`][open_mastr.soap_api.download.AsyncMaStRAPI]
+        with the same credentials, service port and WSDL file.
+
+        Parameters
+        ----------
+        max_connections : int, optional
+            Maximum number of concurrent HTTP connections. Defaults to 100.
+        operation_timeout : int, optional
+            Timeout of each HTTP request. Defaults to `None` which means the
+            `operation_timeout` of this instance is used.
+
+        Returns
+        -------
+        AsyncMaStRAPI
+        """
+        return AsyncMaStRAPI(
+            user=self._user,
+            key=self._key,
+            service_port=self._service_port,
+            wsdl=self._wsdl,
+            plugins=self._plugins,
+            max_connections=max_connections,
+            operation_timeout=operation_timeout or self._operation_timeout,
+            connect_timeout=self._connect_timeout,
+            rate_limiter=self.rate_limiter,
+            retry_policy=self.retry_policy,
+            credential_pool=self.credential_pool,
+            metrics=self.metrics,
+        )
+
+
+class AsyncMaStRAPI(object):
+    """
+    Access the MaStR SOAP API with asyncio
+
+    Counterpart of [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI] whose SOAP
+    queries are coroutines. Many queries can be awaited concurrently over a pool
+    of HTTP connections. Requires the optional dependency `httpx`
+    (`pip install open_mastr[async]`).
+
+    Use it as an async context manager to close the connections afterwards
+
+    ```python
+
+        async with MaStRAPI().async_api() as mastr_api:
+            units = await asyncio.gather(
+                mastr_api.GetEinheitSolar(einheitMastrNummer="SEE984033548619"),
+                mastr_api.GetEinheitSolar(einheitMastrNummer="SEE936595511945"),
+            )
+    ```
+    """
+
+    def __init__(
+        self,
+        user=None,
+        key=None,
+        service_port="Anlage",
+        wsdl=MASTR_WSDL_URL,
+        plugins=None,
+        max_connections=100,
+        operation_timeout=600,
+        connect_timeout=30,
+        rate_limiter=None,
+        retry_policy=None,
+        credential_pool=None,
+        metrics=None,
+    ):
+        """
+        Parameters
+        ----------
+        user : str , optional
+            See [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI].
+        key : str , optional
+            See [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI].
+        service_port : str , optional
+            See [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI].
+            Defaults to "Anlage".
+        wsdl : str , optional
+            See [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI].
+        plugins : list of zeep.Plugin , optional
+            See [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI].
+        max_connections : int, optional
+            Maximum number of concurrent HTTP connections. Defaults to 100.
+        operation_timeout : int , optional
+            See [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI].
+        connect_timeout : int , optional
+            See [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI].
+        rate_limiter : ContingentRateLimiter , optional
+            See [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI].
+        retry_policy : RetryPolicy , optional
+            See [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI].
+        credential_pool : CredentialPool , optional
+            See [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI].
+        metrics : APIMetrics , optional
+            See [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI]. Sizes of
+            responses are not recorded.
+        """
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy if retry_policy else RetryPolicy()
+        self.credential_pool = credential_pool
+        self.metrics = metrics if metrics else APIMetrics()
+        self._transport, client, client_bind = _mastr_async_bindings(
+            service_port=service_port,
+            wsdl=wsdl,
+            max_connections=max_connections,
+            operation_timeout=operation_timeout,
+            connect_timeout=connect_timeout,
+            plugins=plugins,
+        )
+
+        for n, f in client_bind:
+            setattr(self, n, self._mastr_wrapper(f, n not in UNLIMITED_SOAP_FUNCTIONS))
+        for n, f in client.service:
+            if n == "GetLokaleUhrzeit":
+                setattr(self, n, f)
+            else:
+                setattr(
+                    self, n, self._mastr_wrapper(f, n not in UNLIMITED_SOAP_FUNCTIONS)
+                )
+
+        self.credential = None
+        if credential_pool is not None:
+            self.credential = credential_pool.checkout()
+            user, key = self.credential.user, self.credential.key
+
+        self._user = user if user else cred.get_mastr_user()
+        self._key = key if key else cred.get_mastr_token(self._user)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """
+        Close all HTTP connections and return the account checked out from the
+        `credential_pool`.
+        """
+        if self.credential_pool is not None and self.credential is not None:
+            self.credential_pool.release(self.credential)
+            self.credential = None
+        await self._transport.aclose()
+
+    def _mastr_wrapper(self, soap_func, rate_limited=True):
+        """
+        Decorates MaStR SOAP API coroutines with a wrapper automatically passing
+        credentials, pacing requests if `rate_limited` and serializing return value
+        """
+
+        operation = _operation_name(soap_func)
+
+        @wraps(soap_func)
+        async def wrapper(*args, **kwargs):
+            pooled = rate_limited and _use_credential_pool(self, kwargs)
+            kwargs.setdefault("apiKey", self._key)
+            kwargs.setdefault("marktakteurMastrNummer", self._user)
+
+            async def attempt():
+                if pooled:
+                    _pooled_credentials(self, kwargs)
+                if rate_limited and self.rate_limiter is not None:
+                    await self.rate_limiter.acquire_async()
+                start = time.perf_counter()
                 try:
-                    response = soap_func(*args, **kwargs)
-                except Fault as e:
-                    msg = (
-                        (
-                            f"MaStR SOAP API still gives a weird response: '{e}'.\n"
-                            "Retry failed!"
-                        )
-                        if e.message != "Zugriff verweigert"
-                        else (
-                            "Your credentials could not be used to "
-                            "access the MaStR SOAP API from BNetzA. Please make sure that "
-                            "they are correct."
-                        )
+                    response = await soap_func(*args, **kwargs)
+                except Exception as e:
+                    self.metrics.observe(
+                        operation,
+                        time.perf_counter() - start,
+                        error=e,
+                        contingent=rate_limited,
                     )
-                    raise Fault(msg) from e
+                    raise
+                self.metrics.observe(
+                    operation, time.perf_counter() - start, contingent=rate_limited
+                )
+                return response
+
+            try:
+                response = await self.retry_policy.call_async(attempt)
+            except CredentialsRejected:
+                raise
+            except Fault as e:
+                raise Fault(_retry_failed_message(e)) from e
 
             return serialize_object(response, target_cls=dict)
 
         return wrapper
 
 
+def _operation_name(soap_func):
+    """Name of the SOAP operation of a zeep operation proxy."""
+    return getattr(soap_func, "_op_name", None) or getattr(
+        soap_func, "__name__", repr(soap_func)
+    )
+
+
+def _record_response_size(response, *args, **kwargs):
+    """Response hook of the shared session that keeps the size of the last response."""
+    _last_response.size = len(response.content)
+
+
+def _use_credential_pool(mastr_api, kwargs):
+    """True, if a request is sent with an account of the credential pool."""
+    return mastr_api.credential_pool is not None and "apiKey" not in kwargs
+
+
+def _pooled_credentials(mastr_api, kwargs):
+    """Take one request of the contingent of an account and use its credentials."""
+    credential = mastr_api.credential_pool.acquire(mastr_api.credential)
+    kwargs["apiKey"] = credential.key
+    kwargs["marktakteurMastrNummer"] = credential.user
+
+
+def _retry_failed_message(fault):
+    """Message of the Fault that is raised if the retry of a SOAP query failed."""
+    if fault.message == "Zugriff verweigert":
+        return (
+            "Your credentials could not be used to "
+            "access the MaStR SOAP API from BNetzA. Please make sure that "
+            "they are correct."
+        )
+    return f"MaStR SOAP API still gives a weird response: '{fault}'.\nRetry failed!"
+
+
+class MissedRequest(tuple):
+    """
+    Request for additional data that failed
+
+    Unpacks like a tuple `(mastr_id, reason)` where `reason` is the repr of the
+    error. The error itself is kept as `error`.
+    """
+
+    def __new__(cls, mastr_id, error):
+        missed = super().__new__(cls, (mastr_id, repr(error)))
+        missed.error = error
+        return missed
+
+
+def _is_final(missed):
+    """
+    True, if a missed request must not be sent again, because its credentials were
+    rejected or it timed out and was already retried by the retry policy.
+    """
+    error = getattr(missed, "error", None)
+    return isinstance(error, CredentialsRejected) or is_timeout(error)
+
+
 def _mastr_bindings(
     service_port,
     service_name="Marktstammdatenregister",
-    wsdl="https://www.marktstammdatenregister.de/MaStRAPI/wsdl/mastr.wsdl",
+    wsdl=MASTR_WSDL_URL,
     max_retries=3,
     pool_connections=100,
     pool_maxsize=100,
     timeout=60,
     operation_timeout=600,
+    connect_timeout=30,
+    plugins=None,
 ):
     """
 
@@ -180,8 +737,14 @@ def _mastr_bindings(
         Timeout for loading wsdl sfn xsd documents in seconds. Parameter
         is passed to `zeep.transports.Transport`.
     operation_timeout : int
-        Timeout for API requests (GET/POST in underlying requests package)
-        in seconds. Parameter is passed to `zeep.transports.Transport`.
+        Timeout for reading responses of API requests (GET/POST in underlying
+        requests package) in seconds. Parameter is passed to
+        `zeep.transports.Transport`.
+    connect_timeout : int
+        Timeout for establishing connections for API requests in seconds.
+        Parameter is passed to `zeep.transports.Transport`.
+    plugins : list of zeep.Plugin, optional
+        Plugins that are passed to `zeep.Client`.
 
     Returns
     -------
@@ -191,22 +754,24 @@ def _mastr_bindings(
     """
 
     wsdl = wsdl
-    session = requests.Session()
-    session.max_redirects = 30
-    a = requests.adapters.HTTPAdapter(
+    session = _shared_session(
         max_retries=max_retries,
         pool_connections=pool_connections,
         pool_maxsize=pool_maxsize,
     )
-    session.mount("https://", a)
     transport = Transport(
-        cache=SqliteCache(),
+        cache=_wsdl_cache(),
         timeout=timeout,
-        operation_timeout=operation_timeout,
+        operation_timeout=(connect_timeout, operation_timeout),
         session=session,
     )
     settings = Settings(strict=False, xml_huge_tree=True)
-    client = Client(wsdl=wsdl, transport=transport, settings=settings)
+    client = Client(
+        wsdl=_wsdl_document(wsdl, transport, settings),
+        transport=transport,
+        settings=settings,
+        plugins=plugins,
+    )
     client_bind = client.bind(service_name, service_port)
 
     _mastr_suppress_parsing_errors(["parse-time-second"])
@@ -214,6 +779,210 @@ def _mastr_bindings(
     return client, client_bind
 
 
+@lru_cache(maxsize=None)
+def _wsdl_cache():
+    """
+    Persistent cache of WSDL and XSD files in `PROJECTHOME/cache/`
+
+    The cache is keyed by the MaStR release version, see
+    [`gen_version`][open_mastr.xml_download.utils_download_bulk.gen_version],
+    and the open-MaStR version. Caches of other versions are removed.
+
+    Returns
+    -------
+    zeep.cache.SqliteCache
+    """
+    try:
+        package_version = version("open-mastr")
+    except PackageNotFoundError:
+        package_version = "unknown"
+    cache_dir = os.path.join(get_project_home_dir(), "cache")
+    cache_file = f"wsdl-{gen_version(time.localtime())}-{package_version}.sqlite"
+    os.makedirs(cache_dir, exist_ok=True)
+
+    for file_name in os.listdir(cache_dir):
+        if file_name.startswith("wsdl-") and file_name != cache_file:
+            try:
+                os.remove(os.path.join(cache_dir, file_name))
+            except OSError:
+                # Still in use by another process
+                pass
+
+    return SqliteCache(
+        path=os.path.join(cache_dir, cache_file), timeout=WSDL_CACHE_TIMEOUT
+    )
+
+
+def _wsdl_document(wsdl, transport, settings):
+    """
+    Get the parsed WSDL document, which is parsed once per process
+
+    Parsing the WSDL and XSD files of the MaStR SOAP API takes seconds. Parsed
+    documents are read-only and are shared by all zeep clients of the same `wsdl`.
+
+    Parameters
+    ----------
+    wsdl : str
+        URL of the WSDL file.
+    transport : zeep.transports.Transport
+        Transport used to load the WSDL and XSD files, if not parsed yet.
+    settings : zeep.Settings
+        Settings used to parse the WSDL and XSD files, if not parsed yet.
+
+    Returns
+    -------
+    zeep.wsdl.Document
+    """
+    with _WSDL_DOCUMENTS_LOCK:
+        if wsdl not in _WSDL_DOCUMENTS:
+            _WSDL_DOCUMENTS[wsdl] = Document(wsdl, transport, settings=settings)
+        return _WSDL_DOCUMENTS[wsdl]
+
+
+def _response_deserializers(wsdl, service_port, binding):
+    """
+    Compile a [`ResponseDeserializer`][open_mastr.soap_api.deserialize.ResponseDeserializer]
+    for each operation of `binding` once per process
+
+    Operations whose response types are not supported are left out.
+
+    Returns
+    -------
+    dict
+        Deserializer by operation name
+    """
+    key = (wsdl, service_port)
+    with _RESPONSE_DESERIALIZERS_LOCK:
+        if key not in _RESPONSE_DESERIALIZERS:
+            deserializers = {}
+            for name, operation in binding._operations.items():
+                try:
+                    deserializers[name] = ResponseDeserializer(operation)
+                except NotImplementedError as e:
+                    log.debug(f"Responses of {name} are deserialized by zeep: {e}")
+            _RESPONSE_DESERIALIZERS[key] = deserializers
+        return _RESPONSE_DESERIALIZERS[key]
+
+
+def _shared_session(max_retries=3, pool_connections=100, pool_maxsize=100):
+    """
+    Get the `requests.Session` shared by all zeep clients with the same pool settings
+
+    The session keeps connections to the MaStR SOAP API alive and reuses them across
+    [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI] instances and threads.
+    Responses are requested gzip-compressed. A new session is created in each
+    process, as connections must not be shared across forked processes.
+
+    Parameters
+    ----------
+    max_retries : int
+        Maximum number of retries for a request. Parameters is passed to
+        requests.adapters.HTTPAdapter
+    pool_connections : int
+        Number of pool connections. Parameters is passed to
+        requests.adapters.HTTPAdapter
+    pool_maxsize
+        Maximum pool size. Parameters is passed to
+        requests.adapters.HTTPAdapter
+
+    Returns
+    -------
+    requests.Session
+    """
+    key = (os.getpid(), max_retries, pool_connections, pool_maxsize)
+    with _SHARED_SESSIONS_LOCK:
+        if key not in _SHARED_SESSIONS:
+            session = requests.Session()
+            session.max_redirects = 30
+            session.headers.update(
+                {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+            )
+            adapter = requests.adapters.HTTPAdapter(
+                max_retries=max_retries,
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.hooks["response"].append(_record_response_size)
+            _SHARED_SESSIONS[key] = session
+        return _SHARED_SESSIONS[key]
+
+
+def _mastr_async_bindings(
+    service_port,
+    service_name="Marktstammdatenregister",
+    wsdl=MASTR_WSDL_URL,
+    max_connections=100,
+    timeout=60,
+    operation_timeout=600,
+    connect_timeout=30,
+    plugins=None,
+):
+    """
+    Asynchronous counterpart of `_mastr_bindings` based on `zeep.AsyncClient`
+
+    Parameters
+    ----------
+    service_port : str
+        See `_mastr_bindings`.
+    service_name : str
+        See `_mastr_bindings`.
+    wsdl : str
+        See `_mastr_bindings`.
+    max_connections : int
+        Maximum number of concurrent HTTP connections. Parameter is passed to
+        `httpx.Limits`.
+    timeout : int
+        Timeout for loading wsdl and xsd documents in seconds.
+    operation_timeout : int
+        Timeout for reading responses of API requests in seconds.
+    connect_timeout : int
+        Timeout for establishing connections for API requests in seconds.
+    plugins : list of zeep.Plugin, optional
+        Plugins that are passed to `zeep.AsyncClient`.
+
+    Returns
+    -------
+    zeep.transports.AsyncTransport : The transport that has to be closed after use
+    zeep.AsyncClient : The zeep AsyncClient
+    zeep.AsyncClient.bind : AsyncServiceProxy bindings for given :attr:`service_name`
+        and :attr:`service_port`
+    """
+    try:
+        import httpx
+    except ImportError as e:
+        raise ImportError(
+            "The asynchronous MaStR SOAP API client requires httpx. "
+            "Install it with `pip install open_mastr[async]`."
+        ) from e
+
+    limits = httpx.Limits(
+        max_connections=max_connections, max_keepalive_connections=max_connections
+    )
+    transport = AsyncTransport(
+        client=httpx.AsyncClient(
+            limits=limits,
+            timeout=httpx.Timeout(operation_timeout, connect=connect_timeout),
+            follow_redirects=True,
+        ),
+        wsdl_client=httpx.Client(timeout=timeout, follow_redirects=True),
+        cache=_wsdl_cache(),
+    )
+    settings = Settings(strict=False, xml_huge_tree=True)
+    client = AsyncClient(
+        wsdl=_wsdl_document(wsdl, transport, settings),
+        transport=transport,
+        settings=settings,
+        plugins=plugins,
+    )
+    client_bind = client.bind(service_name, service_port)
+
+    _mastr_suppress_parsing_errors(["parse-time-second"])
+
+    return transport, client, client_bind
+
+
 def _mastr_suppress_parsing_errors(which_errors):
     """
     Install logging filters into zeep type parsing modules to suppress
@@ -396,6 +1165,48 @@ def flatten_dict(data: list, serialize_with_json: bool = False) -> list:
     return data
 
 
+def _append_to_csv(data_frame, csv_file, columns):
+    """
+    Append `data_frame` to `csv_file`
+
+    The file is created with a header if it does not exist. If `data_frame` has
+    columns that are not in the header of the file yet, the file is rewritten
+    chunk-wise with the extended header.
+
+    Parameters
+    ----------
+    data_frame : pd.DataFrame
+        Data appended to the file including its index.
+    csv_file : str
+        Path of the CSV file.
+    columns : list of str
+        Columns of the header of `csv_file`, empty if it does not exist yet.
+
+    Returns
+    -------
+    list of str
+        Columns of the header of `csv_file`.
+    """
+    data_frame = data_frame.reset_index()
+    new_columns = [column for column in data_frame.columns if column not in columns]
+    if new_columns and columns:
+        tmp_file = f"{csv_file}.tmp"
+        chunks = pd.read_csv(
+            csv_file, chunksize=10000, dtype=str, keep_default_na=False
+        )
+        for i, chunk in enumerate(chunks):
+            chunk.reindex(columns=columns + new_columns).to_csv(
+                tmp_file, mode="a" if i else "w", header=not i, index=False
+            )
+        os.replace(tmp_file, csv_file)
+    columns = columns + new_columns
+
+    data_frame.reindex(columns=columns).to_csv(
+        csv_file, mode="a", header=not os.path.exists(csv_file), index=False
+    )
+    return columns
+
+
 def _missed_units_to_file(data, data_type, missed_units):
     """
     Write IDs of missed units to file
@@ -421,6 +1232,44 @@ def _missed_units_to_file(data, data_type, missed_units):
             f.write(f"{i},{error}\n")
 
 
+# Additional data of power plants: type, data descriptor, ID key of basic units,
+# download function, column joined on and suffix of its columns
+POWER_PLANT_ADDITIONAL_DATA = [
+    (
+        "extended",
+        "unit_data",
+        "EinheitMastrNummer",
+        "extended_unit_data",
+        "EinheitMastrNummer",
+        "_unit",
+    ),
+    (
+        "eeg",
+        "eeg_data",
+        "EegMastrNummer",
+        "eeg_unit_data",
+        "VerknuepfteEinheit",
+        "_eeg",
+    ),
+    (
+        "kwk",
+        "kwk_data",
+        "KwkMastrNummer",
+        "kwk_unit_data",
+        "VerknuepfteEinheiten",
+        "_kwk",
+    ),
+    (
+        "permit",
+        "permit_data",
+        "GenMastrNummer",
+        "permit_unit_data",
+        "VerknuepfteEinheiten",
+        "_permit",
+    ),
+]
+
+
 class MaStRDownload:
     """
     !!! warning
@@ -443,8 +1292,8 @@ class MaStRDownload:
         mastr_dl = MaStRDownload()
 
         for tech in ["nuclear", "hydro", "wind", "solar", "biomass", "combustion", "gsgk"]:
-            power_plants = mastr_dl.download_power_plants(tech, limit=10)
-            print(power_plants.head())
+            csv_file = mastr_dl.download_power_plants(tech, limit=10)
+            print(pd.read_csv(csv_file).head())
     ```
 
     !!! warning
@@ -454,17 +1303,29 @@ class MaStRDownload:
 
     """
 
-    def __init__(self, parallel_processes=None):
+    def __init__(
+        self, parallel_processes=None, mastr_api=None, concurrent_requests=None
+    ):
         """
 
         Parameters
         ----------
-        parallel_processes : int or bool, optional
-            Specify number of parallel unit data download, respectively
-            the number of processes you want to use for downloading.
-            For single-process download (avoiding the use of python
-            multiprocessing package) choose False.
-            Defaults to number of cores (including hyperthreading).
+        parallel_processes : int or "max" or None, optional
+            Number of worker threads used to download additional unit data in
+            parallel. Each thread uses its own
+            [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI] instance.
+            If set to "max", the number of cores (including hyperthreading) is used.
+            Defaults to `None` which downloads one unit after another.
+        concurrent_requests : int, optional
+            Number of requests for additional data that are in flight at the
+            same time. If given, additional data is downloaded with
+            [`AsyncMaStRAPI`][open_mastr.soap_api.download.AsyncMaStRAPI] in a
+            single process instead of using `parallel_processes`.
+            Requires the optional dependency `httpx`. Defaults to `None`.
+        mastr_api : MaStRAPI, optional
+            API wrapper used for all requests. Defaults to a
+            [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI] instance
+            with the credentials from `credentials.cfg`.
         """
         log.warning(
             """
@@ -483,95 +1344,9 @@ class MaStRDownload:
             self.parallel_processes = multiprocessing.cpu_count()
         else:
             self.parallel_processes = parallel_processes
+        self.concurrent_requests = concurrent_requests
 
-        # Specify which additional data for each unit type is available
-        # and which SOAP service has to be used to query it
-        self._unit_data_specs = {
-            "biomass": {
-                "unit_data": "GetEinheitBiomasse",
-                "energietraeger": ["Biomasse"],
-                "kwk_data": "GetAnlageKwk",
-                "eeg_data": "GetAnlageEegBiomasse",
-                "permit_data": "GetEinheitGenehmigung",
-            },
-            "combustion": {
-                "unit_data": "GetEinheitVerbrennung",
-                "energietraeger": [
-                    "Steinkohle",
-                    "Braunkohle",
-                    "Erdgas",
-                    "AndereGase",
-                    "Mineraloelprodukte",
-                    "NichtBiogenerAbfall",
-                    "Waerme",
-                ],
-                "kwk_data": "GetAnlageKwk",
-                "permit_data": "GetEinheitGenehmigung",
-            },
-            "gsgk": {
-                "unit_data": "GetEinheitGeothermieGrubengasDruckentspannung",
-                "energietraeger": [
-                    "Geothermie",
-                    "Solarthermie",
-                    "Grubengas",
-                    "Klaerschlamm",
-                ],
-                "kwk_data": "GetAnlageKwk",
-                "eeg_data": "GetAnlageEegGeothermieGrubengasDruckentspannung",
-                "permit_data": "GetEinheitGenehmigung",
-            },
-            "nuclear": {
-                "unit_data": "GetEinheitKernkraft",
-                "energietraeger": ["Kernenergie"],
-                "permit_data": "GetEinheitGenehmigung",
-            },
-            "solar": {
-                "unit_data": "GetEinheitSolar",
-                "energietraeger": ["SolareStrahlungsenergie"],
-                "eeg_data": "GetAnlageEegSolar",
-                "permit_data": "GetEinheitGenehmigung",
-            },
-            "wind": {
-                "unit_data": "GetEinheitWind",
-                "energietraeger": ["Wind"],
-                "eeg_data": "GetAnlageEegWind",
-                "permit_data": "GetEinheitGenehmigung",
-            },
-            "hydro": {
-                "unit_data": "GetEinheitWasser",
-                "energietraeger": ["Wasser"],
-                "eeg_data": "GetAnlageEegWasser",
-                "permit_data": "GetEinheitGenehmigung",
-            },
-            "storage": {
-                "unit_data": "GetEinheitStromSpeicher",
-                "energietraeger": ["Speicher"],
-                "eeg_data": "GetAnlageEegSpeicher",
-                # todo: additional data request not created for permit, create manually
-                "permit_data": "GetEinheitGenehmigung",
-            },
-            "gas_storage": {
-                "unit_data": "GetEinheitGasSpeicher",
-                "energietraeger": ["Speicher"],
-            },
-            # TODO: unsure if energietraeger Ergdas makes sense
-            "gas_consumer": {
-                "unit_data": "GetEinheitGasVerbraucher",
-                "energietraeger": ["Erdgas"],
-            },
-            "electricity_consumer": {
-                "unit_data": "GetEinheitStromVerbraucher",
-                "energietraeger": ["Strom"],
-            },
-            "gas_producer": {
-                "unit_data": "GetEinheitGasErzeuger",
-                "energietraeger": [None],
-            },
-            "location_elec_generation": "GetLokationStromErzeuger",
-            "location_elec_consumption": "GetLokationStromVerbraucher",
-            "location_gas_generation": "GetLokationGasErzeuger",
-            "location_gas_consumption": "GetLokationGasVerbraucher",
-        }
+        self._unit_data_specs = UNIT_DATA_SPECS
 
         # Map additional data to primary key via data_fcn
         self._additional_data_primary_key = {
@@ -582,11 +1357,23 @@ class MaStRDownload:
             "location_data": "MastrNummer",
         }
 
-        # Check if MaStR credentials are available and otherwise ask
-        # for user input
-        self._mastr_api = MaStRAPI()
-        self._mastr_api._user = cred.check_and_set_mastr_user()
-        self._mastr_api._key = cred.check_and_set_mastr_token(self._mastr_api._user)
+        # Request parameter and type of additional data for each download method
+        self._additional_data_request = {
+            "extended_unit_data": ("einheitMastrNummer", "unit_data"),
+            "eeg_unit_data": ("eegMastrNummer", "eeg_data"),
+            "kwk_unit_data": ("kwkMastrNummer", "kwk_data"),
+            "permit_unit_data": ("genMastrNummer", "permit_data"),
+            "location_data": ("lokationMastrNummer", None),
+        }
+
+        if mastr_api is not None:
+            self._mastr_api = mastr_api
+        else:
+            # Check if MaStR credentials are available and otherwise ask
+            # for user input
+            self._mastr_api = MaStRAPI()
+            self._mastr_api._user = cred.check_and_set_mastr_user()
+            self._mastr_api._key = cred.check_and_set_mastr_token(self._mastr_api._user)
 
     def download_power_plants(self, data, limit=None):
         """
@@ -623,8 +1410,13 @@ class MaStRDownload:
 
         Returns
         -------
-        pd.DataFrame
-            Joined data tables.
+        str
+            Path of the CSV file with joined data tables.
+
+        Units are processed page by page: additional data of each page of basic
+        units is downloaded, joined and appended to the CSV file before the next
+        page is processed. Hence, memory usage does not grow with the number of
+        units.
         """
         # Create data version directory
         create_data_dir()
@@ -632,99 +1424,77 @@ class MaStRDownload:
         # Check requests contingent
         self.daily_contingent()
 
-        # Retrieve basic power plant unit data
-        # The return value is casted into a list, because a generator gets returned
-        # This was introduced later, after creation of this method
-        units = [
-            unit
-            for sublist in self.basic_unit_data(data=data, limit=limit)
-            for unit in sublist
-        ]
-
-        # Prepare list of unit ID for different additional data (extended, eeg, kwk, permit)
-        mastr_ids = self._create_ID_list(units, "unit_data", "EinheitMastrNummer", data)
-        eeg_ids = self._create_ID_list(units, "eeg_data", "EegMastrNummer", data)
-        kwk_ids = self._create_ID_list(units, "kwk_data", "KwkMastrNummer", data)
-        permit_ids = self._create_ID_list(units, "permit_data", "GenMastrNummer", data)
-
-        # Download additional data for unit
-        extended_data, extended_missed = self.additional_data(
-            data, mastr_ids, "extended_unit_data"
+        csv_file = os.path.join(
+            get_data_version_dir(), get_filenames()["raw"][data]["joined"]
         )
-        if eeg_ids:
-            eeg_data, eeg_missed = self.additional_data(data, eeg_ids, "eeg_unit_data")
-        else:
-            eeg_data = eeg_missed = []
-        if kwk_ids:
-            kwk_data, kwk_missed = self.additional_data(data, kwk_ids, "kwk_unit_data")
-        else:
-            kwk_data = kwk_missed = []
-        if permit_ids:
-            permit_data, permit_missed = self.additional_data(
-                data, permit_ids, "permit_unit_data"
-            )
-        else:
-            permit_data = permit_missed = []
-
-        # Retry missed additional unit data
-        if extended_missed:
-            (
-                extended_data_retry,
-                extended_missed_retry,
-            ) = self._retry_missed_additional_data(
-                data, [_[0] for _ in extended_missed], "extended_unit_data"
-            )
-            extended_data.extend(extended_data_retry)
-            _missed_units_to_file(data, "extended", extended_missed_retry)
-        if eeg_missed:
-            eeg_data_retry, eeg_missed_retry = self._retry_missed_additional_data(
-                data, [_[0] for _ in eeg_missed], "eeg_unit_data"
-            )
-            eeg_data.extend(eeg_data_retry)
-            _missed_units_to_file(data, "eeg", eeg_missed_retry)
-        if kwk_missed:
-            kwk_data_retry, kwk_missed_retry = self._retry_missed_additional_data(
-                data, [_[0] for _ in kwk_missed], "kwk_unit_data"
+        if os.path.exists(csv_file):
+            os.remove(csv_file)
+
+        # Only unit IDs are kept across pages to skip duplicates
+        downloaded_ids = set()
+        missed = {}
+        columns = []
+        for units in self.basic_unit_data(data=data, limit=limit or 10**8):
+            units = list(
+                {
+                    unit["EinheitMastrNummer"]: unit
+                    for unit in units
+                    if unit["EinheitMastrNummer"] not in downloaded_ids
+                }.values()
             )
-            kwk_data.extend(kwk_data_retry)
-            _missed_units_to_file(data, "kwk", kwk_missed_retry)
-        if permit_missed:
-            permit_data_retry, permit_missed_retry = self._retry_missed_additional_data(
-                data, [_[0] for _ in permit_missed], "permit_unit_data"
-            )
-            permit_data.extend(permit_data_retry)
-            _missed_units_to_file(data, "permit", permit_missed_retry)
-
-        # Flatten data
-        extended_data = flatten_dict(extended_data, serialize_with_json=True)
-        eeg_data = flatten_dict(eeg_data, serialize_with_json=True)
-        kwk_data = flatten_dict(kwk_data, serialize_with_json=True)
-        permit_data = flatten_dict(permit_data, serialize_with_json=True)
-
-        # Join data to a single dataframe
-        idx_cols = [
-            (units, "EinheitMastrNummer", ""),
-            (extended_data, "EinheitMastrNummer", "_unit"),
-            (eeg_data, "VerknuepfteEinheit", "_eeg"),
-            (kwk_data, "VerknuepfteEinheiten", "_kwk"),
-            (permit_data, "VerknuepfteEinheiten", "_permit"),
-        ]
+            if not units:
+                continue
+            downloaded_ids.update(unit["EinheitMastrNummer"] for unit in units)
 
-        joined_data = pd.DataFrame(idx_cols[0][0]).set_index(idx_cols[0][1])
+            joined_data, missed_units = self._download_power_plant_page(data, units)
+            for data_type, missed_type_units in missed_units.items():
+                missed.setdefault(data_type, []).extend(missed_type_units)
+            columns = _append_to_csv(joined_data, csv_file, columns)
+
+        for data_type, missed_units in missed.items():
+            _missed_units_to_file(data, data_type, missed_units)
+
+        log.info(f"Data of {len(downloaded_ids)} {data} units is saved to {csv_file}")
+        return csv_file
+
+    def _download_power_plant_page(self, data, units):
+        """
+        Downloads additional data of one page of basic `units` and joins it to
+        them. Returns the joined data and the units missed after retries per
+        type of additional data.
+        """
+        joined_data = pd.DataFrame(units).set_index("EinheitMastrNummer")
+        missed = {}
+        for (
+            data_type,
+            data_descriptor,
+            key,
+            data_fcn,
+            idx_col,
+            suffix,
+        ) in POWER_PLANT_ADDITIONAL_DATA:
+            ids = self._create_ID_list(units, data_descriptor, key, data)
+            if not ids:
+                continue
+            additional_data, missed_units = self.additional_data(data, ids, data_fcn)
+
+            # Retry missed additional unit data
+            if missed_units:
+                retried_data, missed[data_type] = self._retry_missed_additional_data(
+                    data, [_[0] for _ in missed_units], data_fcn
+                )
+                additional_data.extend(retried_data)
 
-        for dat, idx_col, suf in idx_cols[1:]:
-            # Make sure at least on non-empty dict is in dat
-            if any(dat):
+            additional_data = flatten_dict(additional_data, serialize_with_json=True)
+            # Make sure at least on non-empty dict is in additional_data
+            if any(additional_data):
                 joined_data = joined_data.join(
-                    pd.DataFrame(dat).set_index(idx_col), rsuffix=suf
+                    pd.DataFrame(additional_data).set_index(idx_col), rsuffix=suffix
                 )
 
         # Remove duplicates
         joined_data.drop_duplicates(inplace=True)
-
-        to_csv(joined_data, data)  # FIXME: reference to helpers im import
-
-        return joined_data
+        return joined_data, missed
 
     def _create_ID_list(self, units, data_descriptor, key, data):
         """Extracts a list of MaStR numbers (eeg, kwk, or permit Mastr Nr) from the given units."""
@@ -760,7 +1530,11 @@ class MaStRDownload:
             If specified, only units with latest change date newer than this are queried.
             Defaults to `None`.
         max_retries: int, optional
-            Maximum number of retries in case of errors with the connection to the server.
+            Deprecated and ignored. Retries are configured by the `retry_policy`
+            of [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI].
+
+        Pages of 2,000 units are downloaded by `parallel_processes` threads
+        concurrently.
 
         Yields
         ------
@@ -799,6 +1573,7 @@ class MaStRDownload:
                     max_retries,
                     data,
                     et=et,
+                    max_workers=self.parallel_processes or 1,
                 )
                 if et is None
                 else basic_data_download(
@@ -811,6 +1586,7 @@ class MaStRDownload:
                     max_retries,
                     data,
                     et=et,
+                    max_workers=self.parallel_processes or 1,
                 )
             )
 
@@ -842,7 +1618,10 @@ class MaStRDownload:
             * "permit_unit_data" (:meth:`~.permit_unit_data`): Information about the permit
               process of a unit.
         timeout: int, optional
-            Timeout limit for data retrieval for each unit when using multiprocessing. Defaults to 10.
+            Timeout limit in seconds for the request of each unit when using
+            `parallel_processes` or `concurrent_requests`. Timed out requests are
+            retried by the `retry_policy` of the
+            [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI]. Defaults to 10.
 
         Returns
         -------
@@ -860,8 +1639,12 @@ class MaStRDownload:
 
         # Prepare results lists
 
-        if self.parallel_processes:
-            data, data_missed = self._retrieve_data_in_parallel_process(
+        if self.concurrent_requests:
+            data, data_missed = _run_coroutine(
+                self._retrieve_data_concurrently(prepared_args, data_fcn, data, timeout)
+            )
+        elif self.parallel_processes:
+            data, data_missed = self._retrieve_data_in_parallel_threads(
                 prepared_args, data_fcn, data, timeout
             )
         else:
@@ -874,11 +1657,10 @@ class MaStRDownload:
         data_missed = [dat for dat in data_missed if dat]
 
         # Add units missed due to timeout to data_missed
-        units_retrieved = [_[self._additional_data_primary_key[data_fcn]] for _ in data]
+        units_accounted = {_[self._additional_data_primary_key[data_fcn]] for _ in data}
+        units_accounted.update(_[0] for _ in data_missed)
         units_missed_timeout = [
-            (u, "Timeout")
-            for u in unit_ids
-            if u not in units_retrieved + [_[0] for _ in data_missed]
+            (u, "Timeout") for u in unit_ids if u not in units_accounted
         ]
         data_missed += units_missed_timeout
 
@@ -905,27 +1687,51 @@ class MaStRDownload:
 
         return data_list, data_missed_list
 
-    def _retrieve_data_in_parallel_process(
+    def _retrieve_data_in_parallel_threads(
         self, prepared_args, data_fcn, data, timeout
     ):
         data_list = []
         data_missed_list = []
-        with multiprocessing.Pool(
-            processes=self.parallel_processes, maxtasksperchild=1
-        ) as pool:
-            with tqdm(
+        worker = threading.local()
+        copies = []
+
+        def initialize_worker():
+            # zeep clients are not thread-safe, hence each worker thread gets its
+            # own client. The timeout applies to each single request.
+            worker.mastr_api = self._mastr_api.copy(operation_timeout=timeout)
+            copies.append(worker.mastr_api)
+
+        def retrieve(unit_specs):
+            return self._additional_data_in_thread(
+                worker.mastr_api, data_fcn, unit_specs
+            )
+
+        unit_specs_iter = iter(prepared_args)
+        # Limit the number of pending futures to keep memory usage constant
+        max_pending = self.parallel_processes * 4
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.parallel_processes, initializer=initialize_worker
+            ) as executor, tqdm(
                 total=len(prepared_args),
                 desc=f"Downloading {data_fcn} ({data})",
                 unit="unit",
             ) as pbar:
-                unit_result = pool.imap_unordered(
-                    self.__getattribute__(data_fcn), prepared_args, chunksize=1
-                )
+                pending = {}
                 while True:
-                    try:
-                        # Try to retrieve data from concurrent processes
-                        data_tmp, data_missed_tmp = unit_result.next(timeout=timeout)
+                    for unit_specs in islice(
+                        unit_specs_iter, max_pending - len(pending)
+                    ):
+                        pending[executor.submit(retrieve, unit_specs)] = unit_specs
+                    if not pending:
+                        break
 
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        unit_specs = pending.pop(future)
+                        # Timeouts are final here, they are already retried by the
+                        # retry policy of the worker's MaStRAPI
+                        data_tmp, data_missed_tmp = future.result()
                         if not data_tmp:
                             log.debug(
                                 f"Download for additional data for "
@@ -935,14 +1741,110 @@ class MaStRDownload:
                         data_list.append(data_tmp)
                         data_missed_list.append(data_missed_tmp)
                         pbar.update()
-                    except StopIteration:
-                        # Multiprocessing returns StropIteration when results list gets empty
-                        break
-                    except multiprocessing.TimeoutError:
-                        # If retrieval time exceeds timeout of next(), pass on
-                        log.debug(f"Data request for 1 {data} unit timed out")
+        finally:
+            # Return the accounts of the worker threads to the credential pool
+            for copy in copies:
+                copy.close()
         return data_list, data_missed_list
 
+    def _additional_data_in_thread(self, mastr_api, data_fcn, specs):
+        """
+        Counterpart of the methods for additional data, like
+        [`extended_unit_data`][open_mastr.soap_api.download.MaStRDownload.extended_unit_data],
+        that uses the MaStRAPI instance of a worker thread
+
+        Returns
+        -------
+        dict
+            Additional data, if download successful, otherwise empty dict
+        tuple
+            MaStR number and message the explains why a download failed.
+        """
+        mastr_id = specs[0]
+        soap_function, parameters = self._additional_data_query(data_fcn, specs)
+        try:
+            return getattr(mastr_api, soap_function)(**parameters), None
+        except (
+            XMLParseError,
+            Fault,
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+        ) as e:
+            return {}, MissedRequest(mastr_id, e)
+
+    def _additional_data_query(self, data_fcn, specs):
+        """Name of SOAP function and its parameters to query additional data."""
+        mastr_id, data = specs
+        parameter, data_type = self._additional_data_request[data_fcn]
+        soap_function = (
+            self._unit_data_specs[data][data_type]
+            if data_type
+            else self._unit_data_specs[data]
+        )
+        return soap_function, {parameter: mastr_id}
+
+    async def _retrieve_data_concurrently(self, prepared_args, data_fcn, data, timeout):
+        data_list = []
+        data_missed_list = []
+        # Bounds the number of requests in flight and the number of pending tasks
+        semaphore = asyncio.Semaphore(self.concurrent_requests)
+
+        # The timeout applies to each HTTP request, not to the time a request waits
+        # for the rate limiter or for the backoff of the retry policy
+        async with self._mastr_api.async_api(
+            max_connections=self.concurrent_requests, operation_timeout=timeout
+        ) as mastr_api:
+            with tqdm(
+                total=len(prepared_args),
+                desc=f"Downloading {data_fcn} ({data})",
+                unit="unit",
+            ) as pbar:
+
+                async def retrieve(unit_specs):
+                    try:
+                        data_tmp, data_missed_tmp = await self._async_additional_data(
+                            mastr_api, data_fcn, unit_specs
+                        )
+                    finally:
+                        semaphore.release()
+                    if not data_tmp:
+                        log.debug(
+                            f"Download for additional data for "
+                            f"{data_missed_tmp[0]} ({data}) failed. "
+                            f"Traceback of caught error:\n{data_missed_tmp[1]}"
+                        )
+                    data_list.append(data_tmp)
+                    data_missed_list.append(data_missed_tmp)
+                    pbar.update()
+
+                tasks = set()
+                for unit_specs in prepared_args:
+                    await semaphore.acquire()
+                    task = asyncio.ensure_future(retrieve(unit_specs))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                await asyncio.gather(*tasks)
+
+        return data_list, data_missed_list
+
+    async def _async_additional_data(self, mastr_api, data_fcn, specs):
+        """
+        Asynchronous counterpart of the methods for additional data, like
+        [`extended_unit_data`][open_mastr.soap_api.download.MaStRDownload.extended_unit_data]
+        """
+        import httpx
+
+        mastr_id = specs[0]
+        soap_function, parameters = self._additional_data_query(data_fcn, specs)
+        try:
+            additional_data = await getattr(mastr_api, soap_function)(**parameters)
+            missed = None
+        except (XMLParseError, Fault, httpx.HTTPError) as e:
+            additional_data = {}
+            missed = MissedRequest(mastr_id, e)
+
+        return additional_data, missed
+
     def extended_unit_data(self, unit_specs):
         """
         Download extended data for a unit.
@@ -989,7 +1891,7 @@ class MaStRDownload:
             #     f"Failed to download unit data for {mastr_id} because of SOAP API exception: {e}",
             #     exc_info=False)
             unit_data = {}
-            unit_missed = (mastr_id, repr(e))
+            unit_missed = MissedRequest(mastr_id, e)
 
         return unit_data, unit_missed
 
@@ -1038,7 +1940,7 @@ class MaStRDownload:
             #     f"Failed to download eeg data for {eeg_id} because of SOAP API exception: {e}",
             #     exc_info=False)
             eeg_data = {}
-            eeg_missed = (eeg_id, repr(e))
+            eeg_missed = MissedRequest(eeg_id, e)
 
         return eeg_data, eeg_missed
 
@@ -1090,7 +1992,7 @@ class MaStRDownload:
             #     f"Failed to download unit data for {kwk_id} because of SOAP API exception: {e}",
             #     exc_info=False)
             kwk_data = {}
-            kwk_missed = (kwk_id, repr(e))
+            kwk_missed = MissedRequest(kwk_id, e)
 
         return kwk_data, kwk_missed
 
@@ -1139,7 +2041,7 @@ class MaStRDownload:
             #     f"because of SOAP API exception: {e}",
             #     exc_info=False)
             permit_data = {}
-            permit_missed = (permit_id, repr(e))
+            permit_missed = MissedRequest(permit_id, e)
 
         return permit_data, permit_missed
 
@@ -1189,7 +2091,7 @@ class MaStRDownload:
             requests.exceptions.ReadTimeout,
         ) as e:
             data = {}
-            missed = (location_id, repr(e))
+            missed = MissedRequest(location_id, e)
 
         return data, missed
 
@@ -1197,7 +2099,12 @@ class MaStRDownload:
         """
         Retry to download extended data that was missed earlier.
 
-        Tries three times (default) to download data.
+        Tries three times (default) to download data. Between the tries, it
+        waits as long as the `retry_policy` of the
+        [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI] waits between
+        retries of a single request. Units missed because of rejected credentials
+        or timeouts are not requested again, as the retry policy decides whether
+        timed out requests are retried.
 
         Parameters
         ----------
@@ -1221,21 +2128,27 @@ class MaStRDownload:
             f"{data} units with {retries} retries"
         )
 
-        data = []
+        retrieved_data = []
+        retry_policy = self._mastr_api.retry_policy
 
         missed_ids_remaining = missed_ids
-        for _ in range(1, retries + 1):
+        missed_ids_tmp = []
+        for retry in range(retries):
+            if retry:
+                time.sleep(retry_policy.delay(retry))
             data_tmp, missed_ids_tmp = self.additional_data(
                 data, missed_ids_remaining, data_fcn
             )
             if data_tmp:
-                data.extend(data_tmp)
-            missed_ids_remaining = [_[0] for _ in missed_ids_tmp]
+                retrieved_data.extend(data_tmp)
+            # Units missed because of rejected credentials are not retried. Timed out
+            # requests were already retried as far as the retry policy allows
+            missed_ids_remaining = [_[0] for _ in missed_ids_tmp if not _is_final(_)]
 
             if not any(missed_ids_remaining):
                 break
 
-        return data, missed_ids_tmp
+        return retrieved_data, missed_ids_tmp
 
     def basic_location_data(self, limit=2000, date_from=None, max_retries=3):
         """
@@ -1260,8 +2173,8 @@ class MaStRDownload:
         date_from: `datetime.datetime`, optional
             If specified, only locations with latest change date newer than this are queried.
         max_retries: int, optional
-            Maximum number of retries for each chunk in case of errors with the connection to
-            the server.
+            Deprecated and ignored. Retries are configured by the `retry_policy`
+            of [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI].
 
         Yields
         ------
@@ -1296,6 +2209,7 @@ class MaStRDownload:
             limits,
             date_from,
             max_retries,
+            max_workers=self.parallel_processes or 1,
         )
 
     def daily_contingent(self):
@@ -1307,6 +2221,17 @@ class MaStRDownload:
         )
 
 
+def _run_coroutine(coroutine):
+    """Run `coroutine` to completion, also from within a running event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    # e.g. in Jupyter notebooks, run it in a separate thread with its own loop
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
 def basic_data_download(
     mastr_api,
     fcn_name,
@@ -1317,6 +2242,7 @@ def basic_data_download(
     max_retries,
     data=None,
     et=None,
+    max_workers=1,
 ):
     """
     Helper function for downloading basic data with MaStR list query
@@ -1328,6 +2254,12 @@ def basic_data_download(
     * stops, if no further data is available
     * nicely integrates dynamic update of tqdm progress bar
 
+    Pages are downloaded concurrently by `max_workers` threads, but yielded in
+    order. The number of units and the download time of each page are recorded to
+    the `metrics` of `mastr_api`. The first page is downloaded alone, such that small queries do not
+    request more pages than needed. No further pages are requested once a
+    response indicates that no further data is available.
+
     Parameters
     ----------
     mastr_api: :class:`MaStRAPI`
@@ -1345,13 +2277,17 @@ def basic_data_download(
     date_from: datetime.datetime
         Date for querying only newer data than this date
     max_retries: int
-        Number of maximum retries for each chunk
+        Deprecated and ignored. Retries are configured by the `retry_policy` of
+        `mastr_api`.
     data: str, optional
         Choose a subset from available technologies. Only relevant if category="Einheiten".
         Defaults to all technologies.
     et: str
         Energietraeger of a data type. Some technologies are subdivided into a list of
         energietraeger. Only relevant if category="Einheiten". Defaults to None.
+    max_workers: int, optional
+        Number of pages that are downloaded concurrently. Each thread uses a
+        copy of `mastr_api`. Defaults to 1.
 
     Yields
     ------
@@ -1368,65 +2304,121 @@ def basic_data_download(
 
     pbar = tqdm(desc=description, unit=" units")
 
-    # Iterate over chunks and download data
-    # Results are first collected per 'et' (units_tech) for properly
-    # displaying download progress.
-    # Later, all units of a single data are collected in 'units'
-    for chunk_start, limit_iter in zip(chunks_start, limits):
-        # Use a retry loop to retry on connection errors
-        for try_number in range(max_retries + 1):
-            try:
-                if et is None:
-                    response = getattr(mastr_api, fcn_name)(
-                        startAb=chunk_start, limit=limit_iter, datumAb=date_from
-                    )
-                else:
-                    response = getattr(mastr_api, fcn_name)(
-                        energietraeger=et,
-                        startAb=chunk_start,
-                        limit=limit_iter,
-                        datumAb=date_from,
-                    )
+    worker = threading.local()
+    copies = []
+
+    def initialize_worker():
+        # zeep clients are not thread-safe, hence each worker thread gets its own
+        worker.mastr_api = mastr_api.copy() if max_workers > 1 else mastr_api
+        if worker.mastr_api is not mastr_api:
+            copies.append(worker.mastr_api)
+
+    def download_page(chunk_start, limit_iter):
+        start = time.perf_counter()
+        response = _basic_data_page(
+            worker.mastr_api,
+            fcn_name,
+            chunk_start,
+            limit_iter,
+            date_from,
+            max_retries,
+            et,
+        )
+        metrics = getattr(worker.mastr_api, "metrics", None)
+        if metrics is not None:
+            metrics.observe_page(
+                fcn_name,
+                time.perf_counter() - start,
+                len(response[category] or []) if response is not None else None,
+            )
+        if (
+            response is not None
+            and response["Ergebniscode"] != "OkWeitereDatenVorhanden"
+        ):
+            no_further_data.set()
+        return response
 
-            except (
-                requests.exceptions.ConnectionError,
-                Fault,
-                requests.exceptions.ReadTimeout,
-            ) as e:
-                try_number += 1
-                log.debug(
-                    f"MaStR SOAP API does not respond properly: {e}. Retry {try_number}"
-                )
-                time.sleep(5)
-            else:
-                # If it does run into the except clause, break out of the for loop
-                # This also means query was successful
-                units_tech = response[category]
-                yield units_tech
-                pbar.update(len(units_tech))
+    no_further_data = threading.Event()
+    pages = iter(zip(chunks_start, limits))
+    pending = deque()
+    # Download the first page alone, afterwards up to `max_workers` pages at once
+    window = 1
+
+    executor = ThreadPoolExecutor(
+        max_workers=max_workers, initializer=initialize_worker
+    )
+    try:
+        while True:
+            # Schedule further pages unless the end of data is known
+            while len(pending) < window and not no_further_data.is_set():
+                page = next(pages, None)
+                if page is None:
+                    break
+                pending.append((*page, executor.submit(download_page, *page)))
+            if not pending:
                 break
-        else:
-            log.error(
-                f"Finally failed to download data."
-                f"Basic unit data of index {chunk_start} to "
-                f"{chunk_start + limit_iter - 1} will be missing."
-            )
-            # TODO: this has potential risk! Please change
-            # If the download continuously fails on the last chunk, this query will run forever
-            response = {"Ergebniscode": "OkWeitereDatenVorhanden"}
 
-        # Stop querying more data, if no further data available
-        if response["Ergebniscode"] == "OkWeitereDatenVorhanden":
-            continue
+            chunk_start, limit_iter, future = pending.popleft()
+            response = future.result()
+            window = max_workers
+
+            if response is None:
+                log.error(
+                    f"Finally failed to download data."
+                    f"Basic unit data of index {chunk_start} to "
+                    f"{chunk_start + limit_iter - 1} will be missing."
+                )
+                continue
 
-        # Update progress bar and move on with next et or data type
-        pbar.total = pbar.n
-        pbar.refresh()
+            units_tech = response[category]
+            yield units_tech
+            pbar.update(len(units_tech))
+
+            # Stop querying more data, if no further data available
+            if response["Ergebniscode"] != "OkWeitereDatenVorhanden":
+                pbar.total = pbar.n
+                pbar.refresh()
+                break
+    finally:
+        # Pages requested beyond the end of data are discarded
+        executor.shutdown(wait=True, cancel_futures=True)
+        for copy in copies:
+            copy.close()
+        # Make sure progress bar is closed properly
         pbar.close()
-        break
 
-    # Make sure progress bar is closed properly
-    pbar.close()
+
+def _basic_data_page(
+    mastr_api, fcn_name, chunk_start, limit_iter, date_from, max_retries, et
+):
+    """
+    Download one page of a MaStR list query, see `basic_data_download`
+
+    `max_retries` is ignored, retries are configured by the `retry_policy` of
+    `mastr_api`.
+
+    Returns
+    -------
+    dict or None
+        Response of the list query or None, if all retries failed.
+    """
+    # Temporary errors are retried by the retry policy of `mastr_api`
+    try:
+        if et is None:
+            return getattr(mastr_api, fcn_name)(
+                startAb=chunk_start, limit=limit_iter, datumAb=date_from
+            )
+        return getattr(mastr_api, fcn_name)(
+            energietraeger=et,
+            startAb=chunk_start,
+            limit=limit_iter,
+            datumAb=date_from,
+        )
+    except CredentialsRejected:
+        raise
+    except RETRYABLE_ERRORS as e:
+        log.warning(f"MaStR SOAP API does not respond properly: {e}. Skip page.")
+    return None
 
 
 if __name__ == "__main__":
@@ -6,7 +6,7 @@ import uuid
 
 from open_mastr.soap_api.metadata.description import DataDescription
 from open_mastr.utils.config import get_data_config, get_filenames, column_renaming
-from open_mastr.soap_api.download import MaStRDownload
+from open_mastr.soap_api.download import UNIT_DATA_SPECS
 
 
 # TODO: We should not describe the data in both metadata folder and orm.py
@@ -217,13 +217,13 @@ def create_datapackage_meta_json(
     )
 
     table_columns = DataDescription().functions_data_documentation()
-    mastr_dl = MaStRDownload()
 
     # Filter specified technologies
-    if technologies:
-        unit_data_specs = {
-            k: v for k, v in mastr_dl._unit_data_specs.items() if k in technologies
-        }
+    unit_data_specs = {
+        k: dict(v)
+        for k, v in UNIT_DATA_SPECS.items()
+        if isinstance(v, dict) and (not technologies or k in technologies)
+    }
 
     filenames = get_filenames()
 
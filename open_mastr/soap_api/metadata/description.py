@@ -1,10 +1,13 @@
 from io import BytesIO
+import os
 import re
 from urllib.request import urlopen
 from zipfile import ZipFile
 import xmltodict
 from collections import OrderedDict
 
+from open_mastr.utils.config import get_project_home_dir
+
 
 class DataDescription(object):
     """
@@ -24,7 +27,8 @@ class DataDescription(object):
         ----------
         xml: str or path-like, optional
             Path of local mastrbasetypes.xsd file. If not provided, file will
-            be downloaded from marktstammdatenregister.de
+            be downloaded from marktstammdatenregister.de once and cached in
+            `PROJECTHOME/cache/`.
         """
 
         # Read XML file
@@ -37,10 +41,23 @@ class DataDescription(object):
                 "https://www.marktstammdatenregister.de/MaStRHilfe/files/"
                 "webdienst/Dienstbeschreibung_1_2_39_Produktion.zip"
             )
+            # The file name of the zip file contains the version of the service
+            cached_xml = os.path.join(
+                get_project_home_dir(),
+                "cache",
+                f"{os.path.splitext(os.path.basename(zipurl))[0]}_mastrbasetypes.xsd",
+            )
 
-            with urlopen(zipurl) as zipresp:
-                with ZipFile(BytesIO(zipresp.read())) as zfile:
-                    self.xml = zfile.read("xsd/mastrbasetypes.xsd")
+            if os.path.isfile(cached_xml):
+                with open(cached_xml, "rb") as fh:
+                    self.xml = fh.read()
+            else:
+                with urlopen(zipurl) as zipresp:
+                    with ZipFile(BytesIO(zipresp.read())) as zfile:
+                        self.xml = zfile.read("xsd/mastrbasetypes.xsd")
+                os.makedirs(os.path.dirname(cached_xml), exist_ok=True)
+                with open(cached_xml, "wb") as fh:
+                    fh.write(self.xml)
 
         # Parse XML and extract relevant data
         parsed = xmltodict.parse(self.xml, process_namespaces=False)
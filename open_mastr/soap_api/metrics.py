@@ -0,0 +1,347 @@
+"""
+Measure requests to the MaStR SOAP API
+
+[`APIMetrics`][open_mastr.soap_api.metrics.APIMetrics] records the latency of each
+request per SOAP operation as histogram, the size of responses, failed requests by
+error class and the request contingent used per hour. Pages of basic unit lists are
+recorded with their number of units and download time. Hence, it can be told
+whether a slow download is caused by the latency of the MaStR, by retries or by
+writing to the database.
+
+Metrics are written to sinks, e.g. a [`JSONSink`][open_mastr.soap_api.metrics.JSONSink]
+or a [`PrometheusTextfileSink`][open_mastr.soap_api.metrics.PrometheusTextfileSink].
+Any object with a method `write(summary)` can be used as sink.
+
+SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+
+import bisect
+import collections
+import datetime
+import json
+import math
+import os
+import threading
+
+import requests
+from zeep.exceptions import Fault, TransportError, XMLParseError
+
+from open_mastr.utils.config import setup_logger
+
+log = setup_logger()
+
+# Upper bounds of latency histogram buckets in seconds
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def error_class(error) -> str:
+    """Class of the error a request failed with, as used in the metrics."""
+    if isinstance(error, requests.exceptions.Timeout):
+        return "timeout"
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return "connection"
+    if isinstance(error, Fault):
+        return "fault"
+    if isinstance(error, (TransportError, XMLParseError)):
+        return "invalid_response"
+    # Errors of the asyncio client, see AsyncMaStRAPI
+    if type(error).__module__.startswith("httpx"):
+        return "timeout" if "Timeout" in type(error).__name__ else "connection"
+    return "other"
+
+
+class APIMetrics:
+    """
+    Thread-safe metrics of requests to the MaStR SOAP API
+
+    Each [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI] records its requests
+    to its `metrics`, which all of its copies share. Write them to sinks once the
+    download is done
+
+    ```python
+
+        mastr_api = MaStRAPI()
+        ...
+        mastr_api.metrics.write([JSONSink("api_metrics.json")])
+    ```
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, clock=None):
+        """
+        Parameters
+        ----------
+        buckets : tuple of float, optional
+            Upper bounds of latency histogram buckets in seconds.
+            Defaults to `LATENCY_BUCKETS`.
+        clock : callable, optional
+            Returns the current time as `datetime.datetime`. Used to assign
+            requests to hours. Defaults to `datetime.datetime.now`.
+        """
+        self.buckets = tuple(buckets)
+        self._clock = clock or datetime.datetime.now
+        self._lock = threading.Lock()
+        self._operations = {}
+        self._pages = {}
+        self._contingent = collections.Counter()
+
+    def observe(
+        self, operation, seconds, response_bytes=None, error=None, contingent=True
+    ):
+        """
+        Record one request.
+
+        Parameters
+        ----------
+        operation : str
+            Name of the SOAP operation, e.g. "GetEinheitSolar".
+        seconds : float
+            Time until the response was received or the request failed.
+        response_bytes : int, optional
+            Size of the response body. Defaults to `None` which means unknown.
+        error : Exception, optional
+            Error the request failed with. Defaults to `None`.
+        contingent : bool, optional
+            If True, the request counts against the daily request contingent.
+            Defaults to True.
+        """
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        hour = self._clock().strftime("%Y-%m-%dT%H:00") if contingent else None
+        with self._lock:
+            stats = self._operations.get(operation)
+            if stats is None:
+                stats = self._operations[operation] = {
+                    "requests": 0,
+                    "latency_counts": [0] * (len(self.buckets) + 1),
+                    "latency_sum": 0.0,
+                    "response_bytes": 0,
+                    "responses_with_size": 0,
+                    "errors": collections.Counter(),
+                }
+            stats["requests"] += 1
+            stats["latency_counts"][bucket] += 1
+            stats["latency_sum"] += seconds
+            if response_bytes is not None:
+                stats["response_bytes"] += response_bytes
+                stats["responses_with_size"] += 1
+            if error is not None:
+                stats["errors"][error_class(error)] += 1
+            if hour is not None:
+                self._contingent[hour] += 1
+
+    def observe_page(self, operation, seconds, units=None):
+        """
+        Record one page of a list of basic units or locations.
+
+        Parameters
+        ----------
+        operation : str
+            Name of the SOAP operation, e.g. "GetGefilterteListeStromErzeuger".
+        seconds : float
+            Time the page took including retries.
+        units : int, optional
+            Number of units of the page. Defaults to `None` which means the page
+            could not be downloaded.
+        """
+        with self._lock:
+            stats = self._pages.setdefault(
+                operation, {"pages": 0, "failed": 0, "units": 0, "seconds": 0.0}
+            )
+            stats["pages"] += 1
+            stats["seconds"] += seconds
+            if units is None:
+                stats["failed"] += 1
+            else:
+                stats["units"] += units
+
+    def summary(self) -> dict:
+        """
+        Metrics of all requests so far.
+
+        Returns
+        -------
+        dict
+            Per operation the number of requests, failed requests by error class,
+            the cumulative latency histogram and the size of responses. Further,
+            pages of lists per operation and the requests per hour that count
+            against the contingent.
+        """
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        with self._lock:
+            operations = {}
+            for operation, stats in sorted(self._operations.items()):
+                cumulative = 0
+                histogram = {}
+                for bound, count in zip(bounds, stats["latency_counts"]):
+                    cumulative += count
+                    histogram[bound] = cumulative
+                operations[operation] = {
+                    "requests": stats["requests"],
+                    "errors": dict(stats["errors"]),
+                    "latency_seconds": {
+                        "sum": round(stats["latency_sum"], 6),
+                        "mean": round(stats["latency_sum"] / stats["requests"], 6),
+                        "buckets": histogram,
+                    },
+                    "response_bytes": {
+                        "sum": stats["response_bytes"],
+                        "count": stats["responses_with_size"],
+                    },
+                }
+            pages = {
+                operation: dict(stats, seconds=round(stats["seconds"], 6))
+                for operation, stats in sorted(self._pages.items())
+            }
+            contingent = dict(sorted(self._contingent.items()))
+        return {
+            "operations": operations,
+            "pages": pages,
+            "contingent_per_hour": contingent,
+        }
+
+    def write(self, sinks, **extra):
+        """
+        Write the summary to each of `sinks`.
+
+        Parameters
+        ----------
+        sinks : list
+            Objects with a method `write(summary)`.
+        **extra
+            Further entries of the summary, e.g. `retries` with the
+            [`RetryPolicy.metrics`][open_mastr.soap_api.retry.RetryPolicy.metrics].
+        """
+        summary = self.summary()
+        summary.update(extra)
+        for sink in sinks:
+            sink.write(summary)
+
+
+class JSONSink:
+    """Writes the metrics summary to a JSON file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, summary):
+        with open(self.path, "w") as f:
+            json.dump(summary, f, indent=2)
+        log.info(f"API metrics are saved to {self.path}")
+
+
+class PrometheusTextfileSink:
+    """
+    Writes the metrics summary in the Prometheus text format
+
+    Point the textfile collector of the Prometheus node exporter to the directory
+    of `path`. The file is replaced atomically, such that the collector never reads
+    a partially written file.
+    """
+
+    def __init__(self, path, prefix="open_mastr_api"):
+        self.path = path
+        self.prefix = prefix
+
+    def write(self, summary):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.render(summary))
+        os.replace(tmp_path, self.path)
+        log.info(f"API metrics are saved to {self.path}")
+
+    def render(self, summary) -> str:
+        """Metrics of `summary` in the Prometheus text format."""
+        lines = []
+
+        def metric(name, metric_type, help_text, samples):
+            name = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for suffix, labels, value in samples:
+                label_text = ",".join(
+                    f'{key}="{_escape(label)}"' for key, label in labels.items()
+                )
+                if label_text:
+                    label_text = f"{{{label_text}}}"
+                lines.append(f"{name}{suffix}{label_text} {_number(value)}")
+
+        operations = summary.get("operations", {})
+        metric(
+            "request_duration_seconds",
+            "histogram",
+            "Latency of requests to the MaStR SOAP API.",
+            [
+                ("_bucket", {"operation": operation, "le": bound}, count)
+                for operation, stats in operations.items()
+                for bound, count in stats["latency_seconds"]["buckets"].items()
+            ]
+            + [
+                (suffix, {"operation": operation}, value)
+                for operation, stats in operations.items()
+                for suffix, value in [
+                    ("_sum", stats["latency_seconds"]["sum"]),
+                    ("_count", stats["requests"]),
+                ]
+            ],
+        )
+        metric(
+            "response_bytes_total",
+            "counter",
+            "Size of responses of the MaStR SOAP API.",
+            [
+                ("", {"operation": operation}, stats["response_bytes"]["sum"])
+                for operation, stats in operations.items()
+            ],
+        )
+        metric(
+            "errors_total",
+            "counter",
+            "Failed requests to the MaStR SOAP API by error class.",
+            [
+                ("", {"operation": operation, "error_class": error}, count)
+                for operation, stats in operations.items()
+                for error, count in stats["errors"].items()
+            ],
+        )
+        pages = summary.get("pages", {})
+        for name, help_text in [
+            ("pages", "Pages of lists downloaded from the MaStR SOAP API."),
+            ("failed", "Pages of lists that could not be downloaded."),
+            ("units", "Units of pages of lists."),
+            ("seconds", "Time spent downloading pages of lists."),
+        ]:
+            metric(
+                f"list_{name}_total",
+                "counter",
+                help_text,
+                [
+                    ("", {"operation": operation}, stats[name])
+                    for operation, stats in pages.items()
+                ],
+            )
+        metric(
+            "contingent_requests",
+            "gauge",
+            "Requests counting against the daily contingent per hour.",
+            [
+                ("", {"hour": hour}, count)
+                for hour, count in summary.get("contingent_per_hour", {}).items()
+            ],
+        )
+        for name, value in summary.get("retries", {}).items():
+            metric(
+                f"retry_{name}",
+                "gauge",
+                f"Value of {name} of the retry policy.",
+                [("", {}, value)],
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _escape(label):
+    return str(label).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf"
+    return str(value)
@@ -1,23 +1,52 @@
 import datetime
+import hashlib
+import json
+import math
 import os
 import pandas as pd
-from sqlalchemy import and_, func
-from sqlalchemy.sql import exists
+import sqlalchemy
+from sqlalchemy import func, or_, select, text, tuple_, update
 import shlex
+import socket
 import subprocess
+import threading
+import uuid
 from datetime import date
+from itertools import islice
 
 from open_mastr.utils.config import (
     setup_logger,
 )
 from open_mastr.soap_api.download import MaStRDownload, flatten_dict
+from open_mastr.soap_api.pipeline import Pipeline
+from open_mastr.soap_api.rate_limit import ContingentExhausted
 from open_mastr.utils import orm
-from open_mastr.utils.helpers import session_scope, reverse_unit_type_map
+from open_mastr.utils.helpers import (
+    bulk_upsert,
+    get_watermarks,
+    session_scope,
+    reverse_unit_type_map,
+    supports_returning,
+    unique_by_key,
+    update_watermarks,
+)
 
 from open_mastr.utils.constants import ORM_MAP, UNIT_TYPE_MAP
 
 log = setup_logger()
 
+# Fields of a basic unit that indicate a change of its additional data
+ADDITIONAL_DATA_FINGERPRINT_FIELDS = {
+    "unit_data": ["EinheitMastrNummer"],
+    "eeg_data": ["EegMastrNummer", "EinheitBetriebsstatus"],
+    "kwk_data": ["KwkMastrNummer", "EinheitBetriebsstatus"],
+    "permit_data": ["GenMastrNummer"],
+}
+
+# A request that is this many seconds newer gains the same priority as a unit with
+# ten times the capacity, see additional_data_request_priority
+PRIORITY_RECENCY_SECONDS = 30 * 24 * 3600
+
 
 class MaStRMirror:
     """
@@ -84,6 +113,16 @@ class MaStRMirror:
         engine,
         restore_dump=None,
         parallel_processes=None,
+        mastr_api=None,
+        concurrent_requests=None,
+        worker_id=None,
+        lease_duration=3600,
+        max_attempts=5,
+        skip_unchanged_additional_data=False,
+        additional_data_max_age=30,
+        archive=None,
+        technology_weights=None,
+        pipeline_depth=2,
     ):
         """
         Parameters
@@ -96,8 +135,56 @@ class MaStRMirror:
             Defaults to `None` which means nothing gets restored.
             Should be used in combination with `empty_schema=True`.
         parallel_processes: int
-            Number of parallel processes used to download additional data.
+            Number of parallel threads used to download additional data.
+            Defaults to `None`.
+        mastr_api: MaStRAPI, optional
+            API wrapper used for all requests, see
+            [`MaStRDownload`][open_mastr.soap_api.download.MaStRDownload].
+        concurrent_requests: int, optional
+            Number of concurrent requests used to download additional data, see
+            [`MaStRDownload`][open_mastr.soap_api.download.MaStRDownload].
             Defaults to `None`.
+        worker_id: str, optional
+            Identifies this instance when it claims requests for additional data.
+            Defaults to `None` which means hostname, process id and a random
+            suffix are used.
+        lease_duration: int, optional
+            Seconds a claimed request for additional data is reserved for this
+            instance. Afterwards, it is claimed again by any worker.
+            Defaults to 3600.
+        max_attempts: int, optional
+            Maximum number of times a request for additional data is claimed.
+            Defaults to 5.
+        skip_unchanged_additional_data: bool, optional
+            If True, `backfill_basic` does not request additional data again for
+            updated units if the fields of the basic unit the additional data
+            depends on are unchanged, see `ADDITIONAL_DATA_FINGERPRINT_FIELDS`.
+            Extended unit data is only requested again if the unit was updated
+            after the last download. Defaults to False.
+
+            Note that the fingerprints of EEG, KWK and permit data only consist of
+            fields of the basic unit. The basic unit does not tell when these
+            records were changed, so a changed record with unchanged fingerprint is
+            only requested again once its cache entry is older than
+            `additional_data_max_age`.
+        additional_data_max_age: int, optional
+            Days after which cached additional data is requested again even if it
+            seems unchanged, see `skip_unchanged_additional_data`. Defaults to 30.
+            `None` means cached additional data never expires.
+        archive: ResponseArchive, optional
+            If given, raw responses of additional unit data are saved to this
+            [`ResponseArchive`][open_mastr.soap_api.archive.ResponseArchive]
+            before they are flattened, see `~.reprocess`. Defaults to `None`.
+        technology_weights: dict, optional
+            Weight of the unit capacity in the priority of requests for additional
+            data per technology, e.g. `{"wind": 2, "solar": 0.5}`, see
+            `additional_data_request_priority`. Defaults to `None` which means a
+            weight of 1 for all technologies.
+        pipeline_depth: int, optional
+            Maximum number of chunks of additional data that wait between
+            fetching, flattening and writing, see
+            [`Pipeline`][open_mastr.soap_api.pipeline.Pipeline]. Written chunks
+            are committed at least every `pipeline_depth` chunks. Defaults to 2.
         """
         log.warning(
             """
@@ -112,9 +199,25 @@ class MaStRMirror:
         )
 
         self._engine = engine
+        self.worker_id = (
+            worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        self.lease_duration = lease_duration
+        self.max_attempts = max_attempts
+        self.skip_unchanged_additional_data = skip_unchanged_additional_data
+        self.additional_data_max_age = additional_data_max_age
+        self.archive = archive
+        self.technology_weights = technology_weights or {}
+        self.pipeline_depth = pipeline_depth
+        self._add_lease_columns()
+        self._create_indexes()
 
         # Associate downloader
-        self.mastr_dl = MaStRDownload(parallel_processes=parallel_processes)
+        self.mastr_dl = MaStRDownload(
+            parallel_processes=parallel_processes,
+            mastr_api=mastr_api,
+            concurrent_requests=concurrent_requests,
+        )
 
         # Restore database from a dump
         if restore_dump:
@@ -216,28 +319,13 @@ class MaStRMirror:
 
         for locations_chunk in locations_basic:
             # Remove duplicates returned from API
-            locations_chunk_unique = [
-                location
-                for n, location in enumerate(locations_chunk)
-                if location["LokationMastrNummer"]
-                not in [_["LokationMastrNummer"] for _ in locations_chunk[n + 1 :]]
-            ]
-            locations_unique_ids = [
-                _["LokationMastrNummer"] for _ in locations_chunk_unique
-            ]
+            locations_chunk_unique = unique_by_key(
+                locations_chunk, "LokationMastrNummer"
+            )
 
             with session_scope(engine=self._engine) as session:
-                # Find units that are already in the DB
-                common_ids = [
-                    _.LokationMastrNummer
-                    for _ in session.query(
-                        orm.LocationBasic.LokationMastrNummer
-                    ).filter(
-                        orm.LocationBasic.LokationMastrNummer.in_(locations_unique_ids)
-                    )
-                ]
                 inserted_and_updated = self._create_inserted_and_updated_list(
-                    "locations", session, locations_chunk_unique, common_ids
+                    "locations", session, locations_chunk_unique
                 )
 
                 # Create data requests for all newly inserted and updated locations
@@ -283,9 +371,12 @@ class MaStRMirror:
 
         Parameters
         ----------
-        data: `str`
-            See list of available technologies in
+        data: `str` or list of `str` or None
+            Technology, list of technologies or `None` for all technologies. See
+            list of available technologies in
             `open_mastr.soap_api.download.py.MaStRDownload.download_power_plants`.
+            Requests of several technologies are retrieved in order of their
+            priority, see `additional_data_request_priority`.
         data_type: `str`
             Select type of additional data that is to be retrieved. Choose from
             "unit_data", "eeg_data", "kwk_data", "permit_data".
@@ -296,6 +387,16 @@ class MaStRMirror:
         chunksize: int
             Data is downloaded and inserted into the database in chunks of `chunksize`.
             Defaults to 1000.
+
+        Each chunk of requests is leased to this instance for `lease_duration`
+        seconds. Hence, several processes, also on different hosts and with
+        different MaStR accounts, can retrieve data from the same database
+        without requesting the same units. Missed requests are retried by any
+        worker once their lease has expired, up to `max_attempts` times.
+
+        While a chunk is written to the database, the next chunks are already
+        downloaded and flattened in background threads. At most `pipeline_depth`
+        chunks wait between these steps.
         """
 
         # Mapping of download from MaStRDownload
@@ -309,58 +410,308 @@ class MaStRMirror:
         if chunksize > limit:
             chunksize = limit
 
-        number_units_queried = 0
-        while number_units_queried < limit:
-            with session_scope(engine=self._engine) as session:
-                (
-                    requested_chunk,
-                    requested_ids,
-                ) = self._get_additional_data_requests_from_db(
-                    table_identifier="additional_data",
-                    session=session,
-                    data_request_type=data_type,
-                    data=data,
-                    chunksize=chunksize,
+        # Set to stop claiming further requests, claimed ones are still written
+        stop_claiming = threading.Event()
+        contingent_exhausted = threading.Event()
+
+        def claim_requests():
+            number_units_queried = 0
+            cursor = None
+            while number_units_queried < limit and not stop_claiming.is_set():
+                chunksize_contingent = self._limit_chunksize_to_contingent(
+                    min(chunksize, limit - number_units_queried)
                 )
+                if not chunksize_contingent:
+                    return
+                with session_scope(engine=self._engine) as session:
+                    (
+                        requested_chunk,
+                        requested_ids,
+                    ) = self._get_additional_data_requests_from_db(
+                        table_identifier="additional_data",
+                        session=session,
+                        data_request_type=data_type,
+                        data=data,
+                        chunksize=chunksize_contingent,
+                        after=cursor,
+                    )
+                    # Detach the requests, such that other threads can read them
+                    session.expunge_all()
 
                 if not requested_ids:
                     log.info("No further data is requested")
-                    break
+                    return
+                cursor = self._request_cursor("additional_data", requested_chunk)
+                number_units_queried += len(requested_ids)
 
-                # Retrieve data
+                # A chunk contains requests of several technologies if `data` is
+                # not a single technology
+                technology_chunks = {}
+                for requested_entry in requested_chunk:
+                    technology_chunks.setdefault(requested_entry.technology, []).append(
+                        requested_entry
+                    )
+                yield from technology_chunks.items()
+
+        def fetch(technology_chunk):
+            technology, requested_chunk = technology_chunk
+            if contingent_exhausted.is_set():
+                return technology, requested_chunk, None, None
+            try:
                 unit_data, missed_units = self.mastr_dl.additional_data(
-                    data, requested_ids, download_functions[data_type]
+                    technology,
+                    [_.additional_data_id for _ in requested_chunk],
+                    download_functions[data_type],
                 )
+            except ContingentExhausted as e:
+                contingent_exhausted.set()
+                stop_claiming.set()
+                self._log_contingent_exhausted(e)
+                return technology, requested_chunk, None, None
+            return technology, requested_chunk, unit_data, missed_units
+
+        def flatten(fetched):
+            technology, requested_chunk, unit_data, missed_units = fetched
+            if unit_data is None:
+                return fetched
+            if self.archive:
+                self.archive.write(technology, data_type, unit_data)
+            units = [
+                self._preprocess_additional_data_entry(unit_dat, technology, data_type)
+                for unit_dat in flatten_dict(unit_data, serialize_with_json=False)
+            ]
+            return technology, requested_chunk, units, missed_units
 
-                unit_data = flatten_dict(unit_data, serialize_with_json=False)
-                number_units_merged = 0
-
-                # Prepare data and add to database table
-                for unit_dat in unit_data:
-                    unit = self._preprocess_additional_data_entry(
-                        unit_dat, data, data_type
+        # Fetching, flattening and writing of consecutive chunks overlap
+        pipeline = Pipeline(
+            claim_requests(), [fetch, flatten], maxsize=self.pipeline_depth
+        )
+        uncommitted_chunks = 0
+        with session_scope(engine=self._engine) as session:
+            try:
+                for technology, requested_chunk, units, missed_units in pipeline:
+                    if units is None:
+                        # Requests that were not sent because the contingent is used up
+                        self._release_lease(session, requested_chunk)
+                        continue
+                    self._write_additional_data_chunk(
+                        session,
+                        technology,
+                        data_type,
+                        requested_chunk,
+                        units,
+                        missed_units,
                     )
-                    session.merge(unit)
-                    number_units_merged += 1
-                session.commit()
+                    # Emergency break out: if no new data gets inserted/updated,
+                    # don't retrieve any further data
+                    if not units:
+                        log.info("No further data is requested")
+                        stop_claiming.set()
+
+                    # Commit in batches, but before waiting for the next chunk
+                    uncommitted_chunks += 1
+                    if (
+                        uncommitted_chunks >= self.pipeline_depth
+                        or not pipeline.pending()
+                    ):
+                        session.commit()
+                        uncommitted_chunks = 0
+            finally:
+                pipeline.close()
+
+    def _write_additional_data_chunk(
+        self, session, technology, data_type, requested_chunk, units, missed_units
+    ):
+        """Writes additional data of leased requests of one technology without commit."""
+        bulk_upsert(session, getattr(orm, self.orm_map[technology][data_type]), units)
+        if self.skip_unchanged_additional_data:
+            self._update_additional_data_cache(
+                session, technology, data_type, requested_chunk, units
+            )
+
+        log.info(
+            f"Downloaded data for {len(units)} {technology} units "
+            f"({len(requested_chunk)} requested). "
+        )
+        self._delete_missed_data_from_request_table(
+            table_identifier="additional_data",
+            session=session,
+            missed_requests=missed_units,
+            requested_chunk=requested_chunk,
+            commit=False,
+        )
+
+    def reprocess(self, archive, data=None, data_type=None, chunksize=1000):
+        """
+        Rebuild tables of additional unit data from archived responses
+
+        Responses saved to a
+        [`ResponseArchive`][open_mastr.soap_api.archive.ResponseArchive] are
+        flattened with the current rules and upserted into the tables of
+        additional unit data. No requests are sent to the API. Partitions are
+        processed in the order of their download date, such that newer responses
+        overwrite older ones.
+
+        Parameters
+        ----------
+        archive: ResponseArchive
+            Archive of raw responses.
+        data: str, optional
+            Only reprocess responses of this technology. Defaults to all.
+        data_type: str, optional
+            Only reprocess responses of this type of additional data, for example
+            "unit_data". Defaults to all.
+        chunksize: int
+            Responses are inserted into the database in chunks of `chunksize`.
+            Defaults to 1000.
+        """
+        for technology, dtype, download_date in archive.partitions(data, data_type):
+            table_class = getattr(orm, self.orm_map[technology][dtype])
+            responses = archive.read(technology, dtype, download_date)
+            number_units = 0
+            with session_scope(engine=self._engine) as session:
+                for chunk in iter(lambda: list(islice(responses, chunksize)), []):
+                    units = [
+                        self._preprocess_additional_data_entry(
+                            unit_dat, technology, dtype
+                        )
+                        for unit_dat in flatten_dict(chunk, serialize_with_json=False)
+                    ]
+                    for unit in units:
+                        unit["DatumDownload"] = download_date
+                    bulk_upsert(session, table_class, units)
+                    session.commit()
+                    number_units += len(units)
+            log.info(
+                f"Reprocessed {number_units} archived responses of {dtype} "
+                f"({technology}) downloaded on {download_date}"
+            )
+
+    def sync_extended_unit_data(self, data, limit=10**8):
+        """
+        Update extended unit tables with units changed since their watermark
 
-                log.info(
-                    f"Downloaded data for {len(unit_data)} units ({len(requested_ids)} requested). "
+        Starting from a bulk download, the watermark of a technology is the
+        newest `DatumLetzteAktualisierung` in its extended unit table, see
+        [`record_watermarks`][open_mastr.utils.helpers.record_watermarks].
+        Units changed afterwards are listed with
+        `MaStRAPI.GetGefilterteListeStromErzeuger` and their extended unit
+        data is written straight into the extended unit table, without going
+        through `basic_units` and the request table. Columns that are not part
+        of the table are dropped.
+
+        The watermark is advanced to the newest change date up to which all
+        units were written. Missed units are saved to `missed_additional_data`
+        and fetched again by the next call.
+
+        Parameters
+        ----------
+        data: list of str
+            Technologies, for example ["wind", "solar"]. Technologies without
+            watermark are skipped.
+        limit: int
+            Maximum number of changed units per technology. If more units changed,
+            the watermark is kept. Defaults to the large number of 10**8.
+        """
+        watermarks = get_watermarks(self._engine, data)
+        for tech in data:
+            if tech not in watermarks:
+                log.warning(
+                    f"No watermark for {tech}. Run a bulk download of {tech} first."
                 )
-                self._delete_missed_data_from_request_table(
-                    table_identifier="additional_data",
-                    session=session,
-                    missed_requests=missed_units,
-                    requested_chunk=requested_chunk,
+                continue
+            try:
+                self._sync_extended_unit_data_for_one_technology(
+                    tech, watermarks[tech], limit
                 )
-                # Update while iteration condition
-                number_units_queried += len(requested_ids)
-            # Emergency break out: if now new data gets inserted/update, don't retrieve any
-            # further data
-            if number_units_merged == 0:
-                log.info("No further data is requested")
+            except ContingentExhausted as e:
+                self._log_contingent_exhausted(e)
                 break
 
+    def _sync_extended_unit_data_for_one_technology(self, technology, watermark, limit):
+        log.info(f"Fetch {technology} units changed after {watermark}")
+        table_class = getattr(orm, self.orm_map[technology]["unit_data"])
+        table_columns = {
+            column["name"]
+            for column in sqlalchemy.inspect(self._engine).get_columns(
+                table_class.__tablename__
+            )
+        }
+
+        written_dates = []
+        missed_dates = []
+        number_units = 0
+        for basic_units_chunk in self.mastr_dl.basic_unit_data(
+            technology, limit, date_from=watermark
+        ):
+            basic_units_chunk = self._correct_typo_in_column_name(
+                unique_by_key(basic_units_chunk, "EinheitMastrNummer")
+            )
+            number_units += len(basic_units_chunk)
+            change_dates = {
+                unit["EinheitMastrNummer"]: unit["DatumLetzteAktualisierung"]
+                for unit in basic_units_chunk
+            }
+
+            unit_data, missed_units = self.mastr_dl.additional_data(
+                technology, list(change_dates), "extended_unit_data"
+            )
+            if self.archive:
+                self.archive.write(technology, "unit_data", unit_data)
+            units = [
+                {
+                    column: value
+                    for column, value in self._preprocess_additional_data_entry(
+                        unit_dat, technology, "unit_data"
+                    ).items()
+                    if column in table_columns
+                }
+                for unit_dat in flatten_dict(unit_data, serialize_with_json=False)
+            ]
+
+            with session_scope(engine=self._engine) as session:
+                bulk_upsert(
+                    session,
+                    table_class,
+                    units,
+                    newer_column="DatumLetzteAktualisierung",
+                )
+                session.bulk_insert_mappings(
+                    orm.MissedAdditionalData,
+                    [
+                        {"additional_data_id": unit_id, "reason": reason}
+                        for unit_id, reason in missed_units
+                    ],
+                )
+
+            missed_ids = {unit_id for unit_id, _ in missed_units}
+            for unit_id, change_date in change_dates.items():
+                if change_date is None:
+                    continue
+                change_date = change_date.replace(tzinfo=None)
+                if unit_id in missed_ids:
+                    missed_dates.append(change_date)
+                else:
+                    written_dates.append(change_date)
+            log.info(
+                f"Updated {len(units)} {technology} units "
+                f"({len(missed_units)} missed)"
+            )
+
+        if number_units >= limit:
+            log.warning(
+                f"More than {limit} {technology} units changed. "
+                "The watermark is kept, increase the limit to advance it."
+            )
+            return
+        # Units changed after the first missed one are fetched again next time
+        if missed_dates:
+            written_dates = [_ for _ in written_dates if _ < min(missed_dates)]
+        if written_dates and max(written_dates) > watermark.replace(tzinfo=None):
+            with session_scope(engine=self._engine) as session:
+                update_watermarks(session, {technology: max(written_dates)}, "API")
+            log.info(f"Watermark of {technology} is advanced to {max(written_dates)}")
+
     def retrieve_additional_location_data(
         self, location_type, limit=10**8, chunksize=1000
     ):
@@ -391,7 +742,11 @@ class MaStRMirror:
             chunksize = limit
 
         locations_queried = 0
+        cursor = None
         while locations_queried < limit:
+            chunksize_contingent = self._limit_chunksize_to_contingent(chunksize)
+            if not chunksize_contingent:
+                break
             with session_scope(engine=self._engine) as session:
                 # Get a chunk
                 (
@@ -402,20 +757,28 @@ class MaStRMirror:
                     session=session,
                     data_request_type=location_type,
                     data=None,
-                    chunksize=chunksize,
+                    chunksize=chunksize_contingent,
+                    after=cursor,
                 )
 
                 if not requested_ids:
                     log.info("No further data is requested")
                     break
+                cursor = self._request_cursor(
+                    "additional_location_data", requested_chunk
+                )
 
                 # Reset number of locations inserted or updated for this chunk
                 number_locations_merged = 0
 
                 # Retrieve data
-                location_data, missed_locations = self.mastr_dl.additional_data(
-                    location_type, requested_ids, "location_data"
-                )
+                try:
+                    location_data, missed_locations = self.mastr_dl.additional_data(
+                        location_type, requested_ids, "location_data"
+                    )
+                except ContingentExhausted as e:
+                    self._log_contingent_exhausted(e)
+                    break
 
                 # Prepare data and add to database table
                 location_data = flatten_dict(location_data)
@@ -520,14 +883,12 @@ class MaStRMirror:
 
                     # Prepare data for additional data request
                     for basic_unit in units_for_request:
-                        data_request = {
-                            "EinheitMastrNummer": basic_unit.EinheitMastrNummer,
-                            "technology": self.unit_type_map[basic_unit.Einheittyp],
-                            "data_type": data_type,
-                            "request_date": datetime.datetime.now(
-                                tz=datetime.timezone.utc
-                            ),
-                        }
+                        data_request = self._new_additional_data_request(
+                            basic_unit.EinheitMastrNummer,
+                            basic_unit.Einheittyp,
+                            basic_unit.Bruttoleistung,
+                            data_type,
+                        )
                         if data_type == "unit_data":
                             data_request[
                                 "additional_data_id"
@@ -549,6 +910,37 @@ class MaStRMirror:
             # Insert new requests for additional data into database
             session.bulk_insert_mappings(orm.AdditionalDataRequested, data_requests)
 
+    def _limit_chunksize_to_contingent(self, chunksize):
+        """
+        Reduce `chunksize` to the remaining daily request contingent, if the API
+        is paced by a
+        [`ContingentRateLimiter`][open_mastr.soap_api.rate_limit.ContingentRateLimiter]
+        or uses a
+        [`CredentialPool`][open_mastr.soap_api.credential_pool.CredentialPool].
+        Returns 0 if the contingent is used up.
+        """
+        rate_limiter = getattr(self.mastr_dl._mastr_api, "rate_limiter", None)
+        credential_pool = getattr(self.mastr_dl._mastr_api, "credential_pool", None)
+        if credential_pool is not None and credential_pool.remaining is not None:
+            rate_limiter = credential_pool
+        elif rate_limiter is None or rate_limiter.remaining is None:
+            return chunksize
+        if rate_limiter.remaining == 0:
+            self._log_contingent_exhausted(
+                ContingentExhausted(
+                    "Daily request contingent is used up.",
+                    rate_limiter.reset_time,
+                )
+            )
+        return min(chunksize, rate_limiter.remaining)
+
+    def _log_contingent_exhausted(self, error):
+        log.warning(
+            f"{error} Downloading additional data is paused. Remaining requests are "
+            f"kept in the database, call this method again after {error.resume_at} "
+            "to resume."
+        )
+
     def _add_data_source_and_download_date(self, entry: dict) -> dict:
         """Adds DatenQuelle = 'APT' and DatumDownload = date.today"""
         entry["DatenQuelle"] = "API"
@@ -561,29 +953,15 @@ class MaStRMirror:
         # Only new data gets inserted or data with newer modification date gets updated
 
         # Remove duplicates returned from API
-        basic_units_chunk_unique = [
-            unit
-            for n, unit in enumerate(basic_units_chunk)
-            if unit["EinheitMastrNummer"]
-            not in [_["EinheitMastrNummer"] for _ in basic_units_chunk[n + 1 :]]
-        ]
-        basic_units_chunk_unique_ids = [
-            _["EinheitMastrNummer"] for _ in basic_units_chunk_unique
-        ]
-
-        # Find units that are already in the DB
-        common_ids = [
-            _.EinheitMastrNummer
-            for _ in session.query(orm.BasicUnit.EinheitMastrNummer).filter(
-                orm.BasicUnit.EinheitMastrNummer.in_(basic_units_chunk_unique_ids)
-            )
-        ]
+        basic_units_chunk_unique = unique_by_key(
+            basic_units_chunk, "EinheitMastrNummer"
+        )
         basic_units_chunk_unique = self._correct_typo_in_column_name(
             basic_units_chunk_unique
         )
 
         inserted_and_updated = self._create_inserted_and_updated_list(
-            "basic_units", session, basic_units_chunk_unique, common_ids
+            "basic_units", session, basic_units_chunk_unique
         )
 
         # Submit additional data requests
@@ -606,8 +984,113 @@ class MaStRMirror:
             permit_data = self._append_additional_data_from_basic_unit(
                 permit_data, basic_unit, "GenMastrNummer", "permit_data"
             )
+
+        if self.skip_unchanged_additional_data:
+            extended_data, eeg_data, kwk_data, permit_data = [
+                self._drop_unchanged_additional_data_requests(
+                    session, data_requests, inserted_and_updated
+                )
+                for data_requests in [extended_data, eeg_data, kwk_data, permit_data]
+            ]
         return extended_data, eeg_data, kwk_data, permit_data, inserted_and_updated
 
+    def _drop_unchanged_additional_data_requests(
+        self, session, data_requests, basic_units
+    ) -> list:
+        """Removes requests for additional data that is cached and unchanged."""
+        if not data_requests:
+            return data_requests
+
+        basic_units = {_["EinheitMastrNummer"]: _ for _ in basic_units}
+        cached = {
+            (_.additional_data_id, _.data_type): _
+            for _ in session.query(orm.AdditionalDataCache).filter(
+                orm.AdditionalDataCache.additional_data_id.in_(
+                    [_["additional_data_id"] for _ in data_requests]
+                ),
+                orm.AdditionalDataCache.data_type.in_(
+                    {_["data_type"] for _ in data_requests}
+                ),
+            )
+        }
+
+        changed = []
+        for data_request in data_requests:
+            cache = cached.get(
+                (data_request["additional_data_id"], data_request["data_type"])
+            )
+            basic_unit = basic_units[data_request["EinheitMastrNummer"]]
+            if cache is None or not self._is_additional_data_unchanged(
+                cache, basic_unit, data_request["data_type"]
+            ):
+                changed.append(data_request)
+
+        if skipped := len(data_requests) - len(changed):
+            log.info(
+                f"Skip {skipped} requests for unchanged {data_requests[0]['data_type']}"
+            )
+        return changed
+
+    def _is_additional_data_unchanged(self, cache, basic_unit, data_type) -> bool:
+        if cache.fingerprint != additional_data_fingerprint(basic_unit, data_type):
+            return False
+        if self.additional_data_max_age is not None:
+            if cache.download_date is None:
+                return False
+            expiry = _as_utc(cache.download_date) + datetime.timedelta(
+                days=self.additional_data_max_age
+            )
+            if expiry <= datetime.datetime.now(tz=datetime.timezone.utc):
+                return False
+        # Extended unit data carries the same change date as the basic unit
+        if data_type == "unit_data":
+            basic_date = basic_unit["DatumLetzteAktualisierung"]
+            cached_date = cache.DatumLetzteAktualisierung
+            return (
+                basic_date is not None
+                and cached_date is not None
+                and basic_date.replace(tzinfo=None) <= cached_date.replace(tzinfo=None)
+            )
+        return True
+
+    def _update_additional_data_cache(
+        self, session, technology, data_type, requested_chunk, units
+    ):
+        """Saves fingerprint and change date of the downloaded additional data."""
+        table_class = getattr(orm, self.orm_map[technology][data_type])
+        (primary_key,) = table_class.__table__.primary_key.columns
+        change_dates = {
+            unit[primary_key.name]: unit.get("DatumLetzteAktualisierung")
+            for unit in units
+        }
+
+        basic_units = {
+            _.EinheitMastrNummer: _
+            for _ in session.query(orm.BasicUnit).filter(
+                orm.BasicUnit.EinheitMastrNummer.in_(
+                    [_.EinheitMastrNummer for _ in requested_chunk]
+                )
+            )
+        }
+        cache_entries = [
+            {
+                "additional_data_id": requested_entry.additional_data_id,
+                "data_type": data_type,
+                "fingerprint": additional_data_fingerprint(
+                    basic_units[requested_entry.EinheitMastrNummer].__dict__,
+                    data_type,
+                ),
+                "DatumLetzteAktualisierung": change_dates[
+                    requested_entry.additional_data_id
+                ],
+                "download_date": datetime.datetime.now(tz=datetime.timezone.utc),
+            }
+            for requested_entry in requested_chunk
+            if requested_entry.additional_data_id in change_dates
+            and requested_entry.EinheitMastrNummer in basic_units
+        ]
+        bulk_upsert(session, orm.AdditionalDataCache, cache_entries)
+
     def _correct_typo_in_column_name(self, basic_units_chunk_unique: list) -> list:
         """
         Corrects the typo DatumLetzeAktualisierung -> DatumLetzteAktualisierung
@@ -633,53 +1116,56 @@ class MaStRMirror:
         """Appends a new entry from basic units to an existing list of unit IDs. This list is
         used when requesting additional data from the MaStR API."""
         if basic_unit[basic_unit_identifier]:
-            data_list.append(
-                {
-                    "EinheitMastrNummer": basic_unit["EinheitMastrNummer"],
-                    "additional_data_id": basic_unit[basic_unit_identifier],
-                    "technology": self.unit_type_map[basic_unit["Einheittyp"]],
-                    "data_type": data_type,
-                    "request_date": datetime.datetime.now(tz=datetime.timezone.utc),
-                }
+            data_request = self._new_additional_data_request(
+                basic_unit["EinheitMastrNummer"],
+                basic_unit["Einheittyp"],
+                basic_unit.get("Bruttoleistung"),
+                data_type,
             )
+            data_request["additional_data_id"] = basic_unit[basic_unit_identifier]
+            data_list.append(data_request)
         return data_list
 
+    def _new_additional_data_request(
+        self, mastr_nummer, unit_type, capacity, data_type
+    ) -> dict:
+        """Row of the table `additional_data_requested` without `additional_data_id`."""
+        technology = self.unit_type_map[unit_type]
+        request_date = datetime.datetime.now(tz=datetime.timezone.utc)
+        return {
+            "EinheitMastrNummer": mastr_nummer,
+            "technology": technology,
+            "data_type": data_type,
+            "request_date": request_date,
+            "priority": additional_data_request_priority(
+                request_date, capacity, self.technology_weights.get(technology, 1)
+            ),
+        }
+
     def _create_inserted_and_updated_list(
-        self, table_identifier, session, list_chunk_unique, common_ids
+        self, table_identifier, session, list_chunk_unique
     ) -> list:
-        """Creates the insert and update list and saves it to the BasicTable.
+        """Upserts the data into the BasicTable and returns the inserted and updated entries.
+        Existing basic units are only updated if the new data is newer.
         This method is called both in backfill_basics and backfill_location_basics."""
         if table_identifier == "locations":
             mastr_number_identifier = "LokationMastrNummer"
             table_class = orm.LocationBasic
+            newer_column = None
         elif table_identifier == "basic_units":
             mastr_number_identifier = "EinheitMastrNummer"
             table_class = orm.BasicUnit
+            newer_column = "DatumLetzteAktualisierung"
 
-        insert = []
-        updated = []
-        for entry in list_chunk_unique:
-            # In case data for the unit already exists, only update if new data is newer
-            if entry[mastr_number_identifier] in common_ids:
-                query_filter = (
-                    and_(
-                        orm.BasicUnit.EinheitMastrNummer == entry["EinheitMastrNummer"],
-                        orm.BasicUnit.DatumLetzteAktualisierung
-                        < entry["DatumLetzteAktualisierung"],
-                    )
-                    if table_identifier == "basic_units"
-                    else orm.LocationBasic.LokationMastrNummer
-                    == entry["LokationMastrNummer"]
-                )
-                if session.query(exists().where(query_filter)).scalar():
-                    updated.append(entry)
-                    session.merge(table_class(**entry))
-            # In case of new data, just insert
-            else:
-                insert.append(entry)
-        session.bulk_save_objects([table_class(**u) for u in insert])
+        upserted_ids = bulk_upsert(
+            session, table_class, list_chunk_unique, newer_column=newer_column
+        )
         session.commit()
-        return insert + updated
+        return [
+            entry
+            for entry in list_chunk_unique
+            if entry[mastr_number_identifier] in upserted_ids
+        ]
 
     def _write_basic_data_for_one_data_type_to_db(self, data, date, limit) -> None:
         log.info(f"Backfill data for data type {data}")
@@ -724,6 +1210,8 @@ class MaStRMirror:
                 session.bulk_insert_mappings(orm.AdditionalDataRequested, eeg_data)
                 session.bulk_insert_mappings(orm.AdditionalDataRequested, kwk_data)
                 session.bulk_insert_mappings(orm.AdditionalDataRequested, permit_data)
+                # Release the write lock before the next page is downloaded
+                session.commit()
 
             log.info("Backfill successfully finished")
 
@@ -794,41 +1282,53 @@ class MaStRMirror:
         return dates
 
     def _delete_missed_data_from_request_table(
-        self, table_identifier, session, missed_requests, requested_chunk
+        self, table_identifier, session, missed_requests, requested_chunk, commit=True
     ):
         if table_identifier == "additional_data":
             id_attribute = "additional_data_id"
+            missed_table_class = orm.MissedAdditionalData
+            requested_table_class = orm.AdditionalDataRequested
         elif table_identifier == "additional_location_data":
             id_attribute = "LokationMastrNummer"
-
-        missed_entry_ids = [e[0] for e in missed_requests]
-        for missed_req in missed_requests:
-            missed = (
-                orm.MissedAdditionalData(
-                    additional_data_id=missed_req[0], reason=missed_req[1]
-                )
-                if table_identifier == "additional_data"
-                else orm.MissedExtendedLocation(
-                    LokationMastrNummer=missed_req[0],
-                    reason=missed_req[1],
-                )
+            missed_table_class = orm.MissedExtendedLocation
+            requested_table_class = orm.AdditionalLocationsRequested
+
+        # Requests that are missed again, e.g. on the next lease of a request, keep
+        # one entry with the latest reason
+        missed_entries = unique_by_key(
+            [
+                {id_attribute: missed_req[0], "reason": missed_req[1]}
+                for missed_req in missed_requests
+            ],
+            id_attribute,
+        )
+        session.query(missed_table_class).filter(
+            getattr(missed_table_class, id_attribute).in_(
+                [_[id_attribute] for _ in missed_entries]
             )
-            session.add(missed)
-        session.commit()
+        ).delete(synchronize_session=False)
+        session.bulk_insert_mappings(missed_table_class, missed_entries)
+
         # Remove entries from additional data request table if additional data
         # was retrieved
-        deleted_entries = []
-        for requested_entry in requested_chunk:
-            if getattr(requested_entry, id_attribute) not in missed_entry_ids:
-                session.delete(requested_entry)
-                deleted_entries.append(getattr(requested_entry, id_attribute))
+        missed_entry_ids = {e[0] for e in missed_requests}
+        deleted_entries = [
+            requested_entry.id
+            for requested_entry in requested_chunk
+            if getattr(requested_entry, id_attribute) not in missed_entry_ids
+        ]
+        session.query(requested_table_class).filter(
+            requested_table_class.id.in_(deleted_entries)
+        ).delete(synchronize_session=False)
         log.info(
             f"Missed requests: {len(missed_requests)}. "
             f"Deleted requests: {len(deleted_entries)}."
         )
-        session.commit()
+        if commit:
+            session.commit()
 
     def _preprocess_additional_data_entry(self, unit_dat, technology, data_type):
+        """Prepares additional data from the API as row of the table of `data_type`."""
         unit_dat = self._add_data_source_and_download_date(unit_dat)
         # Remove query status information from response
         for exclude in [
@@ -870,37 +1370,177 @@ class MaStRMirror:
                 "zugeordneteWirkleistungWechselrichter"
             )
 
-        # Create new instance and update potentially existing one
-        return getattr(orm, self.orm_map[technology][data_type])(**unit_dat)
+        return unit_dat
 
     def _get_additional_data_requests_from_db(
-        self, table_identifier, session, data_request_type, data, chunksize
+        self, table_identifier, session, data_request_type, data, chunksize, after=None
     ):
-        """Retrieves the data that is requested from the database table AdditionalDataRequested."""
+        """
+        Retrieves requests from the table AdditionalDataRequested or
+        AdditionalLocationsRequested.
+
+        Requests are polled with keyset pagination: only requests after the
+        last request of the previous chunk (`after`, see `_request_cursor`) are
+        queried, such that requests that are kept in the table, e.g. missed
+        ones, are not scanned again and the cost per chunk stays constant.
+        """
         if table_identifier == "additional_data":
-            requested_chunk = (
-                session.query(orm.AdditionalDataRequested)
-                .filter(
-                    and_(
-                        orm.AdditionalDataRequested.data_type == data_request_type,
-                        orm.AdditionalDataRequested.technology == data,
-                    )
-                )
-                .limit(chunksize)
+            requested_chunk = self._claim_additional_data_requests(
+                session, data_request_type, data, chunksize, after=after
             )
-
             ids = [_.additional_data_id for _ in requested_chunk]
         if table_identifier == "additional_location_data":
-            requested_chunk = (
-                session.query(orm.AdditionalLocationsRequested)
-                .filter(
-                    orm.AdditionalLocationsRequested.location_type == data_request_type
-                )
-                .limit(chunksize)
+            table = orm.AdditionalLocationsRequested
+            query = session.query(table).filter(
+                table.location_type == data_request_type
             )
+            if after is not None:
+                query = query.filter(table.id > after)
+            requested_chunk = query.order_by(table.id).limit(chunksize).all()
             ids = [_.LokationMastrNummer for _ in requested_chunk]
         return requested_chunk, ids
 
+    def _request_cursor(self, table_identifier, requested_chunk):
+        """Position of the last request of a chunk for keyset pagination."""
+        if not requested_chunk:
+            return None
+        last_request = requested_chunk[-1]
+        if table_identifier == "additional_data":
+            return (last_request.priority, last_request.id)
+        return last_request.id
+
+    def _claim_additional_data_requests(
+        self, session, data_request_type, data, chunksize, after=None
+    ):
+        """
+        Leases up to `chunksize` requests for additional data to this worker.
+
+        Requests without lease or with an expired lease are claimed in one
+        UPDATE, those with the highest priority first. `data` is a technology, a
+        list of technologies or `None` for all technologies. If `after` is a
+        tuple of priority and id, only requests ordered after it are claimed.
+        On PostgreSQL, rows locked by concurrent claims are skipped
+        (`FOR UPDATE SKIP LOCKED`). SQLite serializes writes, which makes the
+        UPDATE atomic as well. The ids of the claimed requests are taken from the
+        `RETURNING` clause of the UPDATE. On databases without `RETURNING`, the
+        requests are selected first and updated in the same transaction.
+        """
+        table = orm.AdditionalDataRequested
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        lease_expiry = now + datetime.timedelta(seconds=self.lease_duration)
+
+        unleased = [
+            or_(table.lease_expiry.is_(None), table.lease_expiry < now),
+            func.coalesce(table.attempts, 0) < self.max_attempts,
+        ]
+        claimable = select(table.id).where(
+            table.data_type == data_request_type, *unleased
+        )
+        if data is not None:
+            technologies = [data] if isinstance(data, str) else data
+            claimable = claimable.where(table.technology.in_(technologies))
+        if after is not None:
+            claimable = claimable.where(tuple_(table.priority, table.id) < after)
+        # Uses the index on data_type, priority and id
+        claimable = (
+            claimable.order_by(table.priority.desc(), table.id.desc())
+            .limit(chunksize)
+            .with_for_update(skip_locked=True)
+        )
+        lease = update(table).values(
+            worker_id=self.worker_id,
+            lease_expiry=lease_expiry,
+            attempts=func.coalesce(table.attempts, 0) + 1,
+        )
+        if supports_returning(session):
+            # The claimed rows are returned by the UPDATE itself, such that they do
+            # not have to be found again by the stored lease expiry
+            claimed_ids = session.scalars(
+                lease.where(table.id.in_(claimable.scalar_subquery()))
+                .returning(table.id)
+                .execution_options(synchronize_session=False)
+            ).all()
+        else:
+            # Requests leased by another worker since they were selected are not
+            # updated, hence they keep the id of the other worker
+            candidate_ids = session.scalars(claimable).all()
+            session.execute(
+                lease.where(table.id.in_(candidate_ids), *unleased).execution_options(
+                    synchronize_session=False
+                )
+            )
+            claimed_ids = session.scalars(
+                select(table.id).where(
+                    table.id.in_(candidate_ids), table.worker_id == self.worker_id
+                )
+            ).all()
+        session.commit()
+        if not claimed_ids:
+            return []
+
+        return (
+            session.query(table)
+            .filter(table.id.in_(claimed_ids))
+            .order_by(table.priority.desc(), table.id.desc())
+            .all()
+        )
+
+    def _release_lease(self, session, requested_chunk):
+        """Makes leased requests for additional data available to all workers again."""
+        table = orm.AdditionalDataRequested
+        session.query(table).filter(
+            table.id.in_([_.id for _ in requested_chunk])
+        ).update(
+            {
+                table.worker_id: None,
+                table.lease_expiry: None,
+                table.attempts: table.attempts - 1,
+            },
+            synchronize_session=False,
+        )
+        session.commit()
+
+    def _add_lease_columns(self):
+        """
+        Adds the lease and priority columns to a request table created by an
+        older version.
+        """
+        table = orm.AdditionalDataRequested.__table__
+        inspector = sqlalchemy.inspect(self._engine)
+        if not inspector.has_table(table.name):
+            return
+        existing_columns = {_["name"] for _ in inspector.get_columns(table.name)}
+        with self._engine.begin() as con:
+            for column in ["worker_id", "lease_expiry", "attempts", "priority"]:
+                if column not in existing_columns:
+                    column_type = table.c[column].type.compile(
+                        dialect=self._engine.dialect
+                    )
+                    con.execute(
+                        text(
+                            f'ALTER TABLE {table.name} ADD "{column}" {column_type} NULL'
+                        )
+                    )
+            if "priority" not in existing_columns:
+                con.execute(
+                    text(f"UPDATE {table.name} SET priority = 0 WHERE priority IS NULL")
+                )
+
+    def _create_indexes(self):
+        """Creates the indexes of the mirror tables if the tables exist without them."""
+        inspector = sqlalchemy.inspect(self._engine)
+        with self._engine.begin() as con:
+            for table_class in [
+                orm.BasicUnit,
+                orm.AdditionalDataRequested,
+                orm.AdditionalLocationsRequested,
+            ]:
+                table = table_class.__table__
+                if not inspector.has_table(table.name):
+                    continue
+                for index in table.indexes:
+                    index.create(con, checkfirst=True)
+
     def _get_units_for_request(
         self, data_type, session, additional_data_orm, technology
     ):
@@ -1050,3 +1690,58 @@ def list_of_dicts_to_columns(row) -> pd.Series:  # FIXME: Function not used
             columns[k].append(v)
 
     return pd.Series(columns)
+
+
+def additional_data_fingerprint(basic_unit, data_type) -> str:
+    """
+    Hash of the fields of a basic unit that indicate a change of its additional data
+
+    Parameters
+    ----------
+    basic_unit: dict
+        Basic unit data, as returned by the API or stored in the table `basic_units`.
+    data_type: str
+        Type of additional data, see `ADDITIONAL_DATA_FINGERPRINT_FIELDS`.
+
+    Returns
+    -------
+    str
+        Hex digest of the fields.
+    """
+    fields = [
+        str(basic_unit.get(field))
+        for field in ADDITIONAL_DATA_FINGERPRINT_FIELDS[data_type]
+    ]
+    return hashlib.sha1(json.dumps(fields).encode("utf-8")).hexdigest()
+
+
+def additional_data_request_priority(request_date, capacity, weight=1) -> float:
+    """
+    Priority of a request for additional data
+
+    Requests of recently changed units and of units with a large capacity are
+    retrieved first. The priority grows by one for each `PRIORITY_RECENCY_SECONDS`
+    the request is newer and by `weight` for each tenfold capacity.
+
+    Parameters
+    ----------
+    request_date: datetime.datetime
+        Time the request was created.
+    capacity: float or None
+        Gross capacity (Bruttoleistung) of the unit in kW.
+    weight: float, optional
+        Weight of the capacity for the technology of the unit. Defaults to 1.
+
+    Returns
+    -------
+    float
+    """
+    recency = request_date.timestamp() / PRIORITY_RECENCY_SECONDS
+    return recency + weight * math.log10(1 + max(float(capacity or 0), 0))
+
+
+def _as_utc(date_time):
+    """Naive datetimes, as returned by SQLite, are taken as UTC."""
+    if date_time.tzinfo is None:
+        return date_time.replace(tzinfo=datetime.timezone.utc)
+    return date_time.astimezone(datetime.timezone.utc)
@@ -0,0 +1,230 @@
+"""
+Run the steps of a download as a dependency graph
+
+Most steps of the API download are independent of each other once the basic
+units of a technology exist. An
+[`Orchestrator`][open_mastr.soap_api.orchestrate.Orchestrator] runs each step
+as soon as the steps it depends on succeeded, with up to `max_workers` steps at
+the same time, and writes a JSON report with the timings of all steps.
+
+SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+
+import datetime
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from open_mastr.soap_api.rate_limit import ContingentExhausted
+from open_mastr.utils.config import setup_logger
+
+log = setup_logger()
+
+
+class Orchestrator:
+    """
+    Runs steps concurrently in the order given by their dependencies
+
+    ```python
+
+        orchestrator = Orchestrator(max_workers=4)
+        orchestrator.add_step("basic:solar", lambda: ...)
+        orchestrator.add_step("unit_data:solar", lambda: ..., depends_on=["basic:solar"])
+        report = orchestrator.run(report_file="report.json")
+    ```
+
+    If a step fails, the steps that depend on it are skipped and all other
+    steps are run. If a step raises
+    [`ContingentExhausted`][open_mastr.soap_api.rate_limit.ContingentExhausted],
+    no further steps are started, as the contingent is shared by all steps.
+    """
+
+    def __init__(self, max_workers=4):
+        """
+        Parameters
+        ----------
+        max_workers : int, optional
+            Maximum number of steps that run at the same time. Defaults to 4.
+        """
+        self.max_workers = max_workers
+        self._steps = {}
+
+    def add_step(self, name, function, depends_on=()):
+        """
+        Add a step to the graph.
+
+        Parameters
+        ----------
+        name : str
+            Unique name of the step.
+        function : callable
+            Called without arguments to run the step.
+        depends_on : list of str, optional
+            Names of the steps that have to succeed before this step is run.
+            They have to be added before.
+        """
+        if name in self._steps:
+            raise ValueError(f"Step {name} already exists.")
+        for dependency in depends_on:
+            if dependency not in self._steps:
+                raise ValueError(f"Step {name} depends on unknown step {dependency}.")
+        self._steps[name] = (function, list(depends_on))
+
+    def run(self, report_file=None) -> dict:
+        """
+        Run all steps.
+
+        Parameters
+        ----------
+        report_file : str or path-like, optional
+            JSON file the run report is written to. Defaults to `None`.
+
+        Returns
+        -------
+        dict
+            Run report with start, end and duration in seconds of the run and
+            of each step. The status of a step is "succeeded", "failed" or
+            "skipped".
+        """
+        report = {
+            "started": datetime.datetime.now().isoformat(),
+            "max_workers": self.max_workers,
+            "steps": {
+                name: {"depends_on": depends_on, "status": "pending"}
+                for name, (_, depends_on) in self._steps.items()
+            },
+        }
+        steps = report["steps"]
+        lock = threading.Lock()
+        start = time.monotonic()
+
+        def run_step(name):
+            function, _ = self._steps[name]
+            step_start = time.monotonic()
+            with lock:
+                steps[name]["started"] = datetime.datetime.now().isoformat()
+            log.info(f"Start step {name}")
+            try:
+                function()
+            finally:
+                with lock:
+                    steps[name]["finished"] = datetime.datetime.now().isoformat()
+                    steps[name]["duration"] = round(time.monotonic() - step_start, 3)
+
+        stop = False
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                for name, step in steps.items():
+                    if stop or len(running) >= self.max_workers:
+                        break
+                    if step["status"] != "pending":
+                        continue
+                    dependencies = [steps[_]["status"] for _ in step["depends_on"]]
+                    if any(status in ["failed", "skipped"] for status in dependencies):
+                        step["status"] = "skipped"
+                    elif all(status == "succeeded" for status in dependencies):
+                        step["status"] = "running"
+                        running[executor.submit(run_step, name)] = name
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        steps[name]["status"] = "succeeded"
+                        continue
+                    steps[name]["status"] = "failed"
+                    steps[name]["error"] = repr(error)
+                    log.error(f"Step {name} failed: {error!r}")
+                    if isinstance(error, ContingentExhausted):
+                        stop = True
+
+        for step in steps.values():
+            if step["status"] == "pending":
+                step["status"] = "skipped"
+        report["finished"] = datetime.datetime.now().isoformat()
+        report["duration"] = round(time.monotonic() - start, 3)
+
+        if report_file:
+            with open(report_file, "w") as f:
+                json.dump(report, f, indent=2)
+            log.info(f"Run report is saved to {report_file}")
+        return report
+
+
+def api_download_orchestrator(
+    mirror,
+    data,
+    api_data_types,
+    api_location_types,
+    date=None,
+    limit=10**8,
+    chunksize=1000,
+    max_workers=4,
+):
+    """
+    Build the graph of the API download of `Mastr.download(method="API")`
+
+    Additional data is retrieved once the basic units of all technologies are
+    backfilled, such that the requests of all technologies are retrieved in
+    order of their priority. Locations are independent of units.
+
+    Parameters
+    ----------
+    mirror : callable
+        Returns the [`MaStRMirror`][open_mastr.soap_api.mirror.MaStRMirror]
+        that is used by the calling thread. zeep clients are not thread-safe,
+        hence, each thread needs its own instance.
+    data : list of str
+        Technologies, for example ["wind", "solar"].
+    api_data_types : list of str
+        Types of additional data, for example ["unit_data", "eeg_data"].
+    api_location_types : list of str
+        Types of locations whose extended data is retrieved.
+    date : None or datetime.datetime or str, optional
+        Passed to `MaStRMirror.backfill_basic`.
+    limit : int, optional
+        Passed to the steps as `limit`.
+    chunksize : int, optional
+        Passed to `MaStRMirror.retrieve_additional_data`.
+    max_workers : int, optional
+        Maximum number of steps that run at the same time. Defaults to 4.
+
+    Returns
+    -------
+    Orchestrator
+    """
+    orchestrator = Orchestrator(max_workers=max_workers)
+
+    for tech in data:
+        orchestrator.add_step(
+            f"basic:{tech}",
+            lambda tech=tech: mirror().backfill_basic([tech], limit=limit, date=date),
+        )
+    # Requests of all technologies are retrieved in order of their priority
+    for data_type in api_data_types:
+        orchestrator.add_step(
+            data_type,
+            lambda data_type=data_type: mirror().retrieve_additional_data(
+                list(data), data_type, chunksize=chunksize, limit=limit
+            ),
+            depends_on=[f"basic:{tech}" for tech in data],
+        )
+
+    orchestrator.add_step(
+        "basic:locations",
+        lambda: mirror().backfill_locations_basic(limit=limit, date="latest"),
+    )
+    for location_type in api_location_types or []:
+        orchestrator.add_step(
+            f"{location_type}:locations",
+            lambda location_type=location_type: (
+                mirror().retrieve_additional_location_data(location_type, limit=limit)
+            ),
+            depends_on=["basic:locations"],
+        )
+    return orchestrator
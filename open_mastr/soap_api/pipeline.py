@@ -0,0 +1,120 @@
+"""
+Overlap the stages of a download in threads connected by bounded queues
+
+A [`Pipeline`][open_mastr.soap_api.pipeline.Pipeline] runs each stage, for
+example fetching from the API and flattening responses, in its own thread. While
+the consumer writes item N to the database, item N+1 is already transformed and
+item N+2 is fetched. The queues between the stages hold at most `maxsize` items,
+such that fast stages wait for slow ones instead of accumulating items in memory.
+
+SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+
+import queue
+import threading
+
+from open_mastr.utils.config import setup_logger
+
+log = setup_logger()
+
+_DONE = object()
+
+
+class _StageError:
+    def __init__(self, error):
+        self.error = error
+
+
+class Pipeline:
+    """
+    Streams the items of `source` through `stages` in background threads
+
+    ```python
+
+        pipeline = Pipeline(claim_requests(), [fetch, flatten], maxsize=2)
+        for units in pipeline:
+            write(units)
+    ```
+
+    Items are yielded in the order of `source`. `source` is iterated in the
+    thread of the first stage. If a stage raises an error, it is raised by the
+    iteration over the pipeline and all stages stop.
+    """
+
+    def __init__(self, source, stages, maxsize=2):
+        """
+        Parameters
+        ----------
+        source : iterable
+            Items that are passed to the first stage.
+        stages : list of callable
+            Functions each of which takes the result of the previous stage.
+        maxsize : int, optional
+            Maximum number of items waiting between two stages. Defaults to 2.
+        """
+        self._abort = threading.Event()
+        self._threads = []
+        items = source
+        for stage in stages:
+            items = self._start_stage(items, stage, maxsize)
+        self._output = items
+
+    def pending(self) -> int:
+        """Number of items that are ready to be consumed."""
+        return self._output.qsize()
+
+    def close(self):
+        """Stop all stages, items in progress are dropped."""
+        self._abort.set()
+        for thread in self._threads:
+            thread.join()
+
+    def __iter__(self):
+        try:
+            yield from self._iterate(self._output)
+        finally:
+            self.close()
+
+    def _start_stage(self, items, stage, maxsize):
+        output = queue.Queue(maxsize=maxsize)
+
+        def work(items):
+            try:
+                for item in items:
+                    if not self._put(output, stage(item)):
+                        return
+            except Exception as e:
+                self._put(output, _StageError(e))
+                return
+            self._put(output, _DONE)
+
+        if isinstance(items, queue.Queue):
+            items = self._iterate(items)
+        thread = threading.Thread(target=work, args=(items,), daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return output
+
+    def _iterate(self, items):
+        while True:
+            try:
+                item = items.get(timeout=0.1)
+            except queue.Empty:
+                if self._abort.is_set():
+                    return
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+
+    def _put(self, output, item) -> bool:
+        """Waits until `item` is put, returns False if the pipeline was stopped."""
+        while not self._abort.is_set():
+            try:
+                output.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
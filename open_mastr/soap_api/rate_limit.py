@@ -0,0 +1,274 @@
+"""
+Pace requests to the MaStR SOAP API according to the daily request contingent
+
+Each MaStR account may send a limited number of requests per day
+(`AktuellesLimitTageskontingent`). The
+[`ContingentRateLimiter`][open_mastr.soap_api.rate_limit.ContingentRateLimiter]
+spreads the remaining requests of the day evenly until the contingent is reset at
+midnight and raises
+[`ContingentExhausted`][open_mastr.soap_api.rate_limit.ContingentExhausted]
+once it is used up.
+
+SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+
+import asyncio
+import datetime
+import json
+import os
+import threading
+import time
+
+from open_mastr.utils.config import setup_logger
+
+log = setup_logger()
+
+
+class ContingentExhausted(Exception):
+    """Raised if the daily request contingent of the MaStR account is used up."""
+
+    def __init__(self, message, resume_at):
+        super().__init__(message)
+        self.resume_at = resume_at
+
+
+class ContingentRateLimiter:
+    """
+    Token bucket that spreads the daily request contingent over the day
+
+    Tokens are refilled at a rate of the remaining contingent divided by the
+    time until the contingent is reset at midnight (local time). Each request
+    takes one token. The remaining contingent is read from the MaStR SOAP API
+    when the limiter is attached to a
+    [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI] and refreshed every
+    `refresh_interval` seconds.
+
+    ```python
+
+        rate_limiter = ContingentRateLimiter(state_file="contingent.json")
+        mastr_api = MaStRAPI(rate_limiter=rate_limiter)
+        mastr_mirror = MaStRMirror(engine, mastr_api=mastr_api)
+        mastr_mirror.retrieve_additional_data("solar", "unit_data")
+    ```
+
+    If the contingent is used up, `MaStRMirror.retrieve_additional_data` stops and
+    the remaining requests stay in the request table. Call it again after the reset
+    to resume. The state of the limiter is saved to `state_file`, such that a
+    resumed process continues with the number of requests already used today.
+    """
+
+    def __init__(
+        self, state_file=None, refresh_interval=600, reserve=100, burst=50, pace=True
+    ):
+        """
+        Parameters
+        ----------
+        state_file : str or path-like, optional
+            JSON file the state of the limiter is saved to and restored from.
+            Defaults to `None` which means the state is not saved.
+        refresh_interval : int, optional
+            Interval in seconds in which the contingent is read from the API.
+            Defaults to 600.
+        reserve : int, optional
+            Number of requests of the daily contingent that are not used.
+            Defaults to 100.
+        burst : int, optional
+            Maximum number of requests that can be sent without pacing, i.e.
+            the size of the token bucket. Defaults to 50.
+        pace : bool, optional
+            If False, requests are not spread over the day, but only counted
+            until the contingent is used up. Defaults to True.
+        """
+        self.state_file = state_file
+        self.refresh_interval = refresh_interval
+        self.reserve = reserve
+        self.burst = burst
+        self.pace = pace
+
+        self._contingent_source = None
+        self._lock = threading.Lock()
+        self._day = datetime.date.today()
+        self._used = 0
+        self._limit = None
+        self._tokens = burst
+        self._last_fill = time.monotonic()
+        self._last_refresh = None
+        self._refreshing = False
+
+        self._load_state()
+
+    def attach(self, contingent_source):
+        """
+        Set the function the contingent is read from, if not already set.
+
+        Parameters
+        ----------
+        contingent_source : callable
+            Function returning a dict with the keys `AktuellerStandTageskontingent`
+            and `AktuellesLimitTageskontingent`, usually
+            `MaStRAPI.GetAktuellerStandTageskontingent`.
+        """
+        if self._contingent_source is None:
+            self._contingent_source = contingent_source
+
+    @property
+    def remaining(self):
+        """Number of requests that can still be sent today, `None` if unknown."""
+        if self._limit is None:
+            return None
+        return max(self._limit - self._used - self.reserve, 0)
+
+    def refresh(self):
+        """Read the current state of the contingent from the API."""
+        self._refresh()
+
+    def try_acquire(self, requests=1):
+        """
+        Take tokens for `requests` requests if available.
+
+        Returns
+        -------
+        float
+            0, if the tokens were taken. Otherwise, the number of seconds to wait
+            until enough tokens are available.
+
+        Raises
+        ------
+        ContingentExhausted
+            If the remaining daily contingent is smaller than `requests`.
+        """
+        if self._start_refresh():
+            self._refresh()
+        return self._take(requests)
+
+    def _take(self, requests):
+        with self._lock:
+            # Without a known contingent, requests are not limited
+            if self._limit is None:
+                return 0
+
+            remaining = self.remaining
+            if remaining < requests:
+                self._save_state()
+                resume_at = self.reset_time
+                raise ContingentExhausted(
+                    f"Daily request contingent of {self._limit} is used up "
+                    f"(reserve: {self.reserve}). It is reset at {resume_at}.",
+                    resume_at,
+                )
+
+            if not self.pace:
+                self._used += requests
+                return 0
+
+            now = time.monotonic()
+            rate = remaining / self._seconds_until_reset()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last_fill) * rate
+            )
+            self._last_fill = now
+            if self._tokens >= requests:
+                self._tokens -= requests
+                self._used += requests
+                return 0
+            return (requests - self._tokens) / rate
+
+    def acquire(self, requests=1):
+        """
+        Wait until tokens for `requests` requests are available and take them.
+
+        Raises
+        ------
+        ContingentExhausted
+            If the remaining daily contingent is smaller than `requests`.
+        """
+        wait = self.try_acquire(requests)
+        while wait:
+            time.sleep(min(wait, self.refresh_interval))
+            wait = self.try_acquire(requests)
+
+    async def acquire_async(self, requests=1):
+        """Counterpart of `acquire` that does not block the event loop."""
+        while True:
+            # The contingent is read from the API in a thread of the default executor
+            if self._start_refresh():
+                await asyncio.to_thread(self._refresh)
+            wait = self._take(requests)
+            if not wait:
+                return
+            await asyncio.sleep(min(wait, self.refresh_interval))
+
+    def _start_refresh(self):
+        """
+        True, if the contingent is due to be read from the API. Only one caller
+        refreshes it at a time, the others continue with the known contingent.
+        """
+        with self._lock:
+            self._roll_over_day()
+            due = self._contingent_source is not None and (
+                self._last_refresh is None
+                or time.monotonic() - self._last_refresh > self.refresh_interval
+            )
+            if due and not self._refreshing:
+                self._refreshing = True
+                return True
+            return False
+
+    def _refresh(self):
+        # The request to the API is sent without holding the lock, such that other
+        # threads are not blocked while waiting for the response
+        try:
+            contingent = self._contingent_source()
+        except Exception:
+            with self._lock:
+                self._refreshing = False
+            raise
+        with self._lock:
+            self._refreshing = False
+            self._used = contingent["AktuellerStandTageskontingent"]
+            self._limit = contingent["AktuellesLimitTageskontingent"]
+            self._last_refresh = time.monotonic()
+            log.info(
+                f"Daily requests contigent: {self._used} / {self._limit}, "
+                f"{self.remaining} requests remaining until {self.reset_time}"
+            )
+            self._save_state()
+
+    def _roll_over_day(self):
+        if datetime.date.today() != self._day:
+            self._day = datetime.date.today()
+            self._used = 0
+            self._last_refresh = None
+
+    @property
+    def reset_time(self):
+        """Time at which the daily contingent is reset."""
+        return datetime.datetime.combine(
+            self._day + datetime.timedelta(days=1), datetime.time.min
+        )
+
+    def _seconds_until_reset(self):
+        return max((self.reset_time - datetime.datetime.now()).total_seconds(), 1)
+
+    def _load_state(self):
+        if not self.state_file or not os.path.isfile(self.state_file):
+            return
+        with open(self.state_file) as f:
+            state = json.load(f)
+        if state["day"] == self._day.isoformat():
+            self._used = state["used"]
+            self._limit = state["limit"]
+
+    def _save_state(self):
+        if not self.state_file:
+            return
+        with open(self.state_file, "w") as f:
+            json.dump(
+                {
+                    "day": self._day.isoformat(),
+                    "used": self._used,
+                    "limit": self._limit,
+                },
+                f,
+                indent=2,
+            )
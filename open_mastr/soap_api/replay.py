@@ -0,0 +1,437 @@
+"""
+Record responses of the MaStR SOAP API and replay them from a local stand-in server
+
+The stand-in allows to benchmark and load-test
+[`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI],
+[`MaStRDownload`][open_mastr.soap_api.download.MaStRDownload] and
+[`MaStRMirror`][open_mastr.soap_api.mirror.MaStRMirror] without a MaStR account
+and without using the daily request contingent.
+
+Recordings are stored in a directory with the following structure
+
+```bash
+
+    recordings/
+    ├── recording.json      # origin of the recorded service
+    ├── documents           # WSDL and XSD files
+    │   └── MaStRAPI/wsdl/mastr.wsdl
+    └── responses           # one JSON line per recorded request/response
+        ├── GetEinheitSolar.jsonl
+        └── GetListeAlleEinheiten.jsonl
+```
+
+SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from socketserver import ThreadingMixIn
+from urllib.parse import urljoin, urlparse
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import requests
+from lxml import etree
+from zeep import Plugin
+
+from open_mastr.utils.config import setup_logger
+
+log = setup_logger()
+
+# Request parameters that are specific to the account and not part of the query
+CREDENTIAL_PARAMETERS = ["apiKey", "marktakteurMastrNummer"]
+
+# Identifiers of units, locations and market actors, e.g. SEE984033548619
+MASTR_NUMBER_PATTERN = re.compile(r"\b([A-Z]{3})(\d{12})\b")
+
+SOAP_11_NAMESPACE = "http://schemas.xmlsoap.org/soap/envelope/"
+SOAP_12_NAMESPACE = "http://www.w3.org/2003/05/soap-envelope"
+
+
+def _request_parameters(envelope) -> tuple:
+    """
+    Extract name and parameters of the request element in a SOAP envelope.
+
+    Returns
+    -------
+    tuple of str and dict
+        Local name of the request element and its parameters without credentials.
+    """
+    body = next(child for child in envelope if etree.QName(child).localname == "Body")
+    request = body[0]
+    parameters = {}
+    for element in request.iter():
+        if element is request or len(element):
+            continue
+        name = etree.QName(element).localname
+        if name not in CREDENTIAL_PARAMETERS:
+            parameters[name] = (element.text or "").strip()
+    return etree.QName(request).localname, parameters
+
+
+def _request_key(parameters: dict) -> str:
+    return hashlib.sha1(
+        json.dumps(parameters, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+class SOAPRecorder(Plugin):
+    """
+    zeep plugin that records SOAP requests and responses
+
+    Pass it to [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI] to record
+    all responses of queries made with this instance.
+
+    ```python
+
+        recorder = SOAPRecorder("recordings")
+        mastr_api = MaStRAPI(plugins=[recorder])
+        mastr_api.GetEinheitSolar(einheitMastrNummer="SEE984033548619")
+    ```
+
+    Credentials are not written to the recording.
+    """
+
+    def __init__(self, directory):
+        """
+        Parameters
+        ----------
+        directory : str or path-like
+            Directory the recordings are written to.
+        """
+        self.directory = directory
+        self._requests = threading.local()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, "responses"), exist_ok=True)
+
+    def egress(self, envelope, http_headers, operation, binding_options):
+        self._requests.current = _request_parameters(envelope)
+        return envelope, http_headers
+
+    def ingress(self, envelope, http_headers, operation):
+        request_name, parameters = getattr(self._requests, "current", (None, None))
+        if request_name is not None:
+            record = {
+                "operation": operation.name,
+                "request": parameters,
+                "response": etree.tostring(envelope, encoding="unicode"),
+            }
+            response_file = os.path.join(
+                self.directory, "responses", f"{request_name}.jsonl"
+            )
+            with self._lock, open(response_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+            self._requests.current = (None, None)
+        return envelope, http_headers
+
+
+def record_service_documents(directory, wsdl):
+    """
+    Save the WSDL file and all imported WSDL and XSD files to `directory`.
+
+    Parameters
+    ----------
+    directory : str or path-like
+        Directory of the recording.
+    wsdl : str
+        URL of the WSDL file, see
+        [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI].
+    """
+    origin = "{0.scheme}://{0.netloc}".format(urlparse(wsdl))
+    documents_dir = os.path.join(directory, "documents")
+
+    to_load = [wsdl]
+    loaded = set()
+    while to_load:
+        url = to_load.pop()
+        if url in loaded:
+            continue
+        loaded.add(url)
+
+        response = requests.get(url, timeout=60)
+        response.raise_for_status()
+        file_path = os.path.join(documents_dir, urlparse(url).path.lstrip("/"))
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(response.content)
+
+        # Follow wsdl:import, xsd:import and xsd:include
+        tree = etree.fromstring(response.content)
+        for element in tree.iter():
+            location = element.get("location") or element.get("schemaLocation")
+            if location and etree.QName(element).localname in ["import", "include"]:
+                to_load.append(urljoin(url, location))
+
+    with open(os.path.join(directory, "recording.json"), "w") as f:
+        json.dump({"origin": origin, "wsdl_path": urlparse(wsdl).path}, f, indent=2)
+
+
+class SOAPStandIn:
+    """
+    WSGI application that replays recorded MaStR SOAP API responses
+
+    Requests are answered with the recorded response of the same operation and the
+    same parameters. If no exact match exists, another recorded response of the
+    operation is returned. In this case, MaStR numbers of the recording are replaced
+    by the requested ones. For paged list queries, the MaStR numbers are varied
+    deterministically per requested page, such that each page contains distinct
+    units which can be queried subsequently.
+
+    Use [`StandInServer`][open_mastr.soap_api.replay.StandInServer] to run the
+    application in a local HTTP server.
+    """
+
+    def __init__(
+        self,
+        directory,
+        latency=0.0,
+        latency_jitter=0.0,
+        fault_rate=0.0,
+        fault_message="Der Webdienst ist voruebergehend nicht erreichbar",
+        seed=None,
+    ):
+        """
+        Parameters
+        ----------
+        directory : str or path-like
+            Directory with recordings, see
+            [`SOAPRecorder`][open_mastr.soap_api.replay.SOAPRecorder] and
+            [`record_service_documents`][open_mastr.soap_api.replay.record_service_documents].
+        latency : float, optional
+            Delay of each SOAP response in seconds. Defaults to 0.
+        latency_jitter : float, optional
+            Maximum additional random delay of each SOAP response in seconds.
+            Defaults to 0.
+        fault_rate : float, optional
+            Share of SOAP requests that are answered with a SOAP Fault. Defaults to 0.
+        fault_message : str, optional
+            Message of injected SOAP Faults.
+        seed : int, optional
+            Seed for latency jitter and fault injection.
+        """
+        self.directory = directory
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.fault_rate = fault_rate
+        self.fault_message = fault_message
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+        with open(os.path.join(directory, "recording.json")) as f:
+            recording = json.load(f)
+        self.origin = recording["origin"]
+        self.wsdl_path = recording["wsdl_path"]
+
+        self._responses = {}
+        responses_dir = os.path.join(directory, "responses")
+        for file_name in sorted(os.listdir(responses_dir)):
+            request_name = file_name[: -len(".jsonl")]
+            with open(os.path.join(responses_dir, file_name), encoding="utf-8") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+            # Requests without recorded responses are answered with a SOAP Fault
+            if not records:
+                log.warning(f"Recording for {request_name} is empty")
+                continue
+            self._responses[request_name] = {
+                "by_key": {_request_key(r["request"]): r for r in records},
+                "all": records,
+            }
+
+    def __call__(self, environ, start_response):
+        if environ["REQUEST_METHOD"] == "GET":
+            return self._serve_document(environ, start_response)
+        if environ["REQUEST_METHOD"] == "POST":
+            return self._serve_soap_request(environ, start_response)
+        start_response("405 Method Not Allowed", [("Content-Type", "text/plain")])
+        return [b"Method not allowed"]
+
+    def _base_url(self, environ):
+        return f"{environ['wsgi.url_scheme']}://{environ['HTTP_HOST']}"
+
+    def _serve_document(self, environ, start_response):
+        path = environ.get("PATH_INFO", "").lstrip("/")
+        file_path = os.path.normpath(os.path.join(self.directory, "documents", path))
+        documents_dir = os.path.normpath(os.path.join(self.directory, "documents"))
+        if not file_path.startswith(documents_dir) or not os.path.isfile(file_path):
+            start_response("404 Not Found", [("Content-Type", "text/plain")])
+            return [b"Not found"]
+        with open(file_path, "rb") as f:
+            content = f.read()
+        # Let the client send all further requests to the stand-in
+        content = content.replace(
+            self.origin.encode("utf-8"), self._base_url(environ).encode("utf-8")
+        )
+        start_response(
+            "200 OK",
+            [
+                ("Content-Type", "text/xml; charset=utf-8"),
+                ("Content-Length", str(len(content))),
+            ],
+        )
+        return [content]
+
+    def _serve_soap_request(self, environ, start_response):
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        request_name, parameters = _request_parameters(
+            etree.fromstring(environ["wsgi.input"].read(length))
+        )
+
+        with self._random_lock:
+            delay = self.latency + self._random.uniform(0, self.latency_jitter)
+            inject_fault = self._random.random() < self.fault_rate
+        if delay:
+            time.sleep(delay)
+
+        if request_name not in self._responses:
+            return self._respond(
+                start_response,
+                "500 Internal Server Error",
+                self._fault(f"No recording for {request_name}", SOAP_11_NAMESPACE),
+            )
+
+        response = self.replay(request_name, parameters)
+        if inject_fault:
+            namespace = etree.QName(
+                etree.fromstring(response.encode("utf-8"))
+            ).namespace
+            return self._respond(
+                start_response,
+                "500 Internal Server Error",
+                self._fault(self.fault_message, namespace),
+            )
+        return self._respond(start_response, "200 OK", response)
+
+    def replay(self, request_name, parameters):
+        """
+        Find the recorded response for a request.
+
+        Parameters
+        ----------
+        request_name : str
+            Local name of the request element, usually the name of the operation.
+        parameters : dict
+            Request parameters without credentials.
+
+        Returns
+        -------
+        str
+            SOAP envelope of the response.
+        """
+        responses = self._responses[request_name]
+        record = responses["by_key"].get(_request_key(parameters))
+        if record is not None:
+            return record["response"]
+
+        # Use the recording with the most parameters in common
+        record = max(
+            responses["all"],
+            key=lambda r: sum(
+                1 for k, v in parameters.items() if r["request"].get(k) == v
+            ),
+        )
+        response = record["response"]
+
+        # Replace MaStR numbers of the recorded request with the requested ones
+        for name, value in parameters.items():
+            recorded_value = record["request"].get(name)
+            if (
+                recorded_value
+                and recorded_value != value
+                and MASTR_NUMBER_PATTERN.fullmatch(value)
+            ):
+                response = response.replace(recorded_value, value)
+
+        # Other pages of list queries get distinct MaStR numbers
+        if parameters.get("startAb", "1") != record["request"].get("startAb", "1"):
+            response = _vary_mastr_numbers(response, parameters["startAb"])
+        return response
+
+    def _fault(self, message, namespace):
+        if namespace == SOAP_12_NAMESPACE:
+            fault = (
+                "<soap:Fault><soap:Code><soap:Value>soap:Receiver</soap:Value>"
+                f'</soap:Code><soap:Reason><soap:Text xml:lang="de">{message}'
+                "</soap:Text></soap:Reason></soap:Fault>"
+            )
+        else:
+            fault = (
+                "<soap:Fault><faultcode>soap:Server</faultcode>"
+                f"<faultstring>{message}</faultstring></soap:Fault>"
+            )
+        return (
+            f'<soap:Envelope xmlns:soap="{namespace}"><soap:Body>{fault}'
+            "</soap:Body></soap:Envelope>"
+        )
+
+    def _respond(self, start_response, status, response):
+        content = response.encode("utf-8")
+        start_response(
+            status,
+            [
+                ("Content-Type", "text/xml; charset=utf-8"),
+                ("Content-Length", str(len(content))),
+            ],
+        )
+        return [content]
+
+
+def _vary_mastr_numbers(response, salt):
+    """Replace MaStR numbers deterministically depending on `salt`."""
+
+    def vary(match):
+        digits = hashlib.sha1(f"{salt}{match.group(0)}".encode("utf-8")).hexdigest()
+        return match.group(1) + str(int(digits, 16))[-12:].zfill(12)
+
+    return MASTR_NUMBER_PATTERN.sub(vary, response)
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        log.debug(format % args)
+
+
+class StandInServer:
+    """
+    Run a [`SOAPStandIn`][open_mastr.soap_api.replay.SOAPStandIn] in a background thread
+
+    Use it as a context manager. The URL of the replayed WSDL file is
+    available as `wsdl` and can be passed to
+    [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI].
+
+    ```python
+
+        with StandInServer(SOAPStandIn("recordings", latency=0.2)) as stand_in:
+            mastr_api = MaStRAPI(user="SOM000000000000", key="stand-in", wsdl=stand_in.wsdl)
+    ```
+    """
+
+    def __init__(self, app, host="127.0.0.1", port=0):
+        self.app = app
+        self.server = make_server(
+            host,
+            port,
+            app,
+            server_class=_ThreadingWSGIServer,
+            handler_class=_QuietRequestHandler,
+        )
+        self.url = f"http://{host}:{self.server.server_port}"
+        self.wsdl = self.url + app.wsdl_path
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        log.info(f"SOAP stand-in is listening on {self.url}")
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self._thread.join()
@@ -0,0 +1,333 @@
+"""
+Retry failed requests to the MaStR SOAP API
+
+A [`RetryPolicy`][open_mastr.soap_api.retry.RetryPolicy] retries requests that
+failed because of temporary errors with exponential backoff and jitter. Faults
+caused by invalid credentials are raised as
+[`CredentialsRejected`][open_mastr.soap_api.retry.CredentialsRejected] without
+retry. An optional
+[`CircuitBreaker`][open_mastr.soap_api.retry.CircuitBreaker] pauses all requests
+that share it while the error rate is high, for example during an outage of the
+MaStR.
+
+SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+
+import asyncio
+import collections
+import random
+import threading
+import time
+
+import requests
+from zeep.exceptions import Fault, TransportError, XMLParseError
+
+from open_mastr.utils.config import setup_logger
+
+log = setup_logger()
+
+# Messages of SOAP Faults that are caused by the credentials of the request
+CREDENTIAL_FAULT_MESSAGES = ["Zugriff verweigert"]
+
+RETRYABLE_ERRORS = (
+    Fault,
+    TransportError,
+    XMLParseError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+)
+
+# Errors of requests that timed out. Whether they are retried is only decided by
+# `RetryPolicy.is_retryable`, callers must not retry them on their own.
+TIMEOUT_ERRORS = (requests.exceptions.Timeout,)
+
+
+class CredentialsRejected(Fault):
+    """Raised if the MaStR SOAP API rejects the user or token of a request."""
+
+
+def is_credential_fault(error) -> bool:
+    """True, if `error` is a SOAP Fault caused by invalid credentials."""
+    return isinstance(error, Fault) and error.message in CREDENTIAL_FAULT_MESSAGES
+
+
+def is_timeout(error) -> bool:
+    """True, if a request failed with `error` because it timed out."""
+    if isinstance(error, TIMEOUT_ERRORS):
+        return True
+    # Errors of the asyncio client, see AsyncMaStRAPI
+    return (
+        type(error).__module__.startswith("httpx") and "Timeout" in type(error).__name__
+    )
+
+
+def is_retryable(error) -> bool:
+    """True, if a request that failed with `error` may succeed if sent again."""
+    if is_credential_fault(error) or isinstance(error, CredentialsRejected):
+        return False
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    # Errors of the asyncio client, see AsyncMaStRAPI
+    return type(error).__module__.startswith("httpx")
+
+
+class CircuitBreaker:
+    """
+    Pauses all requests while the share of failed requests is high
+
+    The breaker opens if at least `failure_rate` of the last `window` requests
+    failed. While open, requests wait until `cooldown` seconds have passed.
+    Afterwards, a single trial request is sent. If it succeeds, the breaker
+    closes, otherwise it opens again.
+    """
+
+    def __init__(
+        self, failure_rate=0.5, window=20, min_requests=10, cooldown=60, clock=None
+    ):
+        """
+        Parameters
+        ----------
+        failure_rate : float, optional
+            Share of failed requests that opens the breaker. Defaults to 0.5.
+        window : int, optional
+            Number of recent requests the failure rate is computed of.
+            Defaults to 20.
+        min_requests : int, optional
+            Minimum number of recent requests before the breaker opens.
+            Defaults to 10.
+        cooldown : float, optional
+            Seconds requests are paused once the breaker opened. Defaults to 60.
+        clock : callable, optional
+            Returns the current time in seconds. Defaults to `time.monotonic`.
+        """
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self._clock = clock or time.monotonic
+        self._outcomes = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._open_until = 0
+        self._trial_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        """Either "closed", "open" or "half_open"."""
+        return self._state
+
+    def wait_time(self) -> float:
+        """
+        Seconds the caller has to wait before it may send a request, 0 if it may
+        send it now.
+        """
+        with self._lock:
+            now = self._clock()
+            if self._state == "open" and now >= self._open_until:
+                self._state = "half_open"
+                self._trial_in_flight = False
+            if self._state == "closed":
+                return 0
+            if self._state == "half_open":
+                if not self._trial_in_flight:
+                    self._trial_in_flight = True
+                    return 0
+                # Wait for the outcome of the trial request
+                return min(self.cooldown, 1)
+            return self._open_until - now
+
+    def record(self, success):
+        """Record the outcome of a request."""
+        with self._lock:
+            if self._state == "half_open":
+                if success:
+                    self._state = "closed"
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if (
+                self._state == "closed"
+                and len(self._outcomes) >= self.min_requests
+                and failures >= self.failure_rate * len(self._outcomes)
+            ):
+                self._open()
+
+    def _open(self):
+        self._state = "open"
+        self._open_until = self._clock() + self.cooldown
+        self._outcomes.clear()
+        self.times_opened += 1
+        log.warning(
+            f"MaStR SOAP API fails repeatedly. Requests are paused for {self.cooldown} s."
+        )
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with jitter for requests to the MaStR SOAP API
+
+    The n-th retry waits a random time between 0 and
+    `min(max_delay, base_delay * 2 ** n)` seconds ("full jitter"), such that
+    many workers do not retry at the same time. Pass the policy to
+    [`MaStRAPI`][open_mastr.soap_api.download.MaStRAPI]. All copies of the
+    `MaStRAPI` share it, including its circuit breaker and metrics.
+
+    ```python
+
+        retry_policy = RetryPolicy(max_retries=5, circuit_breaker=CircuitBreaker())
+        mastr_api = MaStRAPI(retry_policy=retry_policy)
+        ...
+        print(retry_policy.metrics)
+    ```
+    """
+
+    def __init__(
+        self,
+        max_retries=3,
+        base_delay=1.5,
+        max_delay=60,
+        circuit_breaker=None,
+        sleep=None,
+        seed=None,
+        retry_timeouts=True,
+    ):
+        """
+        Parameters
+        ----------
+        max_retries : int, optional
+            Maximum number of retries of a request. Defaults to 3.
+        base_delay : float, optional
+            Upper bound of the delay before the first retry in seconds.
+            Defaults to 1.5.
+        max_delay : float, optional
+            Upper bound of the delay before any retry in seconds. Defaults to 60.
+        circuit_breaker : CircuitBreaker, optional
+            Defaults to `None` which means requests are never paused.
+        sleep : callable, optional
+            Function used to wait. Defaults to `time.sleep`.
+        seed : int, optional
+            Seed of the jitter.
+        retry_timeouts : bool, optional
+            If False, requests that timed out are not retried. Defaults to True.
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.circuit_breaker = circuit_breaker
+        self.retry_timeouts = retry_timeouts
+        self._sleep = sleep or time.sleep
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._metrics = collections.Counter()
+
+    @property
+    def metrics(self) -> dict:
+        """
+        Counts of requests, retries, failed requests (after all retries),
+        rejected credentials and seconds paused by the circuit breaker.
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+        if self.circuit_breaker is not None:
+            metrics["circuit_opened"] = self.circuit_breaker.times_opened
+        return metrics
+
+    def is_retryable(self, error) -> bool:
+        """
+        True, if a request that failed with `error` is retried by this policy.
+        This is the only place that decides whether timed out requests are retried.
+        """
+        if not self.retry_timeouts and is_timeout(error):
+            return False
+        return is_retryable(error)
+
+    def delay(self, retry):
+        """Seconds to wait before retry number `retry` (starting at 0)."""
+        with self._lock:
+            return self._random.uniform(
+                0, min(self.max_delay, self.base_delay * 2**retry)
+            )
+
+    def call(self, function, *args, **kwargs):
+        """
+        Call `function` and retry it on temporary errors.
+
+        Raises
+        ------
+        CredentialsRejected
+            If the request was rejected because of the credentials.
+        Exception
+            The error of the last attempt, if it is not retryable or all
+            retries failed.
+        """
+        for retry in range(self.max_retries + 1):
+            self._wait_for_circuit_breaker(self._sleep)
+            try:
+                response = function(*args, **kwargs)
+            except Exception as e:
+                wait = self._handle_error(e, retry)
+                self._sleep(wait)
+                continue
+            self._record(success=True)
+            return response
+
+    async def call_async(self, function, *args, **kwargs):
+        """Counterpart of `call` for coroutine functions."""
+        for retry in range(self.max_retries + 1):
+            wait = self._circuit_breaker_wait_time()
+            while wait:
+                self._count("paused_seconds", wait)
+                await asyncio.sleep(wait)
+                wait = self._circuit_breaker_wait_time()
+            try:
+                response = await function(*args, **kwargs)
+            except Exception as e:
+                await asyncio.sleep(self._handle_error(e, retry))
+                continue
+            self._record(success=True)
+            return response
+
+    def _handle_error(self, error, retry):
+        """Raises `error` if it is final, else returns the delay of the next retry."""
+        if is_credential_fault(error):
+            self._record(success=True)
+            self._count("credentials_rejected")
+            raise CredentialsRejected(
+                "Your credentials could not be used to access the MaStR SOAP API "
+                "from BNetzA. Please make sure that they are correct."
+            ) from error
+        if not self.is_retryable(error):
+            self._record(success=not is_timeout(error))
+            raise error
+        self._record(success=False)
+        if retry >= self.max_retries:
+            self._count("failed")
+            raise error
+        self._count("retries")
+        delay = self.delay(retry)
+        log.debug(f"Retry {retry + 1} in {delay:.1f} s after {error!r}")
+        return delay
+
+    def _wait_for_circuit_breaker(self, sleep):
+        wait = self._circuit_breaker_wait_time()
+        while wait:
+            self._count("paused_seconds", wait)
+            sleep(wait)
+            wait = self._circuit_breaker_wait_time()
+
+    def _circuit_breaker_wait_time(self):
+        if self.circuit_breaker is None:
+            return 0
+        return self.circuit_breaker.wait_time()
+
+    def _record(self, success):
+        self._count("requests")
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(success)
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self._metrics[name] += value
@@ -144,6 +144,47 @@ def get_mastr_token(user):
     return password
 
 
+def get_mastr_credentials():
+    """
+    Read the credentials of all MaStR accounts from the config file
+
+    Several accounts are configured in sections named `MaStR:<name>` with the
+    options `user` and, optionally, `token`. Tokens that are not in the config
+    file are read from the keyring, stored under the section name and the user.
+    If no such section exists, the account of the section `MaStR` is returned.
+
+    Returns
+    -------
+    list of tuple
+        Name, user and token of each account. Empty, if no user is configured.
+    """
+    cfg = _load_config_file()
+    credentials = []
+    for section in cfg.sections():
+        if not section.startswith("MaStR:"):
+            continue
+        user = cfg.get(section, "user", fallback=None)
+        if not user:
+            log.warning(
+                f"The option 'user' could not by found in the section {section}."
+            )
+            continue
+        token = cfg.get(section, "token", fallback=None)
+        if not token:
+            # Reading from the keyring fails on headless systems
+            try:
+                token = keyring.get_password(section, user)
+            except Exception:
+                token = None
+        credentials.append((section[len("MaStR:") :], user, token))
+
+    if not credentials:
+        user = get_mastr_user()
+        if user:
+            credentials.append(("MaStR", user, get_mastr_token(user)))
+    return credentials
+
+
 def check_and_set_mastr_token(user):
     """Checks if MaStR token is stored, otherwise asks for it."""
 
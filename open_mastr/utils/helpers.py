@@ -1,6 +1,6 @@
 import os
 import json
-import sys
+import sqlite3
 from contextlib import contextmanager
 from datetime import date, datetime
 from warnings import warn
@@ -9,7 +9,8 @@ import dateutil
 import sqlalchemy
 from sqlalchemy.sql import insert, literal_column, text
 from dateutil.parser import parse
-from sqlalchemy import create_engine
+from sqlalchemy import and_, create_engine, exists, func, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Query, sessionmaker
 
 import pandas as pd
@@ -122,8 +123,8 @@ def validate_parameter_format_for_download_method(
 
 
 def validate_parameter_method(method) -> None:
-    if method not in ["bulk", "API"]:
-        raise ValueError("parameter method has to be either 'bulk' or 'API'.")
+    if method not in ["bulk", "API", "hybrid"]:
+        raise ValueError("parameter method has to be either 'bulk', 'API' or 'hybrid'.")
 
 
 def validate_parameter_api_location_types(api_location_types) -> None:
@@ -172,14 +173,14 @@ def validate_parameter_api_limit(api_limit) -> None:
 def validate_parameter_date(method, date) -> None:
     if date is None:  # default
         return
-    if method == "bulk":
+    if method in ["bulk", "hybrid"]:
         if date not in ["today", "existing"]:
             try:
                 _ = parse(date)
             except (dateutil.parser._parser.ParserError, TypeError) as e:
                 raise ValueError(
                     "Parameter date has to be a proper date in the format yyyymmdd"
-                    "or 'today' for bulk method."
+                    "or 'today' for bulk and hybrid method."
                 ) from e
     elif method == "API":
         if not isinstance(date, datetime) and date != "latest":
@@ -194,13 +195,6 @@ def validate_parameter_api_processes(api_processes) -> None:
         raise ValueError(
             "parameter api_processes has to be 'max' or an integer or 'None'"
         )
-    if api_processes == "max" or isinstance(api_processes, int):
-        system = sys.platform
-        if system not in ["linux2", "linux"]:
-            raise ValueError(
-                "The functionality of multiprocessing only works on Linux based systems. "
-                "On your system, the parameter api_processes has to be 'None'."
-            )
 
 
 def validate_parameter_data(method, data) -> None:
@@ -220,6 +214,11 @@ def validate_parameter_data(method, data) -> None:
                 raise ValueError(
                     f"Allowed values for parameter data with API method are {API_DATA}"
                 )
+            if method == "hybrid" and value not in TECHNOLOGIES:
+                raise ValueError(
+                    "Allowed values for parameter data with hybrid method are "
+                    f"{TECHNOLOGIES}"
+                )
             if method == "csv_export" and value not in TECHNOLOGIES + ADDITIONAL_TABLES:
                 raise ValueError(
                     "Allowed values for CSV export are "
@@ -261,6 +260,12 @@ def raise_warning_for_invalid_parameter_combinations(
             "For method = 'bulk', API related parameters (with prefix api_) are ignored."
         )
 
+    if method == "hybrid" and (api_data_types is not None or api_location_types):
+        warn(
+            "For method = 'hybrid', only extended unit data is updated from the API. "
+            "api_data_types and api_location_types are ignored."
+        )
+
 
 def transform_data_parameter(
     method, data, api_data_types, api_location_types, **kwargs
@@ -273,6 +278,8 @@ def transform_data_parameter(
     # parse parameters as list
     if isinstance(data, str):
         data = [data]
+    elif data is None and method == "hybrid":
+        data = list(TECHNOLOGIES)
     elif data is None:
         data = BULK_DATA if method == "bulk" else API_DATA
     if api_data_types is None:
@@ -298,13 +305,18 @@ def transform_data_parameter(
 
 
 def transform_date_parameter(self, method, date, **kwargs):
-    if method == "bulk":
+    if method in ["bulk", "hybrid"]:
         date = kwargs.get("bulk_date", date)
         date = "today" if date is None else date
         if date == "existing":
-            existing_files_list = os.listdir(
-                os.path.join(self.output_dir, "data", "xml_download")
-            )
+            # Metadata sidecar files of the downloads are stored in the same folder
+            existing_files_list = [
+                file_name
+                for file_name in os.listdir(
+                    os.path.join(self.output_dir, "data", "xml_download")
+                )
+                if file_name.endswith(".zip")
+            ]
             if not existing_files_list:
                 date = "today"
                 print(
@@ -337,6 +349,220 @@ def session_scope(engine):
         session.close()
 
 
+def unique_by_key(entries, key) -> list:
+    """
+    Remove entries with duplicate `key`, keeping the last occurrence
+
+    The MaStR API occasionally returns the same unit twice within one chunk.
+    Only the last occurrence of each `key` is kept and the order of the kept
+    entries is preserved.
+
+    Parameters
+    ----------
+    entries: list of dict
+        Data returned from the API, for example basic unit data.
+    key: str or tuple of str
+        Identifier of an entry, for example "EinheitMastrNummer". A tuple of
+        names identifies entries by the combination of their values.
+
+    Returns
+    -------
+    list of dict
+        Entries with unique `key`.
+    """
+    seen = set()
+    unique = []
+    for entry in reversed(entries):
+        value = (
+            tuple(entry[name] for name in key) if isinstance(key, tuple) else entry[key]
+        )
+        if value not in seen:
+            seen.add(value)
+            unique.append(entry)
+    unique.reverse()
+    return unique
+
+
+def supports_returning(session) -> bool:
+    """
+    True, if the database of `session` supports `RETURNING` clauses, i.e. it is
+    PostgreSQL or SQLite (>= 3.35).
+    """
+    dialect = session.get_bind().dialect.name
+    return dialect == "postgresql" or (
+        dialect == "sqlite" and sqlite3.sqlite_version_info >= (3, 35)
+    )
+
+
+def bulk_upsert(session, table_class, entries, newer_column=None) -> set:
+    """
+    Insert new entries and update existing ones in one statement
+
+    Uses `INSERT ... ON CONFLICT DO UPDATE ... RETURNING` on PostgreSQL and
+    SQLite (>= 3.35). On other databases, entries are upserted row by row.
+
+    Parameters
+    ----------
+    session: sqlalchemy.orm.Session
+        Database session.
+    table_class: sqlalchemy.orm.DeclarativeMeta
+        ORM class of the table.
+    entries: list of dict
+        Rows with column names as keys. Columns missing in some rows are set
+        to `NULL`. Of entries with the same primary key, the last one is used.
+    newer_column: str, optional
+        If given, existing rows are only updated if the value of this column,
+        usually "DatumLetzteAktualisierung", is newer than the stored one.
+        Defaults to `None` which means existing rows are always updated.
+
+    Returns
+    -------
+    set
+        Primary keys of inserted and updated rows. Tuples of the key values if
+        the table has a composite primary key.
+    """
+    if not entries:
+        return set()
+
+    table = table_class.__table__
+    primary_keys = list(table.primary_key.columns)
+    key_names = tuple(column.name for column in primary_keys)
+    entries = unique_by_key(entries, key_names if len(key_names) > 1 else key_names[0])
+    columns = list(dict.fromkeys(column for entry in entries for column in entry))
+    entries = [{column: entry.get(column) for column in columns} for entry in entries]
+    if not supports_returning(session):
+        return _upsert_row_by_row(session, table_class, entries, newer_column)
+    if session.get_bind().dialect.name == "postgresql":
+        stmt = postgresql.insert(table)
+    else:
+        stmt = sqlite.insert(table)
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=primary_keys,
+        set_={
+            column: stmt.excluded[column]
+            for column in columns
+            if column not in key_names
+        },
+        where=stmt.excluded[newer_column] > table.c[newer_column]
+        if newer_column
+        else None,
+    ).returning(*primary_keys)
+    result = session.execute(stmt, entries)
+    if len(primary_keys) == 1:
+        return set(result.scalars())
+    return {tuple(row) for row in result}
+
+
+def _upsert_row_by_row(session, table_class, entries, newer_column) -> set:
+    key_names = [column.name for column in table_class.__table__.primary_key.columns]
+    key_attrs = [getattr(table_class, name) for name in key_names]
+
+    def entry_key(entry):
+        if len(key_names) == 1:
+            return entry[key_names[0]]
+        return tuple(entry[name] for name in key_names)
+
+    common_ids = {
+        row[0] if len(key_names) == 1 else tuple(row)
+        for row in session.query(*key_attrs).filter(
+            tuple_(*key_attrs).in_(
+                [tuple(entry[name] for name in key_names) for entry in entries]
+            )
+        )
+    }
+
+    upserted = set()
+    insert = []
+    for entry in entries:
+        entry_id = entry_key(entry)
+        # In case data already exists, only update if new data is newer
+        if entry_id in common_ids:
+            query_filter = and_(
+                *(attr == entry[name] for attr, name in zip(key_attrs, key_names))
+            )
+            if newer_column:
+                query_filter = and_(
+                    query_filter,
+                    getattr(table_class, newer_column) < entry[newer_column],
+                )
+            if session.query(exists().where(query_filter)).scalar():
+                session.merge(table_class(**entry))
+                upserted.add(entry_id)
+        # In case of new data, just insert
+        else:
+            insert.append(table_class(**entry))
+            upserted.add(entry_id)
+    session.bulk_save_objects(insert)
+    return upserted
+
+
+def record_watermarks(engine, technologies, source="bulk") -> dict:
+    """
+    Save the newest change date of the extended unit table of each technology
+
+    The watermarks are the starting point of
+    [`MaStRMirror.sync_extended_unit_data`][open_mastr.soap_api.mirror.MaStRMirror.sync_extended_unit_data],
+    which fetches units changed afterwards from the API.
+
+    Parameters
+    ----------
+    engine: sqlalchemy.engine.Engine
+        Database engine.
+    technologies: list of str
+        Technologies, for example ["wind", "solar"]. Other values of `data` are
+        ignored.
+    source: str, optional
+        Origin of the data the watermarks are derived from. Defaults to "bulk".
+
+    Returns
+    -------
+    dict
+        Watermark of each technology with data in its extended unit table.
+    """
+    watermarks = {}
+    with session_scope(engine=engine) as session:
+        for tech in technologies:
+            if tech not in TECHNOLOGIES:
+                continue
+            table_class = getattr(orm, ORM_MAP[tech]["unit_data"])
+            newest_date = session.query(
+                func.max(table_class.DatumLetzteAktualisierung)
+            ).scalar()
+            if newest_date is not None:
+                watermarks[tech] = newest_date
+        update_watermarks(session, watermarks, source)
+    return watermarks
+
+
+def update_watermarks(session, watermarks, source) -> None:
+    """Upserts watermarks, given as dict of technology and change date."""
+    bulk_upsert(
+        session,
+        orm.SyncWatermark,
+        [
+            {
+                "technology": tech,
+                "DatumLetzteAktualisierung": watermark,
+                "DatenQuelle": source,
+                "updated_at": datetime.now(),
+            }
+            for tech, watermark in watermarks.items()
+        ],
+    )
+
+
+def get_watermarks(engine, technologies) -> dict:
+    """Returns the watermarks of `technologies` that were recorded before."""
+    with session_scope(engine=engine) as session:
+        return dict(
+            session.query(
+                orm.SyncWatermark.technology,
+                orm.SyncWatermark.DatumLetzteAktualisierung,
+            ).filter(orm.SyncWatermark.technology.in_(technologies))
+        )
+
+
 def print_api_settings(
     harmonisation_log,
     data,
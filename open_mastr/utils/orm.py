@@ -9,6 +9,7 @@ from sqlalchemy import (
     Boolean,
     func,
     Date,
+    Index,
     JSON,
 )
 
@@ -43,6 +44,37 @@ class BasicUnit(Base):
     NichtVorhandenInMigriertenEinheiten = Column(String)
     EinheitSystemstatus = Column(String)
 
+    # Latest change date per technology and anti-joins with additional data,
+    # see MaStRMirror._get_list_of_dates and MaStRMirror._get_units_for_request
+    __table_args__ = (
+        Index("ix_basic_units_date", "Einheittyp", "DatumLetzteAktualisierung"),
+        Index("ix_basic_units_eeg", "Einheittyp", "EegMastrNummer"),
+        Index("ix_basic_units_kwk", "Einheittyp", "KwkMastrNummer"),
+        Index("ix_basic_units_permit", "Einheittyp", "GenMastrNummer"),
+    )
+
+
+class AdditionalDataCache(Base):
+    __tablename__ = "additional_data_cache"
+
+    additional_data_id = Column(String, primary_key=True)
+    # The same id may be requested as different data types, e.g. unit and EEG data
+    data_type = Column(String, primary_key=True)
+    # Hash of the fields of the basic unit the additional data depends on
+    fingerprint = Column(String)
+    DatumLetzteAktualisierung = Column(DateTime(timezone=True))
+    download_date = Column(DateTime(timezone=True), default=func.now())
+
+
+class SyncWatermark(Base):
+    __tablename__ = "sync_watermarks"
+
+    technology = Column(String, primary_key=True)
+    # Units changed after this date are fetched by Mastr.download(method="hybrid")
+    DatumLetzteAktualisierung = Column(DateTime(timezone=True))
+    DatenQuelle = Column(String)
+    updated_at = Column(DateTime(timezone=True), default=func.now())
+
 
 class AdditionalDataRequested(Base):
     __tablename__ = "additional_data_requested"
@@ -57,6 +89,20 @@ class AdditionalDataRequested(Base):
     technology = Column(String)
     data_type = Column(String)
     request_date = Column(DateTime(timezone=True), default=func.now())
+    # Lease of the request by a worker, see MaStRMirror.retrieve_additional_data
+    worker_id = Column(String)
+    lease_expiry = Column(DateTime(timezone=True))
+    attempts = Column(Integer, default=0)
+    # Requests with higher priority are retrieved first, see
+    # open_mastr.soap_api.mirror.additional_data_request_priority
+    priority = Column(Float, default=0)
+
+    __table_args__ = (
+        Index("ix_additional_data_requested_priority", "data_type", "priority", "id"),
+        Index(
+            "ix_additional_data_requested_technology", "data_type", "technology", "id"
+        ),
+    )
 
 
 class MissedAdditionalData(Base):
@@ -439,6 +485,10 @@ class AdditionalLocationsRequested(Base):
     location_type = Column(String)
     request_date = Column(DateTime(timezone=True), default=func.now())
 
+    __table_args__ = (
+        Index("ix_additional_locations_requested_type", "location_type", "id"),
+    )
+
 
 class MissedExtendedLocation(ParentAllTables, Base):
     __tablename__ = "missed_extended_location_data"
@@ -1,6 +1,9 @@
+import json
 import os
 import shutil
 import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from importlib.metadata import PackageNotFoundError, version
 from zipfile import BadZipfile, ZipFile
 
@@ -83,11 +86,256 @@ def gen_url(when: time.struct_time = time.localtime()) -> str:
     return f"https://download.marktstammdatenregister.de/Gesamtdatenexport_{date}_{version}.zip"
 
 
+# Suffix of the sidecar file that stores the HTTP metadata of a downloaded export
+METADATA_SIDECAR_SUFFIX = ".meta.json"
+
+# Seconds to wait for the response to a HEAD request of the bulk export
+HEAD_REQUEST_TIMEOUT = 30
+
+
+def get_remote_file_metadata(url: str) -> dict:
+    """
+    Request the HTTP metadata of a remote bulk export without downloading it.
+
+    Parameters
+    -----------
+    url: str
+        Download URL of the zipped MaStR export, see :func:`gen_url`.
+
+    Returns
+    -------
+    dict or None
+        Dictionary with the keys `url`, `etag`, `last_modified` and `content_length`.
+        `None` is returned if the file does not exist on the server. The values
+        are `None` if the server does not answer the HEAD request properly.
+    """
+    try:
+        r = requests.head(
+            url,
+            allow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+            timeout=HEAD_REQUEST_TIMEOUT,
+        )
+    except requests.exceptions.Timeout:
+        log.debug(f"HEAD request to {url} timed out.")
+        return _unknown_metadata(url)
+    if r.status_code == 404:
+        return None
+    if not r.ok:
+        # The server does not answer HEAD requests properly, freshness is unknown
+        log.debug(f"HEAD request to {url} returned status code {r.status_code}.")
+        return _unknown_metadata(url)
+    return _metadata_from_headers(url, r.headers)
+
+
+def _unknown_metadata(url: str) -> dict:
+    return {
+        "url": url,
+        "etag": None,
+        "last_modified": None,
+        "content_length": None,
+    }
+
+
+def _metadata_from_headers(url: str, headers) -> dict:
+    content_length = headers.get("Content-Length")
+    return {
+        "url": url,
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "content_length": int(content_length) if content_length else None,
+    }
+
+
+def write_metadata_sidecar(save_path: str, metadata: dict) -> None:
+    """Store the HTTP metadata of a downloaded export next to the zip file."""
+    with open(save_path + METADATA_SIDECAR_SUFFIX, "w") as f:
+        json.dump(metadata, f, indent=2)
+
+
+def is_same_remote_file(local_metadata: dict, remote_metadata: dict) -> bool:
+    """
+    Compare the stored metadata of a local export with the metadata of the remote export.
+
+    The `ETag` is compared if both sides have one. Otherwise, `Last-Modified` and
+    `Content-Length` have to match. If neither is available, the files are
+    considered to be different.
+    """
+    if local_metadata.get("etag") and remote_metadata.get("etag"):
+        return local_metadata["etag"] == remote_metadata["etag"]
+    if not (
+        remote_metadata.get("last_modified") and remote_metadata.get("content_length")
+    ):
+        return False
+    return (
+        local_metadata.get("last_modified") == remote_metadata["last_modified"]
+        and local_metadata.get("content_length") == remote_metadata["content_length"]
+    )
+
+
+def find_local_copy_of_remote_file(xml_folder_path: str, remote_metadata: dict):
+    """
+    Search `xml_folder_path` for a complete local copy of the remote export.
+
+    All metadata sidecar files in the folder are checked, hence the local
+    copy can be stored under any file name.
+
+    Returns
+    -------
+    str or None
+        Path of the matching zip file or `None` if no local copy exists.
+    """
+    if not os.path.isdir(xml_folder_path):
+        return None
+    for file_name in sorted(os.listdir(xml_folder_path)):
+        if not file_name.endswith(METADATA_SIDECAR_SUFFIX):
+            continue
+        sidecar_path = os.path.join(xml_folder_path, file_name)
+        zip_path = sidecar_path[: -len(METADATA_SIDECAR_SUFFIX)]
+        if not os.path.isfile(zip_path):
+            continue
+        try:
+            with open(sidecar_path) as f:
+                local_metadata = json.load(f)
+        except (OSError, ValueError):
+            log.debug(f"Ignoring unreadable metadata file {sidecar_path}")
+            continue
+        if not is_same_remote_file(local_metadata, remote_metadata):
+            continue
+        # An aborted download leaves a file that is smaller than announced
+        expected_size = remote_metadata.get("content_length")
+        if expected_size and os.path.getsize(zip_path) != expected_size:
+            continue
+        return zip_path
+    return None
+
+
+# Suffix of the manifest file that caches the verified member checksums of an export
+CHECKSUM_MANIFEST_SUFFIX = ".checksums.json"
+
+
+def _read_zip_members(zip_path: str, member_names: list) -> None:
+    """Read members completely, which makes `zipfile` check their CRC."""
+    # Each worker uses its own file handle to read members independently
+    with ZipFile(zip_path) as zf:
+        for member_name in member_names:
+            with zf.open(member_name) as member:
+                while member.read(4 * 1024 * 1024):
+                    pass
+
+
+def _load_checksum_manifest(zip_path: str):
+    try:
+        with open(zip_path + CHECKSUM_MANIFEST_SUFFIX) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def verify_zip_file(zip_path: str, max_workers: int = None) -> bool:
+    """
+    Verify the CRC of all members of a zip file.
+
+    Opening a zip file only reads its central directory, while corrupted member
+    data is only detected when decompressing it. Members are therefore read in
+    parallel threads, which is efficient because zlib releases the GIL during
+    decompression.
+
+    The checksums of a successfully verified file are cached in a manifest next to
+    the zip file. As long as size, modification time and checksums in the central
+    directory do not change, the file is not verified again.
+
+    Parameters
+    -----------
+    zip_path: str
+        Path of the zip file.
+    max_workers: int, optional
+        Number of threads used for verification. Defaults to the number of CPUs.
+
+    Returns
+    -------
+    bool
+        True if all members could be read without errors.
+    """
+    try:
+        with ZipFile(zip_path) as zf:
+            infos = [info for info in zf.infolist() if not info.is_dir()]
+    except (BadZipfile, OSError):
+        return False
+
+    file_stat = os.stat(zip_path)
+    manifest = {
+        "size": file_stat.st_size,
+        "mtime_ns": file_stat.st_mtime_ns,
+        "members": {info.filename: info.CRC for info in infos},
+    }
+    if _load_checksum_manifest(zip_path) == manifest:
+        log.debug(f"Checksums of {zip_path} were already verified.")
+        return True
+
+    # Distribute members evenly by size over the workers
+    max_workers = min(max_workers or os.cpu_count() or 1, max(len(infos), 1))
+    member_groups = [[] for _ in range(max_workers)]
+    group_sizes = [0] * max_workers
+    for info in sorted(infos, key=lambda i: i.compress_size, reverse=True):
+        smallest_group = group_sizes.index(min(group_sizes))
+        member_groups[smallest_group].append(info.filename)
+        group_sizes[smallest_group] += info.compress_size
+
+    print(f"Verifying checksums of {len(infos)} files in {zip_path}.")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_read_zip_members, zip_path, group)
+            for group in member_groups
+            if group
+        ]
+        try:
+            for future in futures:
+                future.result()
+        except (BadZipfile, zlib.error, EOFError, OSError) as e:
+            log.error(f"Zip file {zip_path} is corrupted: {e}")
+            return False
+
+    with open(zip_path + CHECKSUM_MANIFEST_SUFFIX, "w") as f:
+        json.dump(manifest, f)
+    return True
+
+
+def _remove_zip_file(zip_path: str) -> None:
+    for path in [zip_path, zip_path + CHECKSUM_MANIFEST_SUFFIX]:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def _previous_day(when: time.struct_time) -> time.struct_time:
+    return time.localtime(time.mktime(when) - 24 * 60 * 60)
+
+
+def _log_retry_with_yesterday() -> None:
+    log.warning(
+        "Download file was not found. Assuming that the new file was not published "
+        "yet and retrying with yesterday."
+    )
+
+
 def download_xml_Mastr(
     save_path: str, bulk_date_string: str, xml_folder_path: str
 ) -> None:
     """Downloads the zipped MaStR.
 
+    Existing and newly downloaded files are verified with :func:`verify_zip_file`.
+    Before downloading, the `ETag`, `Last-Modified` and `Content-Length` of the
+    remote export are requested. If a local export with the same metadata
+    exists in `xml_folder_path` under any name, it is reused instead of being
+    downloaded again.
+
     Parameters
     -----------
     save_path: str
@@ -95,20 +343,44 @@ def download_xml_Mastr(
     """
 
     if os.path.exists(save_path):
-        try:
-            _ = ZipFile(save_path)
-        except BadZipfile:
-            log.info(f"Bad Zip file is deleted: {save_path}")
-            os.remove(save_path)
-        else:
+        if verify_zip_file(save_path):
             print("MaStR already downloaded.")
             return None
+        log.info(f"Bad Zip file is deleted: {save_path}")
+        _remove_zip_file(save_path)
 
     if bulk_date_string != "today":
         raise OSError(
             "There exists no file for given date. MaStR can only be downloaded "
             "from the website if today's date is given."
         )
+
+    now = time.localtime()
+    url = gen_url(now)
+
+    remote_metadata = get_remote_file_metadata(url)
+    retried_with_yesterday = False
+    if remote_metadata is None:
+        _log_retry_with_yesterday()
+        url = gen_url(_previous_day(now))
+        remote_metadata = get_remote_file_metadata(url)
+        retried_with_yesterday = True
+    if remote_metadata is None:
+        log.error("Could not download file: download URL not found")
+        return
+
+    local_copy = find_local_copy_of_remote_file(xml_folder_path, remote_metadata)
+    if local_copy and verify_zip_file(local_copy):
+        print(f"MaStR export from {url} is already available as {local_copy}.")
+        _link_or_copy(local_copy, save_path)
+        write_metadata_sidecar(save_path, remote_metadata)
+        # A hard link shares the modification time, so the verification stays valid
+        shutil.copyfile(
+            local_copy + CHECKSUM_MANIFEST_SUFFIX,
+            save_path + CHECKSUM_MANIFEST_SUFFIX,
+        )
+        return None
+
     shutil.rmtree(xml_folder_path, ignore_errors=True)
     os.makedirs(xml_folder_path, exist_ok=True)
 
@@ -122,19 +394,13 @@ def download_xml_Mastr(
     )
     print(print_message)
 
-    now = time.localtime()
-    url = gen_url(now)
-
     time_a = time.perf_counter()
     r = requests.get(url, stream=True, headers={"User-Agent": USER_AGENT})
-    if r.status_code == 404:
-        log.warning(
-            "Download file was not found. Assuming that the new file was not published yet and retrying with yesterday."
-        )
-        now = time.localtime(
-            time.mktime(now) - (24 * 60 * 60)
-        )  # subtract 1 day from the date
-        url = gen_url(now)
+    # HEAD requests may fail while the export is not published yet
+    if r.status_code == 404 and not retried_with_yesterday:
+        _log_retry_with_yesterday()
+        url = gen_url(_previous_day(now))
+        remote_metadata = _unknown_metadata(url)
         r = requests.get(url, stream=True, headers={"User-Agent": USER_AGENT})
     if r.status_code == 404:
         log.error("Could not download file: download URL not found")
@@ -159,5 +425,20 @@ def download_xml_Mastr(
                 # remove warning
                 bar.set_postfix_str(s="")
     time_b = time.perf_counter()
+
+    if not verify_zip_file(save_path):
+        _remove_zip_file(save_path)
+        raise BadZipfile(
+            f"The downloaded file from {url} is corrupted and was deleted. "
+            "Please try to download it again."
+        )
+
+    # Headers of the actual transfer take precedence over the HEAD response
+    download_metadata = _metadata_from_headers(url, r.headers)
+    for key, value in remote_metadata.items():
+        if download_metadata.get(key) is None:
+            download_metadata[key] = value
+    write_metadata_sidecar(save_path, download_metadata)
+
     print(f"Download is finished. It took {int(np.around(time_b - time_a))} seconds.")
     print(f"MaStR was successfully downloaded to {xml_folder_path}.")
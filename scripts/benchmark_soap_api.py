@@ -0,0 +1,151 @@
+"""
+Benchmark the SOAP API download against a local stand-in server
+
+Record responses of the MaStR SOAP API once (requires credentials)
+
+    python scripts/benchmark_soap_api.py record recordings/ --data solar --limit 20
+
+and replay them as often as needed without account and contingent
+
+    python scripts/benchmark_soap_api.py run recordings/ --data solar --limit 4000 --latency 0.1
+
+The benchmark reports units per second of `MaStRMirror.backfill_basic` and
+`MaStRMirror.retrieve_additional_data`.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+from open_mastr.soap_api.download import MASTR_WSDL_URL, MaStRAPI, MaStRDownload
+from open_mastr.soap_api.mirror import MaStRMirror
+from open_mastr.soap_api.replay import (
+    SOAPRecorder,
+    SOAPStandIn,
+    StandInServer,
+    record_service_documents,
+)
+from open_mastr.utils import orm
+from open_mastr.utils.constants import API_DATA_TYPES, ORM_MAP
+from open_mastr.utils.helpers import session_scope
+
+
+def record(directory, data, limit):
+    record_service_documents(directory, MASTR_WSDL_URL)
+    mastr_api = MaStRAPI(plugins=[SOAPRecorder(directory)])
+    mastr_dl = MaStRDownload(mastr_api=mastr_api)
+
+    units = [
+        unit
+        for chunk in mastr_dl.basic_unit_data(data=data, limit=limit)
+        for unit in chunk
+    ]
+    for data_type, key, data_fcn in [
+        ("unit_data", "EinheitMastrNummer", "extended_unit_data"),
+        ("eeg_data", "EegMastrNummer", "eeg_unit_data"),
+        ("kwk_data", "KwkMastrNummer", "kwk_unit_data"),
+        ("permit_data", "GenMastrNummer", "permit_unit_data"),
+    ]:
+        ids = mastr_dl._create_ID_list(units, data_type, key, data)
+        if ids:
+            mastr_dl.additional_data(data, ids, data_fcn)
+    print(f"Recorded responses for {len(units)} {data} units to {directory}")
+
+
+def run(directory, data, limit, latency, latency_jitter, fault_rate, report):
+    stand_in = SOAPStandIn(
+        directory,
+        latency=latency,
+        latency_jitter=latency_jitter,
+        fault_rate=fault_rate,
+        seed=0,
+    )
+    results = {
+        "data": data,
+        "limit": limit,
+        "latency": latency,
+        "latency_jitter": latency_jitter,
+        "fault_rate": fault_rate,
+    }
+
+    with StandInServer(stand_in) as server, tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'benchmark.db')}")
+        orm.Base.metadata.create_all(engine)
+        mastr_api = MaStRAPI(user="SOM000000000000", key="stand-in", wsdl=server.wsdl)
+        mirror = MaStRMirror(engine, mastr_api=mastr_api)
+
+        time_a = time.perf_counter()
+        mirror.backfill_basic([data], limit=limit)
+        duration = time.perf_counter() - time_a
+        with session_scope(engine=engine) as session:
+            units = session.query(orm.BasicUnit).count()
+        results["backfill_basic"] = _result(units, duration)
+
+        for data_type in API_DATA_TYPES:
+            if data_type not in ORM_MAP[data]:
+                continue
+            additional_data_orm = getattr(orm, ORM_MAP[data][data_type])
+            time_a = time.perf_counter()
+            mirror.retrieve_additional_data(data, data_type, limit=limit)
+            duration = time.perf_counter() - time_a
+            with session_scope(engine=engine) as session:
+                units = session.query(additional_data_orm).count()
+            results[f"retrieve_additional_data ({data_type})"] = _result(
+                units, duration
+            )
+        engine.dispose()
+
+    for step, result in results.items():
+        if isinstance(result, dict):
+            print(
+                f"{step}: {result['units']} units in {result['seconds']:.1f} s "
+                f"({result['units_per_second']:.1f} units/s)"
+            )
+    if report:
+        with open(report, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+def _result(units, duration):
+    return {
+        "units": units,
+        "seconds": duration,
+        "units_per_second": units / duration if duration else 0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="Record API responses")
+    record_parser.add_argument("directory")
+    record_parser.add_argument("--data", default="solar")
+    record_parser.add_argument("--limit", type=int, default=20)
+
+    run_parser = subparsers.add_parser("run", help="Benchmark against the stand-in")
+    run_parser.add_argument("directory")
+    run_parser.add_argument("--data", default="solar")
+    run_parser.add_argument("--limit", type=int, default=2000)
+    run_parser.add_argument("--latency", type=float, default=0.0)
+    run_parser.add_argument("--latency-jitter", type=float, default=0.0)
+    run_parser.add_argument("--fault-rate", type=float, default=0.0)
+    run_parser.add_argument("--report", help="Save results as JSON to this file")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.directory, args.data, args.limit)
+    else:
+        run(
+            args.directory,
+            args.data,
+            args.limit,
+            args.latency,
+            args.latency_jitter,
+            args.fault_rate,
+            args.report,
+        )
@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+WSDL = """<definitions xmlns="http://schemas.xmlsoap.org/wsdl/"
+    xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/"
+    xmlns:xs="http://www.w3.org/2001/XMLSchema"
+    xmlns:tns="urn:test" targetNamespace="urn:test">
+  <types>
+    <xs:schema targetNamespace="urn:test" elementFormDefault="qualified">
+      <xs:element name="GetEinheit">
+        <xs:complexType><xs:sequence>
+          <xs:element name="apiKey" type="xs:string"/>
+          <xs:element name="marktakteurMastrNummer" type="xs:string"/>
+          <xs:element name="einheitMastrNummer" type="xs:string"/>
+        </xs:sequence></xs:complexType>
+      </xs:element>
+      <xs:element name="GetEinheitResponse">
+        <xs:complexType><xs:sequence>
+          <xs:element name="EinheitMastrNummer" type="xs:string"/>
+        </xs:sequence></xs:complexType>
+      </xs:element>
+    </xs:schema>
+  </types>
+  <message name="GetEinheitRequest"><part name="parameters" element="tns:GetEinheit"/></message>
+  <message name="GetEinheitResponse">
+    <part name="parameters" element="tns:GetEinheitResponse"/>
+  </message>
+  <portType name="Port"><operation name="GetEinheit">
+    <input message="tns:GetEinheitRequest"/><output message="tns:GetEinheitResponse"/>
+  </operation></portType>
+  <binding name="Binding" type="tns:Port">
+    <soap:binding transport="http://schemas.xmlsoap.org/soap/http"/>
+    <operation name="GetEinheit"><soap:operation soapAction="GetEinheit"/>
+      <input><soap:body use="literal"/></input>
+      <output><soap:body use="literal"/></output>
+    </operation>
+  </binding>
+  <service name="Marktstammdatenregister"><port name="Anlage" binding="tns:Binding">
+    <soap:address location="https://www.example.org/service"/>
+  </port></service>
+</definitions>
+"""
+
+
+@pytest.fixture
+def recording(tmp_path):
+    """Recording of a GetEinheit response for a SOAPStandIn"""
+    os.makedirs(tmp_path / "documents")
+    os.makedirs(tmp_path / "responses")
+    with open(tmp_path / "recording.json", "w") as f:
+        json.dump({"origin": "https://www.example.org", "wsdl_path": "/mastr.wsdl"}, f)
+    with open(tmp_path / "documents" / "mastr.wsdl", "w") as f:
+        f.write(WSDL)
+    record = {
+        "operation": "GetEinheit",
+        "request": {"einheitMastrNummer": "SEE000000000001"},
+        "response": (
+            '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+            '<soap:Body><GetEinheitResponse xmlns="urn:test">'
+            "<EinheitMastrNummer>SEE000000000001</EinheitMastrNummer>"
+            "</GetEinheitResponse></soap:Body></soap:Envelope>"
+        ),
+    }
+    with open(tmp_path / "responses" / "GetEinheit.jsonl", "w") as f:
+        f.write(json.dumps(record) + "\n")
+    return tmp_path
@@ -0,0 +1,69 @@
+import datetime
+import decimal
+
+import pytest
+from sqlalchemy import create_engine
+
+from open_mastr.soap_api.archive import ResponseArchive
+from open_mastr.soap_api.mirror import MaStRMirror
+from open_mastr.utils import orm
+from open_mastr.utils.helpers import session_scope
+
+pytest.importorskip("zstandard")
+
+
+def unit_response(mastr_nummer, leistung):
+    return {
+        "Ergebniscode": "OK",
+        "AufrufVeraltet": False,
+        "AufrufVersion": 1,
+        "AufrufLebenszeitEnde": None,
+        "EinheitMastrNummer": mastr_nummer,
+        "DatumLetzteAktualisierung": datetime.datetime(2022, 1, 1, 12, 30),
+        "Inbetriebnahmedatum": datetime.date(2021, 6, 1),
+        "Nettonennleistung": decimal.Decimal(leistung),
+    }
+
+
+def test_archive_roundtrip(tmp_path):
+    archive = ResponseArchive(tmp_path)
+    day = datetime.date(2022, 1, 2)
+    archive.write("solar", "unit_data", [unit_response("SEE000000000001", "9.9")], day)
+    archive.write("solar", "unit_data", [unit_response("SEE000000000002", "5")], day)
+    archive.write("wind", "eeg_data", [{"EegMastrNummer": "EEG000000000001"}])
+
+    assert archive.partitions(data_type="unit_data") == [("solar", "unit_data", day)]
+    assert list(archive.read("solar", "unit_data", day)) == [
+        unit_response("SEE000000000001", "9.9"),
+        unit_response("SEE000000000002", "5"),
+    ]
+
+
+def test_reprocess(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mirror.db'}")
+    orm.Base.metadata.create_all(engine)
+    archive = ResponseArchive(tmp_path / "archive")
+    archive.write(
+        "solar",
+        "unit_data",
+        [unit_response("SEE000000000001", "1"), unit_response("SEE000000000002", "2")],
+        datetime.date(2022, 1, 1),
+    )
+    archive.write(
+        "solar",
+        "unit_data",
+        [unit_response("SEE000000000001", "3")],
+        datetime.date(2022, 1, 2),
+    )
+
+    MaStRMirror(engine, mastr_api=object()).reprocess(archive, chunksize=1)
+
+    with session_scope(engine=engine) as session:
+        units = {
+            _.EinheitMastrNummer: (_.Nettonennleistung, _.DatumDownload)
+            for _ in session.query(orm.SolarExtended)
+        }
+    assert units == {
+        "SEE000000000001": (3.0, datetime.date(2022, 1, 2)),
+        "SEE000000000002": (2.0, datetime.date(2022, 1, 1)),
+    }
@@ -0,0 +1,66 @@
+import datetime
+
+import pytest
+
+from open_mastr.soap_api.credential_pool import CredentialPool
+from open_mastr.soap_api.rate_limit import ContingentExhausted
+
+
+def contingent_source(limits):
+    """Stand-in for MaStRAPI.GetAktuellerStandTageskontingent"""
+
+    def get_contingent(apiKey, marktakteurMastrNummer):
+        return {
+            "AktuellerStandTageskontingent": 0,
+            "AktuellesLimitTageskontingent": limits[marktakteurMastrNummer],
+        }
+
+    return get_contingent
+
+
+@pytest.fixture
+def credential_pool():
+    pool = CredentialPool(
+        [
+            ("institute", "SOM000000000001", "token1"),
+            ("project", "SOM000000000002", "token2"),
+            ("missing", "SOM000000000003", None),
+        ],
+        reserve=0,
+    )
+    pool.attach(contingent_source({"SOM000000000001": 2, "SOM000000000002": 3}))
+    return pool
+
+
+def test_checkout_spreads_workers(credential_pool):
+    assert len(credential_pool) == 2
+    names = [credential_pool.checkout().name for _ in range(4)]
+    assert sorted(names) == ["institute", "institute", "project", "project"]
+
+
+def test_release_returns_account_to_pool(credential_pool):
+    first = credential_pool.checkout()
+    second = credential_pool.checkout()
+    assert first is not second
+
+    # A released account is assigned to the next worker again
+    credential_pool.release(first)
+    assert credential_pool.checkout() is first
+    assert [c.workers for c in credential_pool.credentials] == [1, 1]
+
+
+def test_acquire_until_all_contingents_are_used_up(credential_pool):
+    preferred = credential_pool.credentials[0]
+    users = [credential_pool.acquire(preferred).user for _ in range(5)]
+
+    # The preferred account is used until its contingent is used up
+    assert users == ["SOM000000000001"] * 2 + ["SOM000000000002"] * 3
+    assert credential_pool.remaining == 0
+    with pytest.raises(ContingentExhausted) as e:
+        credential_pool.acquire(preferred)
+    assert e.value.resume_at > datetime.datetime.now()
+
+
+def test_pool_needs_a_token():
+    with pytest.raises(ValueError):
+        CredentialPool([("institute", "SOM000000000001", None)])
@@ -0,0 +1,200 @@
+import decimal
+
+import pytest
+from lxml import etree
+from zeep import Client, Settings
+from zeep.exceptions import Fault
+from zeep.helpers import serialize_object
+
+from open_mastr.soap_api import download
+from open_mastr.soap_api.deserialize import ResponseDeserializer
+from open_mastr.soap_api.download import MaStRAPI, flatten_dict
+from open_mastr.soap_api.replay import StandInServer
+
+WSDL = """<definitions xmlns="http://schemas.xmlsoap.org/wsdl/"
+    xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/"
+    xmlns:xs="http://www.w3.org/2001/XMLSchema"
+    xmlns:tns="urn:test" targetNamespace="urn:test">
+  <types>
+    <xs:schema targetNamespace="urn:test" elementFormDefault="qualified">
+      <xs:complexType name="RueckgabeBasis">
+        <xs:sequence>
+          <xs:element name="Ergebniscode" type="xs:string"/>
+          <xs:element name="AufrufVeraltet" type="xs:boolean"/>
+        </xs:sequence>
+      </xs:complexType>
+      <xs:complexType name="NullableString">
+        <xs:sequence>
+          <xs:element name="Wert" type="xs:string" nillable="true"/>
+          <xs:element name="NichtVorhanden" type="xs:boolean"/>
+        </xs:sequence>
+      </xs:complexType>
+      <xs:complexType name="VerknuepfteEinheit">
+        <xs:sequence>
+          <xs:element name="MaStRNummer" type="xs:string"/>
+          <xs:element name="Einheittyp" type="xs:string" minOccurs="0"/>
+        </xs:sequence>
+      </xs:complexType>
+      <xs:complexType name="Einheit">
+        <xs:complexContent>
+          <xs:extension base="tns:RueckgabeBasis">
+            <xs:sequence>
+              <xs:element name="EinheitMastrNummer" type="xs:string"/>
+              <xs:element name="DatumLetzteAktualisierung" type="xs:dateTime"/>
+              <xs:element name="Inbetriebnahmedatum" type="xs:date" nillable="true"/>
+              <xs:element name="Nettonennleistung" type="xs:decimal" minOccurs="0"/>
+              <xs:element name="AnzahlModule" type="xs:int" minOccurs="0"/>
+              <xs:element name="Hausnummer" type="tns:NullableString"/>
+              <xs:element name="ArtDerFlaeche" type="xs:string"
+                minOccurs="0" maxOccurs="unbounded"/>
+              <xs:element name="VerknuepfteEinheiten" type="tns:VerknuepfteEinheit"
+                minOccurs="0" maxOccurs="unbounded"/>
+            </xs:sequence>
+          </xs:extension>
+        </xs:complexContent>
+      </xs:complexType>
+      <xs:element name="GetEinheit">
+        <xs:complexType><xs:sequence>
+          <xs:element name="apiKey" type="xs:string"/>
+          <xs:element name="marktakteurMastrNummer" type="xs:string"/>
+          <xs:element name="einheitMastrNummer" type="xs:string"/>
+        </xs:sequence></xs:complexType>
+      </xs:element>
+      <xs:element name="GetEinheitResponse" type="tns:Einheit"/>
+    </xs:schema>
+  </types>
+  <message name="GetEinheitRequest"><part name="parameters" element="tns:GetEinheit"/></message>
+  <message name="GetEinheitResponse">
+    <part name="parameters" element="tns:GetEinheitResponse"/>
+  </message>
+  <portType name="Port"><operation name="GetEinheit">
+    <input message="tns:GetEinheitRequest"/><output message="tns:GetEinheitResponse"/>
+  </operation></portType>
+  <binding name="Binding" type="tns:Port">
+    <soap:binding transport="http://schemas.xmlsoap.org/soap/http"/>
+    <operation name="GetEinheit"><soap:operation soapAction="GetEinheit"/>
+      <input><soap:body use="literal"/></input>
+      <output><soap:body use="literal"/></output>
+    </operation>
+  </binding>
+  <service name="Marktstammdatenregister"><port name="Anlage" binding="tns:Binding">
+    <soap:address location="{location}"/>
+  </port></service>
+</definitions>
+"""
+
+UNIT = (
+    "<Ergebniscode>OK</Ergebniscode><AufrufVeraltet>false</AufrufVeraltet>"
+    "<EinheitMastrNummer>{mastr_nummer}</EinheitMastrNummer>"
+    "<DatumLetzteAktualisierung>2022-01-01T12:30:00.1234567</DatumLetzteAktualisierung>"
+    "<Inbetriebnahmedatum xsi:nil='true'/><Nettonennleistung>9.900</Nettonennleistung>"
+    "<AnzahlModule>12</AnzahlModule>"
+    "<Hausnummer><Wert xsi:nil='true'/><NichtVorhanden>true</NichtVorhanden></Hausnummer>"
+    "<ArtDerFlaeche>Dach</ArtDerFlaeche><ArtDerFlaeche>Fassade</ArtDerFlaeche>"
+    "<VerknuepfteEinheiten><MaStRNummer>SEE2</MaStRNummer></VerknuepfteEinheiten>"
+    "<VerknuepfteEinheiten><MaStRNummer>SEE3</MaStRNummer>"
+    "<Einheittyp>Solar</Einheittyp></VerknuepfteEinheiten>"
+)
+UNIT_SPARSE = (
+    "<Ergebniscode/><AufrufVeraltet>1</AufrufVeraltet>"
+    "<EinheitMastrNummer>SEE1</EinheitMastrNummer>"
+    "<DatumLetzteAktualisierung>2022-01-01T12:30:00+01:00</DatumLetzteAktualisierung>"
+    "<Inbetriebnahmedatum>2021-01-02</Inbetriebnahmedatum>"
+    "<Hausnummer><Wert>12a</Wert><NichtVorhanden>false</NichtVorhanden></Hausnummer>"
+)
+
+
+def envelope(body):
+    return (
+        '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/" '
+        'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"><soap:Body>'
+        f'<GetEinheitResponse xmlns="urn:test">{body}</GetEinheitResponse>'
+        "</soap:Body></soap:Envelope>"
+    ).encode("utf-8")
+
+
+FAULT = (
+    b'<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+    b"<soap:Body><soap:Fault><faultcode>soap:Server</faultcode>"
+    b"<faultstring>Busy</faultstring></soap:Fault></soap:Body></soap:Envelope>"
+)
+
+
+class UnitService:
+    """WSGI app serving the test WSDL and unit responses"""
+
+    wsdl_path = "/test.wsdl"
+
+    def __call__(self, environ, start_response):
+        if environ["REQUEST_METHOD"] == "GET":
+            location = f"http://{environ['HTTP_HOST']}/service"
+            start_response("200 OK", [("Content-Type", "text/xml")])
+            return [WSDL.format(location=location).encode("utf-8")]
+
+        request = etree.fromstring(
+            environ["wsgi.input"].read(int(environ["CONTENT_LENGTH"]))
+        )
+        mastr_nummer = request.findtext(".//{urn:test}einheitMastrNummer")
+        if mastr_nummer == "SEE_FAULT":
+            start_response("500 Internal Server Error", [("Content-Type", "text/xml")])
+            return [FAULT]
+        start_response("200 OK", [("Content-Type", "text/xml")])
+        return [envelope(UNIT.format(mastr_nummer=mastr_nummer))]
+
+
+@pytest.fixture
+def zeep_client(tmp_path):
+    wsdl = tmp_path / "test.wsdl"
+    wsdl.write_text(WSDL.format(location="http://127.0.0.1/service"))
+    return Client(str(wsdl), settings=Settings(strict=False, xml_huge_tree=True))
+
+
+class Response:
+    status_code = 200
+    headers = {"Content-Type": "text/xml"}
+    encoding = "utf-8"
+
+    def __init__(self, content):
+        self.content = content
+
+
+@pytest.mark.parametrize("body", [UNIT.format(mastr_nummer="SEE1"), UNIT_SPARSE])
+def test_deserializer_matches_zeep(zeep_client, body):
+    binding = zeep_client.service._binding
+    operation = binding._operations["GetEinheit"]
+    content = envelope(body)
+
+    expected = serialize_object(
+        binding.process_reply(zeep_client, operation, Response(content)),
+        target_cls=dict,
+    )
+    response = ResponseDeserializer(operation).deserialize(content)
+
+    assert response == expected
+    assert flatten_dict([response]) == flatten_dict([expected])
+    assert ResponseDeserializer(operation).deserialize(FAULT) is None
+
+
+def test_deserializer_leaves_unexpected_elements_to_zeep(zeep_client):
+    operation = zeep_client.service._binding._operations["GetEinheit"]
+    content = envelope(UNIT_SPARSE + "<Unbekannt>x</Unbekannt>")
+
+    assert ResponseDeserializer(operation).deserialize(content) is None
+
+
+def test_mastr_api_fast_deserializer(monkeypatch):
+    monkeypatch.setattr(download.time, "sleep", lambda seconds: None)
+    with StandInServer(UnitService()) as server:
+        fast_api = MaStRAPI(
+            user="SOM000000000000", key="test", wsdl=server.wsdl, fast_deserializer=True
+        )
+        zeep_api = MaStRAPI(user="SOM000000000000", key="test", wsdl=server.wsdl)
+
+        response = fast_api.GetEinheit(einheitMastrNummer="SEE1")
+        assert response == zeep_api.GetEinheit(einheitMastrNummer="SEE1")
+        assert response["Nettonennleistung"] == decimal.Decimal("9.900")
+        assert "GetEinheit" in download._RESPONSE_DESERIALIZERS[(server.wsdl, "Anlage")]
+        assert fast_api.copy()._fast_deserializer
+
+        with pytest.raises(Fault):
+            fast_api.GetEinheit(einheitMastrNummer="SEE_FAULT")
@@ -1,6 +1,26 @@
-from open_mastr.soap_api.download import MaStRAPI, MaStRDownload, flatten_dict
+from open_mastr.soap_api.download import (
+    MaStRAPI,
+    MaStRDownload,
+    _shared_session,
+    _wsdl_cache,
+    _wsdl_document,
+    basic_data_download,
+    flatten_dict,
+)
+from open_mastr.soap_api import download
+from open_mastr.soap_api.rate_limit import ContingentRateLimiter
+from open_mastr.soap_api.retry import RetryPolicy
+from zeep import Settings
+from zeep.transports import Transport
+from zeep.exceptions import Fault
+import asyncio
+import os
+import requests
+import threading
+import time
 import pytest
 import datetime
+import pandas as pd
 
 
 @pytest.fixture
@@ -215,3 +235,323 @@ def test_flatten_dict():
         },
     ]
     assert flatten_dict(data_before_flatten) == data_after_flatten
+
+
+class AsyncMaStRAPIStub:
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def async_api(self, max_connections, operation_timeout=None):
+        self.operation_timeout = operation_timeout
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def GetEinheitSolar(self, einheitMastrNummer):
+        self.in_flight += 1
+        self.max_in_flight = max(self.in_flight, self.max_in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if einheitMastrNummer.endswith("7"):
+            raise Fault("Fehler")
+        return {"EinheitMastrNummer": einheitMastrNummer}
+
+
+def test_additional_data_concurrent_requests():
+    pytest.importorskip("httpx")
+    mastr_api = AsyncMaStRAPIStub()
+    mastr_download = MaStRDownload(mastr_api=mastr_api, concurrent_requests=4)
+    unit_ids = [f"SEE{i:012d}" for i in range(20)]
+
+    units_downloaded, units_missed = mastr_download.additional_data(
+        "solar", unit_ids, "extended_unit_data"
+    )
+
+    assert 1 < mastr_api.max_in_flight <= 4
+    assert sorted(u["EinheitMastrNummer"] for u in units_downloaded) == [
+        u for u in unit_ids if not u.endswith("7")
+    ]
+    assert sorted(u[0] for u in units_missed) == ["SEE000000000007", "SEE000000000017"]
+
+
+class PacedAsyncMaStRAPIStub(AsyncMaStRAPIStub):
+    def __init__(self, rate_limiter):
+        super().__init__()
+        self.rate_limiter = rate_limiter
+
+    async def GetEinheitSolar(self, einheitMastrNummer):
+        await self.rate_limiter.acquire_async()
+        # Like the HTTP client, only the request itself is subject to the timeout
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        if time.perf_counter() - start > self.operation_timeout:
+            raise requests.exceptions.ReadTimeout()
+        return {"EinheitMastrNummer": einheitMastrNummer}
+
+
+def test_additional_data_concurrent_requests_paced():
+    pytest.importorskip("httpx")
+    rate_limiter = ContingentRateLimiter(reserve=0, burst=1)
+    # Paces requests to one every 0.05 seconds
+    rate_limiter.attach(
+        lambda: {
+            "AktuellerStandTageskontingent": 0,
+            "AktuellesLimitTageskontingent": int(
+                (rate_limiter.reset_time - datetime.datetime.now()).total_seconds() * 20
+            ),
+        }
+    )
+    mastr_api = PacedAsyncMaStRAPIStub(rate_limiter)
+    mastr_download = MaStRDownload(mastr_api=mastr_api, concurrent_requests=8)
+    unit_ids = [f"SEE{i:012d}" for i in range(8)]
+
+    units_downloaded, units_missed = mastr_download.additional_data(
+        "solar", unit_ids, "extended_unit_data", timeout=0.1
+    )
+
+    # Waiting for the rate limiter longer than the timeout does not fail requests
+    assert mastr_api.operation_timeout == 0.1
+    assert sorted(u["EinheitMastrNummer"] for u in units_downloaded) == unit_ids
+    assert units_missed == []
+
+
+class ThreadedMaStRAPIStub:
+    def __init__(self, state=None):
+        self.state = state or {"copies": [], "requests": [], "lock": threading.Lock()}
+        # Requests are retried like by the wrapper of MaStRAPI
+        self.retry_policy = RetryPolicy(max_retries=3, sleep=lambda seconds: None)
+
+    def copy(self, **kwargs):
+        copy = type(self)(self.state)
+        copy.retry_policy = self.retry_policy
+        with self.state["lock"]:
+            self.state["copies"].append((threading.get_ident(), kwargs))
+        return copy
+
+    def close(self):
+        with self.state["lock"]:
+            self.state.setdefault("closed", []).append(self)
+
+    def GetEinheitSolar(self, einheitMastrNummer):
+        return self.retry_policy.call(self._get_einheit_solar, einheitMastrNummer)
+
+    def _get_einheit_solar(self, einheitMastrNummer):
+        with self.state["lock"]:
+            attempt = self.state["requests"].count(einheitMastrNummer)
+            self.state["requests"].append(einheitMastrNummer)
+        time.sleep(0.01)
+        # One unit times out once, another one always
+        if einheitMastrNummer == "SEE000000000003" and attempt == 0:
+            raise requests.exceptions.ReadTimeout()
+        if einheitMastrNummer == "SEE000000000005":
+            raise requests.exceptions.ReadTimeout()
+        return {"EinheitMastrNummer": einheitMastrNummer}
+
+
+def test_additional_data_parallel_threads():
+    mastr_api = ThreadedMaStRAPIStub()
+    mastr_download = MaStRDownload(mastr_api=mastr_api, parallel_processes=3)
+    unit_ids = [f"SEE{i:012d}" for i in range(20)]
+
+    units_downloaded, units_missed = mastr_download.additional_data(
+        "solar", unit_ids, "extended_unit_data", timeout=5
+    )
+
+    assert sorted(u["EinheitMastrNummer"] for u in units_downloaded) == [
+        u for u in unit_ids if u != "SEE000000000005"
+    ]
+    assert [u[0] for u in units_missed] == ["SEE000000000005"]
+    # Timed out requests are retried by the retry policy only
+    assert mastr_api.state["requests"].count("SEE000000000003") == 2
+    assert mastr_api.state["requests"].count("SEE000000000005") == 4
+    assert mastr_api.retry_policy.metrics["retries"] == 4
+    # Each worker thread uses its own client with the given timeout
+    assert len(mastr_api.state["copies"]) == 3
+    assert len({ident for ident, _ in mastr_api.state["copies"]}) == 3
+    assert all(
+        kwargs == {"operation_timeout": 5} for _, kwargs in mastr_api.state["copies"]
+    )
+    # Copies of worker threads are closed to return their account to the pool
+    assert len(mastr_api.state["closed"]) == 3
+
+
+class PagedMaStRAPIStub(ThreadedMaStRAPIStub):
+    def GetListeAlleEinheiten(self, startAb, limit, datumAb):
+        with self.state["lock"]:
+            self.state["requests"].append(startAb)
+        # Later pages are answered faster to shuffle completion order
+        time.sleep(0.05 / startAb)
+        units = [
+            {"EinheitMastrNummer": f"SEE{i:012d}"}
+            for i in range(startAb, min(startAb + limit, 23))
+        ]
+        return {
+            "Ergebniscode": "OkWeitereDatenVorhanden" if startAb + limit < 23 else "Ok",
+            "Einheiten": units,
+        }
+
+
+class FailingMaStRAPIStub:
+    def __init__(self):
+        self.retry_policy = RetryPolicy(base_delay=0)
+        self.requests = []
+
+    def GetEinheitSolar(self, einheitMastrNummer):
+        self.requests.append(einheitMastrNummer)
+        if einheitMastrNummer == "SEE000000000001":
+            raise requests.exceptions.ReadTimeout("Fault")
+        raise Fault("Timeout")
+
+
+def test_retry_missed_additional_data():
+    mastr_api = FailingMaStRAPIStub()
+    mastr_download = MaStRDownload(mastr_api=mastr_api)
+
+    _, units_missed = mastr_download._retry_missed_additional_data(
+        "solar", ["SEE000000000001", "SEE000000000002"], "extended_unit_data"
+    )
+
+    # Timeouts are classified by their error, not by its message
+    assert mastr_api.requests.count("SEE000000000001") == 1
+    assert mastr_api.requests.count("SEE000000000002") == 3
+    assert [u[0] for u in units_missed] == ["SEE000000000002"]
+    assert isinstance(units_missed[0].error, Fault)
+
+
+def test_basic_data_download_concurrent_pages():
+    mastr_api = PagedMaStRAPIStub()
+    chunks_start = list(range(1, 101, 5))
+
+    pages = list(
+        basic_data_download(
+            mastr_api,
+            "GetListeAlleEinheiten",
+            "Einheiten",
+            chunks_start,
+            [5] * len(chunks_start),
+            None,
+            3,
+            max_workers=4,
+        )
+    )
+
+    # Pages are yielded in order until no further data is available
+    assert [u["EinheitMastrNummer"] for page in pages for u in page] == [
+        f"SEE{i:012d}" for i in range(1, 23)
+    ]
+    # Only few pages beyond the end of data are requested
+    assert mastr_api.state["requests"][0] == 1
+    assert len(mastr_api.state["requests"]) <= 5 + 4
+    assert len(mastr_api.state["copies"]) <= 4
+
+
+class PowerPlantMaStRAPIStub:
+    def GetAktuellerStandTageskontingent(self):
+        return {"AktuellerStandTageskontingent": 0, "AktuellesLimitTageskontingent": 1}
+
+    def GetGefilterteListeStromErzeuger(self, energietraeger, startAb, limit, datumAb):
+        # The second page repeats a unit and has permits
+        if startAb == 1:
+            numbers, more = [1, 2, 3], True
+        else:
+            numbers, more = [3, 4, 5], False
+        units = [
+            {
+                "EinheitMastrNummer": f"SEE{i:012d}",
+                "Name": f"Unit {i}",
+                "GenMastrNummer": f"SGE{i:012d}" if startAb > 1 else None,
+            }
+            for i in numbers
+        ]
+        return {
+            "Ergebniscode": "OkWeitereDatenVorhanden" if more else "Ok",
+            "Einheiten": units,
+        }
+
+    def GetEinheitKernkraft(self, einheitMastrNummer):
+        return {"EinheitMastrNummer": einheitMastrNummer, "Bruttoleistung": 1.0}
+
+    def GetEinheitGenehmigung(self, genMastrNummer):
+        return {
+            "GenMastrNummer": genMastrNummer,
+            "VerknuepfteEinheiten": [
+                {"MaStRNummer": genMastrNummer.replace("SGE", "SEE")}
+            ],
+            "Art": "Permit",
+        }
+
+
+def test_download_power_plants_page_by_page(tmp_path, monkeypatch):
+    monkeypatch.setattr(download, "create_data_dir", lambda: None)
+    monkeypatch.setattr(download, "get_data_version_dir", lambda: str(tmp_path))
+    mastr_download = MaStRDownload(mastr_api=PowerPlantMaStRAPIStub())
+
+    csv_file = mastr_download.download_power_plants("nuclear")
+
+    power_plants = pd.read_csv(csv_file)
+    assert list(power_plants["EinheitMastrNummer"]) == [
+        f"SEE{i:012d}" for i in range(1, 6)
+    ]
+    assert list(power_plants["Bruttoleistung"]) == [1.0] * 5
+    # Columns of later pages are added to the rows of earlier pages
+    assert power_plants["Art"].isna().tolist() == [True, True, True, False, False]
+    assert os.listdir(tmp_path) == [os.path.basename(csv_file)]
+
+
+def test_shared_session():
+    session = _shared_session(pool_maxsize=20)
+
+    assert _shared_session(pool_maxsize=20) is session
+    assert _shared_session(pool_maxsize=50) is not session
+    assert "gzip" in session.headers["Accept-Encoding"]
+    for prefix in ["https://", "http://"]:
+        assert session.get_adapter(prefix)._pool_maxsize == 20
+
+
+MINIMAL_WSDL = """<?xml version="1.0"?>
+<definitions xmlns="http://schemas.xmlsoap.org/wsdl/"
+    xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/"
+    xmlns:tns="urn:test" targetNamespace="urn:test">
+  <message name="Empty"/>
+  <portType name="Port"><operation name="Ping">
+    <input message="tns:Empty"/><output message="tns:Empty"/>
+  </operation></portType>
+  <binding name="Binding" type="tns:Port">
+    <soap:binding transport="http://schemas.xmlsoap.org/soap/http"/>
+    <operation name="Ping"><soap:operation soapAction="Ping"/>
+      <input><soap:body use="literal"/></input>
+      <output><soap:body use="literal"/></output>
+    </operation>
+  </binding>
+  <service name="Service"><port name="Port" binding="tns:Binding">
+    <soap:address location="http://127.0.0.1/"/>
+  </port></service>
+</definitions>
+"""
+
+
+def test_wsdl_document_is_parsed_once(tmp_path):
+    wsdl = tmp_path / "test.wsdl"
+    wsdl.write_text(MINIMAL_WSDL)
+
+    document = _wsdl_document(str(wsdl), Transport(), Settings())
+
+    assert _wsdl_document(str(wsdl), Transport(), Settings()) is document
+    assert "Service" in document.services
+
+
+def test_wsdl_cache_is_version_keyed(tmp_path, monkeypatch):
+    monkeypatch.setattr(download, "get_project_home_dir", lambda: str(tmp_path))
+    os.makedirs(tmp_path / "cache")
+    stale_cache = tmp_path / "cache" / "wsdl-23.1-0.13.0.sqlite"
+    stale_cache.write_text("")
+
+    cache = _wsdl_cache.__wrapped__()
+
+    assert not stale_cache.exists()
+    assert os.listdir(tmp_path / "cache") == [os.path.basename(cache._db_path)]
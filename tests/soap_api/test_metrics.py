@@ -0,0 +1,147 @@
+import datetime
+import json
+
+import pytest
+import requests
+from zeep.exceptions import Fault
+
+from open_mastr.soap_api.download import MaStRAPI, basic_data_download
+from open_mastr.soap_api.metrics import (
+    APIMetrics,
+    JSONSink,
+    PrometheusTextfileSink,
+    error_class,
+)
+from open_mastr.soap_api.replay import SOAPStandIn, StandInServer
+from open_mastr.soap_api.retry import RetryPolicy
+
+
+class Clock:
+    """Fake clock returning a settable time"""
+
+    def __init__(self):
+        self.now = datetime.datetime(2024, 5, 1, 9, 30)
+
+    def __call__(self):
+        return self.now
+
+
+def test_api_metrics_summary():
+    clock = Clock()
+    metrics = APIMetrics(buckets=(0.5, 1), clock=clock)
+    metrics.observe("GetEinheitSolar", 0.2, response_bytes=100)
+    metrics.observe("GetEinheitSolar", 0.7, error=requests.exceptions.ReadTimeout())
+    clock.now += datetime.timedelta(hours=1)
+    metrics.observe("GetEinheitSolar", 3.0, response_bytes=300, error=Fault("Busy"))
+    metrics.observe("GetAktuellerStandTageskontingent", 0.1, contingent=False)
+    metrics.observe_page("GetListeAlleEinheiten", 2.0, 2000)
+    metrics.observe_page("GetListeAlleEinheiten", 1.0, None)
+
+    summary = metrics.summary()
+    solar = summary["operations"]["GetEinheitSolar"]
+    assert solar["requests"] == 3
+    assert solar["errors"] == {"timeout": 1, "fault": 1}
+    assert solar["latency_seconds"]["buckets"] == {"0.5": 1, "1": 2, "+Inf": 3}
+    assert solar["latency_seconds"]["mean"] == pytest.approx(1.3)
+    assert solar["response_bytes"] == {"sum": 400, "count": 2}
+    assert summary["pages"]["GetListeAlleEinheiten"] == {
+        "pages": 2,
+        "failed": 1,
+        "units": 2000,
+        "seconds": 3.0,
+    }
+    # Requests for the contingent itself do not count against it
+    assert summary["contingent_per_hour"] == {
+        "2024-05-01T09:00": 2,
+        "2024-05-01T10:00": 1,
+    }
+
+
+def test_error_class():
+    assert error_class(requests.exceptions.ConnectTimeout()) == "timeout"
+    assert error_class(requests.exceptions.ConnectionError()) == "connection"
+    assert error_class(Fault("Busy")) == "fault"
+    assert error_class(KeyError("Ergebniscode")) == "other"
+
+
+def test_metrics_sinks(tmp_path):
+    metrics = APIMetrics(buckets=(1,))
+    metrics.observe("GetEinheitSolar", 0.5, response_bytes=10, error=Fault("Busy"))
+    metrics.observe_page("GetListeAlleEinheiten", 2.0, 2000)
+    sinks = [
+        JSONSink(tmp_path / "metrics.json"),
+        PrometheusTextfileSink(tmp_path / "metrics.prom"),
+    ]
+
+    metrics.write(sinks, retries={"requests": 1, "retries": 0})
+
+    with open(tmp_path / "metrics.json") as f:
+        summary = json.load(f)
+    assert summary["operations"]["GetEinheitSolar"]["requests"] == 1
+    assert summary["retries"] == {"requests": 1, "retries": 0}
+
+    with open(tmp_path / "metrics.prom") as f:
+        lines = f.read().splitlines()
+    assert "# TYPE open_mastr_api_request_duration_seconds histogram" in lines
+    for line in [
+        'open_mastr_api_request_duration_seconds_bucket{operation="GetEinheitSolar",'
+        'le="1"} 1',
+        'open_mastr_api_request_duration_seconds_count{operation="GetEinheitSolar"} 1',
+        'open_mastr_api_errors_total{operation="GetEinheitSolar",error_class="fault"} 1',
+        'open_mastr_api_list_units_total{operation="GetListeAlleEinheiten"} 2000',
+        "open_mastr_api_retry_requests 1",
+    ]:
+        assert line in lines
+
+
+def test_mastr_api_records_metrics(recording):
+    app = SOAPStandIn(recording, fault_rate=0.5, seed=3)
+    with StandInServer(app) as server:
+        mastr_api = MaStRAPI(
+            user="SOM000000000000",
+            key="test",
+            wsdl=server.wsdl,
+            retry_policy=RetryPolicy(max_retries=10, sleep=lambda seconds: None),
+        )
+        assert mastr_api.copy().metrics is mastr_api.metrics
+
+        for _ in range(5):
+            mastr_api.GetEinheit(einheitMastrNummer="SEE000000000001")
+
+    retries = mastr_api.retry_policy.metrics["retries"]
+    stats = mastr_api.metrics.summary()["operations"]["GetEinheit"]
+    assert stats["requests"] == 5 + retries
+    assert stats["errors"] == {"fault": retries}
+    assert stats["response_bytes"]["count"] == stats["requests"]
+    assert stats["response_bytes"]["sum"] > 0
+
+
+class PagedMaStRAPIStub:
+    def __init__(self):
+        self.metrics = APIMetrics()
+
+    def GetListeAlleEinheiten(self, startAb, limit, datumAb):
+        units = [
+            {"EinheitMastrNummer": f"SEE{i:012d}"}
+            for i in range(startAb, min(startAb + limit, 8))
+        ]
+        return {
+            "Ergebniscode": "OkWeitereDatenVorhanden" if startAb + limit < 8 else "Ok",
+            "Einheiten": units,
+        }
+
+
+def test_basic_data_download_records_pages():
+    mastr_api = PagedMaStRAPIStub()
+
+    pages = list(
+        basic_data_download(
+            mastr_api, "GetListeAlleEinheiten", "Einheiten", [1, 6], [5, 5], None, 3
+        )
+    )
+
+    assert [len(page) for page in pages] == [5, 2]
+    stats = mastr_api.metrics.summary()["pages"]["GetListeAlleEinheiten"]
+    assert stats["pages"] == 2
+    assert stats["units"] == 7
+    assert stats["failed"] == 0
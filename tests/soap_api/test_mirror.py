@@ -0,0 +1,392 @@
+import datetime
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, event, inspect, text
+from zeep.exceptions import Fault
+
+from open_mastr.soap_api.mirror import (
+    MaStRMirror,
+    additional_data_fingerprint,
+    additional_data_request_priority,
+)
+from open_mastr.soap_api.rate_limit import ContingentExhausted
+from open_mastr.utils import orm
+from open_mastr.utils.helpers import (
+    get_watermarks,
+    record_watermarks,
+    session_scope,
+)
+
+
+class MaStRAPIStub:
+    def GetEinheitSolar(self, einheitMastrNummer):
+        if einheitMastrNummer == "SEE000000000003":
+            raise Fault("Unit not found")
+        return {
+            "Ergebniscode": "OK",
+            "AufrufVeraltet": False,
+            "AufrufVersion": 1,
+            "AufrufLebenszeitEnde": None,
+            "EinheitMastrNummer": einheitMastrNummer,
+            "DatumLetzteAktualisierung": datetime.datetime(2022, 1, 5),
+            "Nettonennleistung": 10.0,
+        }
+
+
+def test_retrieve_additional_data(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mirror.db'}")
+    orm.Base.metadata.create_all(engine)
+    with session_scope(engine=engine) as session:
+        session.add(orm.SolarExtended(EinheitMastrNummer="SEE000000000001"))
+        session.bulk_insert_mappings(
+            orm.AdditionalDataRequested,
+            [
+                {
+                    "EinheitMastrNummer": f"SEE00000000000{i}",
+                    "additional_data_id": f"SEE00000000000{i}",
+                    "technology": "solar",
+                    "data_type": "unit_data",
+                }
+                for i in [1, 2, 3, 2]
+            ],
+        )
+
+    mirror = MaStRMirror(engine, mastr_api=MaStRAPIStub())
+    mirror.retrieve_additional_data("solar", "unit_data", limit=4)
+
+    with session_scope(engine=engine) as session:
+        units = dict(
+            session.query(
+                orm.SolarExtended.EinheitMastrNummer,
+                orm.SolarExtended.Nettonennleistung,
+            )
+        )
+        assert units == {"SEE000000000001": 10.0, "SEE000000000002": 10.0}
+        # The missed request stays leased until its lease expires
+        assert [
+            (_.additional_data_id, _.worker_id, _.attempts)
+            for _ in session.query(orm.AdditionalDataRequested)
+        ] == [("SEE000000000003", mirror.worker_id, 1)]
+        assert [
+            (_.additional_data_id, _.reason)
+            for _ in session.query(orm.MissedAdditionalData)
+        ] == [("SEE000000000003", repr(Fault("Unit not found")))]
+
+    # A request that is missed again on its next lease is kept once
+    with session_scope(engine=engine) as session:
+        session.query(orm.AdditionalDataRequested).update({"lease_expiry": None})
+    mirror.retrieve_additional_data("solar", "unit_data", limit=4)
+    with session_scope(engine=engine) as session:
+        assert [
+            (_.additional_data_id, _.attempts)
+            for _ in session.query(orm.AdditionalDataRequested)
+        ] == [("SEE000000000003", 2)]
+        assert session.query(orm.MissedAdditionalData).count() == 1
+
+
+def test_retrieve_additional_data_until_contingent_is_exhausted(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mirror.db'}")
+    orm.Base.metadata.create_all(engine)
+    with session_scope(engine=engine) as session:
+        session.bulk_insert_mappings(
+            orm.AdditionalDataRequested,
+            [
+                {
+                    "additional_data_id": f"SEE{i:012d}",
+                    "technology": "solar",
+                    "data_type": "unit_data",
+                }
+                for i in range(1, 9)
+            ],
+        )
+
+    class ExhaustingMaStRAPIStub(MaStRAPIStub):
+        requests = 0
+
+        def GetEinheitSolar(self, einheitMastrNummer):
+            self.requests += 1
+            if self.requests > 3:
+                raise ContingentExhausted("Used up", None)
+            return super().GetEinheitSolar(einheitMastrNummer)
+
+    mirror = MaStRMirror(engine, mastr_api=ExhaustingMaStRAPIStub(), pipeline_depth=1)
+    mirror.retrieve_additional_data("solar", "unit_data", chunksize=1)
+
+    with session_scope(engine=engine) as session:
+        assert session.query(orm.SolarExtended).count() == 3
+        # Chunks that were claimed but not downloaded are released
+        remaining = session.query(orm.AdditionalDataRequested).all()
+        assert len(remaining) == 5
+        assert all(_.worker_id is None for _ in remaining)
+
+
+@pytest.mark.parametrize("sqlite_version", [sqlite3.sqlite_version_info, (3, 34, 0)])
+def test_claim_additional_data_requests(tmp_path, monkeypatch, sqlite_version):
+    # SQLite < 3.35 does not support RETURNING, requests are selected first
+    monkeypatch.setattr(sqlite3, "sqlite_version_info", sqlite_version)
+    engine = create_engine(f"sqlite:///{tmp_path / 'mirror.db'}")
+    orm.Base.metadata.create_all(engine)
+    with session_scope(engine=engine) as session:
+        session.bulk_insert_mappings(
+            orm.AdditionalDataRequested,
+            [
+                {
+                    "additional_data_id": f"SEE{i:012d}",
+                    "technology": "solar",
+                    "data_type": "unit_data",
+                }
+                for i in range(5)
+            ],
+        )
+
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    worker_a = MaStRMirror(engine, mastr_api=MaStRAPIStub(), max_attempts=2)
+    worker_b = MaStRMirror(engine, mastr_api=MaStRAPIStub(), lease_duration=0)
+
+    def claim(worker, chunksize):
+        with session_scope(engine=engine) as session:
+            return sorted(
+                _.additional_data_id
+                for _ in worker._claim_additional_data_requests(
+                    session, "unit_data", "solar", chunksize
+                )
+            )
+
+    # Workers do not claim requests leased by another worker
+    claimed_a = claim(worker_a, 3)
+    claimed_b = claim(worker_b, 3)
+    assert len(claimed_a) == 3
+    assert not set(claimed_a) & set(claimed_b)
+    assert len(claimed_a + claimed_b) == 5
+
+    # Expired leases are claimed again, up to max_attempts times
+    assert claim(worker_a, 5) == claimed_b
+    assert claim(worker_a, 5) == []
+    assert any("RETURNING" in _ for _ in statements) == (sqlite_version >= (3, 35))
+
+
+def test_skip_unchanged_additional_data(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mirror.db'}")
+    orm.Base.metadata.create_all(engine)
+    mirror = MaStRMirror(
+        engine, mastr_api=MaStRAPIStub(), skip_unchanged_additional_data=True
+    )
+
+    def basic_unit(day, betriebsstatus="In Betrieb"):
+        return {
+            "EinheitMastrNummer": "SEE000000000001",
+            "DatumLetzteAktualisierung": datetime.datetime(2022, 1, day),
+            "Einheittyp": "Solareinheit",
+            "EinheitBetriebsstatus": betriebsstatus,
+            "EegMastrNummer": "EEG000000000001",
+            "KwkMastrNummer": None,
+            "GenMastrNummer": None,
+        }
+
+    def requested_data_types(basic_units_chunk):
+        with session_scope(engine=engine) as session:
+            data_requests = mirror._create_data_list_from_basic_units(
+                session, basic_units_chunk
+            )[:4]
+        return [r["data_type"] for requests in data_requests for r in requests]
+
+    assert requested_data_types([basic_unit(1)]) == ["unit_data", "eeg_data"]
+
+    # Downloading extended unit data fills the cache
+    with session_scope(engine=engine) as session:
+        session.add(
+            orm.AdditionalDataRequested(
+                EinheitMastrNummer="SEE000000000001",
+                additional_data_id="SEE000000000001",
+                technology="solar",
+                data_type="unit_data",
+            )
+        )
+        session.add(
+            orm.AdditionalDataCache(
+                additional_data_id="EEG000000000001",
+                data_type="eeg_data",
+                fingerprint=additional_data_fingerprint(basic_unit(1), "eeg_data"),
+            )
+        )
+    mirror.retrieve_additional_data("solar", "unit_data")
+
+    # Cached extended unit data is as new as the update, EEG fields are unchanged
+    assert requested_data_types([basic_unit(2)]) == []
+    # A newer update and a changed operating status are requested again
+    assert requested_data_types([basic_unit(6, "Endgueltig stillgelegt")]) == [
+        "unit_data",
+        "eeg_data",
+    ]
+
+    # EEG data is requested again once its cache entry is too old
+    with session_scope(engine=engine) as session:
+        session.query(orm.AdditionalDataCache).filter_by(data_type="eeg_data").update(
+            {"download_date": datetime.datetime(2022, 1, 1)}
+        )
+    assert requested_data_types([basic_unit(7)]) == ["unit_data", "eeg_data"]
+    mirror.additional_data_max_age = None
+    assert requested_data_types([basic_unit(8)]) == ["unit_data"]
+
+
+class ChangedUnitsStub(MaStRAPIStub):
+    def __init__(self):
+        self.dates_from = []
+
+    def GetGefilterteListeStromErzeuger(self, energietraeger, startAb, limit, datumAb):
+        self.dates_from.append(datumAb)
+        return {
+            "Ergebniscode": "OK",
+            "Einheiten": [
+                {
+                    "EinheitMastrNummer": f"SEE00000000000{i}",
+                    "DatumLetzeAktualisierung": datetime.datetime(2022, 1, day),
+                }
+                for i, day in [(1, 5), (2, 4), (3, 6)]
+            ],
+        }
+
+    def GetEinheitSolar(self, einheitMastrNummer):
+        unit = super().GetEinheitSolar(einheitMastrNummer)
+        unit["SpalteNichtImBulkExport"] = "value"
+        return unit
+
+
+def test_sync_extended_unit_data(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mirror.db'}")
+    orm.Base.metadata.create_all(engine)
+    with session_scope(engine=engine) as session:
+        session.add(
+            orm.SolarExtended(
+                EinheitMastrNummer="SEE000000000001",
+                DatumLetzteAktualisierung=datetime.datetime(2022, 1, 1),
+                Nettonennleistung=5.0,
+                DatenQuelle="bulk",
+            )
+        )
+    assert record_watermarks(engine, ["solar", "wind", "market"]) == {
+        "solar": datetime.datetime(2022, 1, 1)
+    }
+
+    mastr_api = ChangedUnitsStub()
+    mirror = MaStRMirror(engine, mastr_api=mastr_api)
+    mirror.sync_extended_unit_data(["solar", "wind"])
+
+    assert mastr_api.dates_from == [datetime.datetime(2022, 1, 1)]
+    with session_scope(engine=engine) as session:
+        units = session.query(
+            orm.SolarExtended.EinheitMastrNummer,
+            orm.SolarExtended.Nettonennleistung,
+            orm.SolarExtended.DatenQuelle,
+        ).order_by(orm.SolarExtended.EinheitMastrNummer)
+        assert [tuple(_) for _ in units] == [
+            ("SEE000000000001", 10.0, "API"),
+            ("SEE000000000002", 10.0, "API"),
+        ]
+        assert [
+            _.additional_data_id for _ in session.query(orm.MissedAdditionalData)
+        ] == ["SEE000000000003"]
+    # The watermark stops before the missed unit
+    assert get_watermarks(engine, ["solar"]) == {"solar": datetime.datetime(2022, 1, 5)}
+
+
+def test_retrieve_additional_data_in_priority_order(tmp_path):
+    class PrioritizedStub(MaStRAPIStub):
+        def __init__(self):
+            self.requested = []
+
+        def GetEinheitSolar(self, einheitMastrNummer):
+            self.requested.append(einheitMastrNummer)
+            return super().GetEinheitSolar(einheitMastrNummer)
+
+        GetEinheitWind = GetEinheitSolar
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'mirror.db'}")
+    orm.Base.metadata.create_all(engine)
+    request_date = datetime.datetime(2022, 1, 5, tzinfo=datetime.timezone.utc)
+    requests = [
+        ("SEE000000000001", "solar", 10, request_date),
+        ("SEE000000000002", "solar", 5000, request_date),
+        ("SEE000000000004", "solar", 10, request_date + datetime.timedelta(days=90)),
+        ("SEE000000000005", "wind", 4000, request_date),
+    ]
+    with session_scope(engine=engine) as session:
+        session.bulk_insert_mappings(
+            orm.AdditionalDataRequested,
+            [
+                {
+                    "EinheitMastrNummer": mastr_nummer,
+                    "additional_data_id": mastr_nummer,
+                    "technology": technology,
+                    "data_type": "unit_data",
+                    "request_date": date,
+                    "priority": additional_data_request_priority(
+                        date, capacity, 2 if technology == "wind" else 1
+                    ),
+                }
+                for mastr_nummer, technology, capacity, date in requests
+            ],
+        )
+
+    mastr_api = PrioritizedStub()
+    mirror = MaStRMirror(engine, mastr_api=mastr_api)
+    mirror.retrieve_additional_data(None, "unit_data", limit=3, chunksize=1)
+
+    # Large units weighted by technology and recent requests first
+    assert mastr_api.requested == [
+        "SEE000000000005",
+        "SEE000000000004",
+        "SEE000000000002",
+    ]
+    with session_scope(engine=engine) as session:
+        assert session.query(orm.WindExtended).count() == 1
+        assert [
+            _.additional_data_id for _ in session.query(orm.AdditionalDataRequested)
+        ] == ["SEE000000000001"]
+
+
+def test_keyset_pagination_of_requests(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mirror.db'}")
+    orm.Base.metadata.create_all(engine)
+    with engine.begin() as con:
+        con.execute(text("DROP INDEX ix_basic_units_eeg"))
+    with session_scope(engine=engine) as session:
+        session.bulk_insert_mappings(
+            orm.AdditionalDataRequested,
+            [
+                {
+                    "additional_data_id": f"SEE{i:012d}",
+                    "technology": "solar",
+                    "data_type": "unit_data",
+                    "priority": i % 2,
+                }
+                for i in range(6)
+            ],
+        )
+
+    mirror = MaStRMirror(engine, mastr_api=MaStRAPIStub(), lease_duration=0)
+    assert "ix_basic_units_eeg" in {
+        _["name"] for _ in inspect(engine).get_indexes("basic_units")
+    }
+
+    claimed = []
+    cursor = None
+    with session_scope(engine=engine) as session:
+        while chunk := mirror._claim_additional_data_requests(
+            session, "unit_data", "solar", 2, after=cursor
+        ):
+            claimed.append([_.additional_data_id for _ in chunk])
+            cursor = mirror._request_cursor("additional_data", chunk)
+
+    # Expired leases are not claimed again after the cursor has passed them
+    assert claimed == [
+        ["SEE000000000005", "SEE000000000003"],
+        ["SEE000000000001", "SEE000000000004"],
+        ["SEE000000000002", "SEE000000000000"],
+    ]
@@ -0,0 +1,95 @@
+import datetime
+import json
+import threading
+
+import pytest
+
+from open_mastr.soap_api.orchestrate import Orchestrator, api_download_orchestrator
+from open_mastr.soap_api.rate_limit import ContingentExhausted
+
+
+def test_run_independent_steps_concurrently(tmp_path):
+    # Both steps have to run at the same time to pass the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    calls = []
+    orchestrator = Orchestrator(max_workers=2)
+    orchestrator.add_step("basic:wind", lambda: calls.append(barrier.wait() * 0))
+    orchestrator.add_step("basic:solar", lambda: calls.append(barrier.wait() * 0))
+    orchestrator.add_step(
+        "unit_data:wind", lambda: calls.append("unit_data"), depends_on=["basic:wind"]
+    )
+
+    report_file = tmp_path / "report.json"
+    report = orchestrator.run(report_file=report_file)
+
+    assert calls == [0, 0, "unit_data"]
+    steps = report["steps"]
+    assert {step["status"] for step in steps.values()} == {"succeeded"}
+    assert steps["unit_data:wind"]["started"] >= steps["basic:wind"]["finished"]
+    assert steps["unit_data:wind"]["duration"] >= 0
+    with open(report_file) as f:
+        assert json.load(f) == report
+
+
+def test_skip_dependent_steps_of_failed_step():
+    def fail():
+        raise ValueError("Unit not found")
+
+    orchestrator = Orchestrator()
+    orchestrator.add_step("basic:wind", fail)
+    orchestrator.add_step("unit_data:wind", lambda: None, depends_on=["basic:wind"])
+    orchestrator.add_step("basic:solar", lambda: None)
+    steps = orchestrator.run()["steps"]
+
+    assert [(name, step["status"]) for name, step in steps.items()] == [
+        ("basic:wind", "failed"),
+        ("unit_data:wind", "skipped"),
+        ("basic:solar", "succeeded"),
+    ]
+    assert steps["basic:wind"]["error"] == repr(ValueError("Unit not found"))
+
+    with pytest.raises(ValueError):
+        orchestrator.add_step("eeg_data:wind", lambda: None, depends_on=["basic:hydro"])
+
+
+def test_stop_when_contingent_is_exhausted():
+    def exhaust():
+        raise ContingentExhausted("Used up", datetime.datetime(2022, 1, 2))
+
+    orchestrator = Orchestrator(max_workers=1)
+    orchestrator.add_step("basic:wind", exhaust)
+    orchestrator.add_step("basic:solar", lambda: None)
+    steps = orchestrator.run()["steps"]
+
+    assert steps["basic:wind"]["status"] == "failed"
+    assert steps["basic:solar"]["status"] == "skipped"
+
+
+def test_api_download_orchestrator():
+    class MirrorStub:
+        def __init__(self):
+            self.calls = []
+
+        def __getattr__(self, name):
+            return lambda *args, **kwargs: self.calls.append((name, args))
+
+    mirror = MirrorStub()
+    orchestrator = api_download_orchestrator(
+        lambda: mirror,
+        ["wind", "solar"],
+        ["unit_data", "eeg_data"],
+        ["location_elec_generation"],
+        max_workers=1,
+    )
+    steps = orchestrator.run()["steps"]
+
+    assert {name: step["depends_on"] for name, step in steps.items()} == {
+        "basic:wind": [],
+        "basic:solar": [],
+        "unit_data": ["basic:wind", "basic:solar"],
+        "eeg_data": ["basic:wind", "basic:solar"],
+        "basic:locations": [],
+        "location_elec_generation:locations": ["basic:locations"],
+    }
+    assert ("retrieve_additional_data", (["wind", "solar"], "eeg_data")) in mirror.calls
+    assert len(mirror.calls) == 6
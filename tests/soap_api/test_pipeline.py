@@ -0,0 +1,43 @@
+import time
+
+import pytest
+
+from open_mastr.soap_api.pipeline import Pipeline
+
+
+def test_pipeline_keeps_order_of_items():
+    def slow_double(item):
+        time.sleep(0.01 * (item % 3))
+        return 2 * item
+
+    pipeline = Pipeline(range(10), [slow_double, str], maxsize=2)
+    assert list(pipeline) == [str(2 * i) for i in range(10)]
+
+
+def test_pipeline_applies_backpressure():
+    fetched = []
+
+    def fetch(item):
+        fetched.append(item)
+        return item
+
+    pipeline = Pipeline(range(100), [fetch, lambda item: item], maxsize=1)
+    items = iter(pipeline)
+    assert next(items) == 0
+    time.sleep(0.3)
+    # One item in progress per stage and at most one waiting in each queue
+    assert len(fetched) <= 5
+    pipeline.close()
+
+
+def test_pipeline_raises_errors_of_stages():
+    def fail(item):
+        if item == 3:
+            raise ValueError("Unit 3 is broken")
+        return item
+
+    received = []
+    with pytest.raises(ValueError, match="Unit 3"):
+        for item in Pipeline(range(10), [fail, lambda item: item]):
+            received.append(item)
+    assert received == [0, 1, 2]
@@ -0,0 +1,103 @@
+import asyncio
+import datetime
+import json
+import threading
+
+import pytest
+
+from open_mastr.soap_api.rate_limit import ContingentExhausted, ContingentRateLimiter
+
+
+def contingent(used, limit):
+    return lambda: {
+        "AktuellerStandTageskontingent": used,
+        "AktuellesLimitTageskontingent": limit,
+    }
+
+
+def test_try_acquire_paces_requests():
+    rate_limiter = ContingentRateLimiter(reserve=0, burst=5)
+    rate_limiter.attach(contingent(0, 1000))
+
+    assert [rate_limiter.try_acquire() for _ in range(5)] == [0] * 5
+    assert rate_limiter.try_acquire() > 0
+    assert rate_limiter.remaining == 995
+
+
+def test_contingent_exhausted(tmp_path):
+    state_file = tmp_path / "contingent.json"
+    rate_limiter = ContingentRateLimiter(state_file=state_file, reserve=1, burst=5)
+    rate_limiter.attach(contingent(7, 10))
+
+    rate_limiter.acquire()
+    rate_limiter.acquire()
+    with pytest.raises(ContingentExhausted) as e:
+        rate_limiter.acquire()
+
+    tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+    assert e.value.resume_at == datetime.datetime.combine(tomorrow, datetime.time.min)
+    with open(state_file) as f:
+        assert json.load(f) == {
+            "day": datetime.date.today().isoformat(),
+            "used": 9,
+            "limit": 10,
+        }
+
+    # A resumed process knows that the contingent is used up
+    resumed_rate_limiter = ContingentRateLimiter(state_file=state_file, reserve=1)
+    assert resumed_rate_limiter.remaining == 0
+    with pytest.raises(ContingentExhausted):
+        resumed_rate_limiter.try_acquire()
+
+
+def test_try_acquire_without_pacing():
+    rate_limiter = ContingentRateLimiter(reserve=0, burst=5, pace=False)
+    rate_limiter.attach(contingent(0, 10))
+
+    assert [rate_limiter.try_acquire() for _ in range(10)] == [0] * 10
+    with pytest.raises(ContingentExhausted):
+        rate_limiter.try_acquire()
+
+
+def test_refresh_does_not_block_other_requests():
+    rate_limiter = ContingentRateLimiter(reserve=0, burst=5, refresh_interval=0)
+    refreshes = []
+    refreshing = threading.Event()
+    responded = threading.Event()
+
+    def slow_contingent():
+        refreshes.append(None)
+        if len(refreshes) == 1:
+            return contingent(0, 1000)()
+        refreshing.set()
+        responded.wait(5)
+        return contingent(10, 1000)()
+
+    rate_limiter.attach(slow_contingent)
+    rate_limiter.try_acquire()
+    refresh = threading.Thread(target=rate_limiter.try_acquire)
+    refresh.start()
+    refreshing.wait(5)
+
+    # Other threads continue with the known contingent while it is refreshed
+    assert rate_limiter.try_acquire() == 0
+    assert rate_limiter.remaining == 998
+    responded.set()
+    refresh.join()
+    assert rate_limiter.remaining == 989
+    assert len(refreshes) == 2
+
+
+def test_acquire_async_refreshes_in_thread():
+    rate_limiter = ContingentRateLimiter(reserve=0, burst=5)
+    threads = []
+
+    def contingent_source():
+        threads.append(threading.get_ident())
+        return contingent(0, 1000)()
+
+    rate_limiter.attach(contingent_source)
+    asyncio.run(rate_limiter.acquire_async())
+
+    assert threads and threads[0] != threading.get_ident()
+    assert rate_limiter.remaining == 999
@@ -0,0 +1,155 @@
+import io
+import json
+import os
+
+import pytest
+from lxml import etree
+
+from open_mastr.soap_api.replay import SOAPStandIn
+
+SOAP_NS = "http://schemas.xmlsoap.org/soap/envelope/"
+MASTR_NS = "https://www.marktstammdatenregister.de/Services/Public/1_2/Modelle/Anlagen"
+
+
+def _envelope(body):
+    return (
+        f'<soap:Envelope xmlns:soap="{SOAP_NS}" xmlns:m="{MASTR_NS}">'
+        f"<soap:Body>{body}</soap:Body></soap:Envelope>"
+    )
+
+
+def _unit_request(mastr_nummer):
+    return _envelope(
+        "<m:GetEinheitSolar><m:apiKey>secret</m:apiKey>"
+        "<m:marktakteurMastrNummer>SOM123456789012</m:marktakteurMastrNummer>"
+        f"<m:einheitMastrNummer>{mastr_nummer}</m:einheitMastrNummer>"
+        "</m:GetEinheitSolar>"
+    )
+
+
+def _list_request(start_ab):
+    return _envelope(
+        "<m:GetListeAlleEinheiten><m:apiKey>secret</m:apiKey>"
+        f"<m:startAb>{start_ab}</m:startAb><m:limit>2</m:limit>"
+        "</m:GetListeAlleEinheiten>"
+    )
+
+
+@pytest.fixture
+def recording(tmp_path):
+    os.makedirs(tmp_path / "documents" / "wsdl")
+    os.makedirs(tmp_path / "responses")
+    with open(tmp_path / "recording.json", "w") as f:
+        json.dump(
+            {"origin": "https://www.example.org", "wsdl_path": "/wsdl/mastr.wsdl"}, f
+        )
+    with open(tmp_path / "documents" / "wsdl" / "mastr.wsdl", "w") as f:
+        f.write('<definitions location="https://www.example.org/service"/>')
+
+    records = {
+        "GetEinheitSolar": [
+            {
+                "operation": "GetEinheitSolar",
+                "request": {"einheitMastrNummer": "SEE000000000001"},
+                "response": _envelope(
+                    "<m:Einheit><m:EinheitMastrNummer>SEE000000000001"
+                    "</m:EinheitMastrNummer></m:Einheit>"
+                ),
+            }
+        ],
+        "GetListeAlleEinheiten": [
+            {
+                "operation": "GetListeAlleEinheiten",
+                "request": {"startAb": "1", "limit": "2"},
+                "response": _envelope(
+                    "<m:Liste><m:EinheitMastrNummer>SEE000000000001"
+                    "</m:EinheitMastrNummer><m:EinheitMastrNummer>SEE000000000002"
+                    "</m:EinheitMastrNummer></m:Liste>"
+                ),
+            }
+        ],
+    }
+    for request_name, request_records in records.items():
+        with open(tmp_path / "responses" / f"{request_name}.jsonl", "w") as f:
+            for record in request_records:
+                f.write(json.dumps(record) + "\n")
+    return tmp_path
+
+
+def _call(app, method, path="/", body=""):
+    content = body.encode("utf-8")
+    environ = {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "CONTENT_LENGTH": str(len(content)),
+        "wsgi.input": io.BytesIO(content),
+        "wsgi.url_scheme": "http",
+        "HTTP_HOST": "127.0.0.1:8000",
+    }
+    status = []
+    response = app(environ, lambda s, headers: status.append(s))
+    return status[0], b"".join(response).decode("utf-8")
+
+
+def _mastr_numbers(response):
+    tree = etree.fromstring(response.encode("utf-8"))
+    return [e.text for e in tree.iter(f"{{{MASTR_NS}}}EinheitMastrNummer")]
+
+
+def test_serve_document(recording):
+    status, response = _call(SOAPStandIn(recording), "GET", "/wsdl/mastr.wsdl")
+    assert status == "200 OK"
+    assert "http://127.0.0.1:8000/service" in response
+
+    status, _ = _call(SOAPStandIn(recording), "GET", "/../recording.json")
+    assert status == "404 Not Found"
+
+
+def test_replay_exact_match(recording):
+    status, response = _call(
+        SOAPStandIn(recording), "POST", body=_unit_request("SEE000000000001")
+    )
+    assert status == "200 OK"
+    assert _mastr_numbers(response) == ["SEE000000000001"]
+
+
+def test_replay_substitutes_mastr_numbers(recording):
+    _, response = _call(
+        SOAPStandIn(recording), "POST", body=_unit_request("SEE987654321098")
+    )
+    assert _mastr_numbers(response) == ["SEE987654321098"]
+
+
+def test_replay_varies_pages(recording):
+    app = SOAPStandIn(recording)
+    _, first_page = _call(app, "POST", body=_list_request(1))
+    _, second_page = _call(app, "POST", body=_list_request(3))
+    _, second_page_again = _call(app, "POST", body=_list_request(3))
+
+    assert _mastr_numbers(first_page) == ["SEE000000000001", "SEE000000000002"]
+    assert len(set(_mastr_numbers(second_page))) == 2
+    assert not set(_mastr_numbers(first_page)) & set(_mastr_numbers(second_page))
+    assert second_page == second_page_again
+
+
+def test_fault_injection(recording):
+    status, response = _call(
+        SOAPStandIn(recording, fault_rate=1.0, fault_message="Busy"),
+        "POST",
+        body=_unit_request("SEE000000000001"),
+    )
+    assert status == "500 Internal Server Error"
+    assert "<faultstring>Busy</faultstring>" in response
+
+    status, _ = _call(SOAPStandIn(recording), "POST", body=_envelope("<m:GetUnknown/>"))
+    assert status == "500 Internal Server Error"
+
+
+def test_empty_recording(recording):
+    open(recording / "responses" / "GetEinheitSolar.jsonl", "w").close()
+
+    status, response = _call(
+        SOAPStandIn(recording), "POST", body=_unit_request("SEE000000000001")
+    )
+    assert status == "500 Internal Server Error"
+    assert "No recording for GetEinheitSolar" in response
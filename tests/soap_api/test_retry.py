@@ -0,0 +1,157 @@
+import pytest
+import requests
+from zeep.exceptions import Fault
+
+from open_mastr.soap_api.download import MaStRAPI
+from open_mastr.soap_api.rate_limit import ContingentExhausted
+from open_mastr.soap_api.replay import SOAPStandIn, StandInServer
+from open_mastr.soap_api.retry import (
+    CircuitBreaker,
+    CredentialsRejected,
+    RetryPolicy,
+    is_retryable,
+    is_timeout,
+)
+
+
+class Clock:
+    """Fake clock that advances when sleeping"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def failing(errors):
+    """Function raising `errors` one after another, then returning "ok"."""
+    errors = list(errors)
+
+    def function():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    return function
+
+
+def test_retry_with_exponential_backoff():
+    clock = Clock()
+    policy = RetryPolicy(max_retries=3, base_delay=1, sleep=clock.sleep, seed=1)
+    errors = [Fault("Busy"), requests.exceptions.ConnectionError(), Fault("Busy")]
+
+    assert policy.call(failing(errors)) == "ok"
+    assert len(clock.sleeps) == 3
+    assert all(0 <= delay <= 2**retry for retry, delay in enumerate(clock.sleeps))
+    assert policy.metrics == {"requests": 4, "retries": 3}
+
+    with pytest.raises(Fault):
+        policy.call(failing([Fault("Busy")] * 4))
+    assert policy.metrics["failed"] == 1
+
+
+def test_classify_errors():
+    policy = RetryPolicy(sleep=lambda seconds: None)
+
+    with pytest.raises(CredentialsRejected):
+        policy.call(failing([Fault("Zugriff verweigert")]))
+    with pytest.raises(ContingentExhausted):
+        policy.call(failing([ContingentExhausted("Used up", None)]))
+    with pytest.raises(KeyError):
+        policy.call(failing([KeyError("Ergebniscode")]))
+
+    assert policy.metrics == {"requests": 3, "credentials_rejected": 1}
+    assert is_retryable(requests.exceptions.ReadTimeout())
+    assert not is_retryable(ValueError())
+
+
+def test_retry_timeouts():
+    policy = RetryPolicy(
+        max_retries=3, sleep=lambda seconds: None, retry_timeouts=False
+    )
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        policy.call(failing([requests.exceptions.ReadTimeout()] * 4))
+    assert policy.call(failing([Fault("Busy")])) == "ok"
+    assert policy.metrics == {"requests": 3, "retries": 1}
+
+    assert is_timeout(requests.exceptions.ReadTimeout("Read timed out"))
+    assert not is_timeout(Fault("Busy"))
+
+
+def test_circuit_breaker():
+    clock = Clock()
+    breaker = CircuitBreaker(
+        failure_rate=0.5, window=4, min_requests=4, cooldown=30, clock=clock
+    )
+    for success in [True, False, True, False]:
+        assert breaker.wait_time() == 0
+        breaker.record(success)
+
+    assert breaker.state == "open"
+    assert breaker.wait_time() == 30
+
+    clock.now = 30
+    # Only one trial request is sent while half open
+    assert breaker.wait_time() == 0
+    assert breaker.state == "half_open"
+    assert breaker.wait_time() > 0
+    breaker.record(False)
+    assert breaker.state == "open"
+
+    clock.now = 60
+    assert breaker.wait_time() == 0
+    breaker.record(True)
+    assert breaker.state == "closed"
+    assert breaker.times_opened == 2
+
+
+def test_retry_policy_pauses_while_circuit_is_open():
+    clock = Clock()
+    breaker = CircuitBreaker(window=2, min_requests=2, cooldown=30, clock=clock)
+    policy = RetryPolicy(
+        max_retries=5,
+        base_delay=0,
+        circuit_breaker=breaker,
+        sleep=clock.sleep,
+    )
+
+    assert policy.call(failing([Fault("Busy")] * 2)) == "ok"
+    # Third attempt is the trial request after the cooldown
+    assert clock.now == 30
+    assert policy.metrics["circuit_opened"] == 1
+    assert policy.metrics["paused_seconds"] == 30
+    assert breaker.state == "closed"
+
+
+def test_mastr_api_retries_stand_in_faults(recording):
+    app = SOAPStandIn(recording, fault_rate=0.5, seed=3)
+    with StandInServer(app) as server:
+        policy = RetryPolicy(max_retries=10, sleep=lambda seconds: None)
+        mastr_api = MaStRAPI(
+            user="SOM000000000000", key="test", wsdl=server.wsdl, retry_policy=policy
+        )
+        assert mastr_api.copy().retry_policy is policy
+
+        for _ in range(5):
+            response = mastr_api.GetEinheit(einheitMastrNummer="SEE000000000001")
+            assert response == "SEE000000000001"
+        metrics = policy.metrics
+        assert metrics["retries"] > 0
+        assert metrics["requests"] == 5 + metrics["retries"]
+
+        app.fault_rate = 1.0
+        with pytest.raises(Fault, match="Retry failed"):
+            mastr_api.GetEinheit(einheitMastrNummer="SEE000000000001")
+        assert policy.metrics["failed"] == 1
+
+        app.fault_message = "Zugriff verweigert"
+        with pytest.raises(CredentialsRejected):
+            mastr_api.GetEinheit(einheitMastrNummer="SEE000000000001")
+        assert policy.metrics["requests"] == metrics["requests"] + 11 + 1
@@ -1,3 +1,6 @@
+import os
+
+from open_mastr.utils import credentials
 from open_mastr.utils.credentials import get_mastr_user, get_mastr_token
 
 
@@ -8,3 +11,19 @@ def test_get_mastr_user_and_token():
 
     token = get_mastr_token(user)
     assert len(token) == 540
+
+
+def test_get_mastr_credentials(tmp_path, monkeypatch):
+    monkeypatch.setattr(credentials, "get_project_home_dir", lambda: tmp_path)
+    os.makedirs(tmp_path / "config")
+    with open(tmp_path / "config" / "credentials.cfg", "w") as f:
+        f.write(
+            "[MaStR]\nuser = SOM000000000000\ntoken = token0\n\n"
+            "[MaStR:institute]\nuser = SOM000000000001\ntoken = token1\n\n"
+            "[MaStR:project]\nuser = SOM000000000002\ntoken = token2\n"
+        )
+
+    assert credentials.get_mastr_credentials() == [
+        ("institute", "SOM000000000001", "token1"),
+        ("project", "SOM000000000002", "token2"),
+    ]
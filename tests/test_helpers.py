@@ -1,11 +1,12 @@
 import pytest
 import os
 from os.path import expanduser
-import sys
 import random
 from os.path import join
 from datetime import datetime
 import pandas as pd
+import sqlite3
+from sqlalchemy import create_engine
 from open_mastr import Mastr
 
 from open_mastr.utils import orm
@@ -25,6 +26,8 @@ from open_mastr.utils.helpers import (
     create_db_query,
     db_query_to_csv,
     reverse_unit_type_map,
+    bulk_upsert,
+    unique_by_key,
 )
 
 
@@ -98,9 +101,7 @@ def parameter_dict_working_list():
         ],
         "date": [None, datetime(2022, 2, 2), "latest"],
         "bulk_cleansing": [True],
-        "api_processes": [None]
-        if sys.platform not in ["linux2", "linux"]
-        else [2, 20, None, "max"],
+        "api_processes": [2, 20, None, "max"],
         "api_limit": [15, None],
         "api_chunksize": [20],
         "api_data_types": [
@@ -119,7 +120,19 @@ def parameter_dict_working_list():
             None,
         ],
     }
-    return [parameter_dict_bulk, parameter_dict_API]
+
+    parameter_dict_hybrid = {
+        "method": ["hybrid"],
+        "data": ["wind", "solar", "storage", None, ["wind", "solar"]],
+        "date": ["today", "20200108", "existing"],
+        "bulk_cleansing": [True, False],
+        "api_processes": [2, None],
+        "api_limit": [15, None],
+        "api_chunksize": [1000],
+        "api_data_types": [None],
+        "api_location_types": [None],
+    }
+    return [parameter_dict_bulk, parameter_dict_API, parameter_dict_hybrid]
 
 
 @pytest.fixture
@@ -401,3 +414,100 @@ def test_db_query_to_csv(tmpdir, engine):
 def test_save_metadata():
     # FIXME: implement in #386
     pass
+
+
+@pytest.mark.parametrize("sqlite_version", [sqlite3.sqlite_version_info, (3, 34, 0)])
+def test_bulk_upsert(monkeypatch, sqlite_version):
+    # SQLite < 3.35 does not support RETURNING, rows are upserted one by one
+    monkeypatch.setattr(sqlite3, "sqlite_version_info", sqlite_version)
+    engine = create_engine("sqlite://")
+    orm.BasicUnit.__table__.create(engine)
+
+    def unit(number, day, name):
+        return {
+            "EinheitMastrNummer": f"SEE00000000000{number}",
+            "DatumLetzteAktualisierung": datetime(2022, 1, day),
+            "Name": name,
+        }
+
+    with session_scope(engine=engine) as session:
+        upserted = bulk_upsert(
+            session, orm.BasicUnit, [unit(1, 10, "old"), unit(2, 10, "old")]
+        )
+        assert upserted == {"SEE000000000001", "SEE000000000002"}
+
+        upserted = bulk_upsert(
+            session,
+            orm.BasicUnit,
+            [unit(1, 11, "new"), unit(2, 9, "new"), unit(3, 9, "new")],
+            newer_column="DatumLetzteAktualisierung",
+        )
+        # Unit 2 is not updated because the stored data is newer
+        assert upserted == {"SEE000000000001", "SEE000000000003"}
+        session.commit()
+        names = dict(
+            session.query(orm.BasicUnit.EinheitMastrNummer, orm.BasicUnit.Name)
+        )
+        assert names == {
+            "SEE000000000001": "new",
+            "SEE000000000002": "old",
+            "SEE000000000003": "new",
+        }
+
+
+@pytest.mark.parametrize("sqlite_version", [sqlite3.sqlite_version_info, (3, 34, 0)])
+def test_bulk_upsert_composite_primary_key(monkeypatch, sqlite_version):
+    monkeypatch.setattr(sqlite3, "sqlite_version_info", sqlite_version)
+    engine = create_engine("sqlite://")
+    orm.AdditionalDataCache.__table__.create(engine)
+
+    def cache_entry(data_type, fingerprint):
+        return {
+            "additional_data_id": "SEE000000000001",
+            "data_type": data_type,
+            "fingerprint": fingerprint,
+        }
+
+    with session_scope(engine=engine) as session:
+        upserted = bulk_upsert(
+            session,
+            orm.AdditionalDataCache,
+            [cache_entry("unit_data", "old"), cache_entry("eeg_data", "old")],
+        )
+        assert upserted == {
+            ("SEE000000000001", "unit_data"),
+            ("SEE000000000001", "eeg_data"),
+        }
+
+        upserted = bulk_upsert(
+            session, orm.AdditionalDataCache, [cache_entry("eeg_data", "new")]
+        )
+        assert upserted == {("SEE000000000001", "eeg_data")}
+        session.commit()
+        fingerprints = dict(
+            session.query(
+                orm.AdditionalDataCache.data_type,
+                orm.AdditionalDataCache.fingerprint,
+            )
+        )
+        assert fingerprints == {"unit_data": "old", "eeg_data": "new"}
+
+
+def test_unique_by_key_keeps_last_occurrence():
+    chunk = [
+        {"EinheitMastrNummer": "SEE000000000001", "Bruttoleistung": 1},
+        {"EinheitMastrNummer": "SEE000000000002", "Bruttoleistung": 2},
+        {"EinheitMastrNummer": "SEE000000000001", "Bruttoleistung": 3},
+        {"EinheitMastrNummer": "SEE000000000003", "Bruttoleistung": 4},
+        {"EinheitMastrNummer": "SEE000000000002", "Bruttoleistung": 5},
+    ]
+
+    # Same result as removing each entry that occurs again later in the chunk
+    expected = [
+        unit
+        for n, unit in enumerate(chunk)
+        if unit["EinheitMastrNummer"]
+        not in [_["EinheitMastrNummer"] for _ in chunk[n + 1 :]]
+    ]
+    assert unique_by_key(chunk, "EinheitMastrNummer") == expected
+    assert [u["Bruttoleistung"] for u in expected] == [3, 4, 5]
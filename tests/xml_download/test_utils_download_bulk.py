@@ -1,5 +1,20 @@
+import os
 import time
-from open_mastr.xml_download.utils_download_bulk import gen_url
+from zipfile import ZIP_STORED, ZipFile
+
+import requests
+
+from open_mastr.xml_download.utils_download_bulk import (
+    CHECKSUM_MANIFEST_SUFFIX,
+    HEAD_REQUEST_TIMEOUT,
+    download_xml_Mastr,
+    find_local_copy_of_remote_file,
+    gen_url,
+    get_remote_file_metadata,
+    is_same_remote_file,
+    verify_zip_file,
+    write_metadata_sidecar,
+)
 
 
 def test_gen_url():
@@ -50,3 +65,123 @@ def test_gen_url():
         url
         == "https://download.marktstammdatenregister.de/Gesamtdatenexport_20241231_24.2.zip"
     )
+
+
+def test_find_local_copy_of_remote_file(tmp_path):
+    remote_metadata = {
+        "url": "https://download.marktstammdatenregister.de/Gesamtdatenexport_20241231_24.2.zip",
+        "etag": '"abc123"',
+        "last_modified": "Tue, 31 Dec 2024 03:12:45 GMT",
+        "content_length": 4,
+    }
+    assert find_local_copy_of_remote_file(str(tmp_path), remote_metadata) is None
+
+    zip_path = os.path.join(tmp_path, "our_own_name.zip")
+    with open(zip_path, "wb") as f:
+        f.write(b"1234")
+    write_metadata_sidecar(zip_path, remote_metadata)
+    assert find_local_copy_of_remote_file(str(tmp_path), remote_metadata) == zip_path
+
+    # Another ETag means that the remote export changed
+    changed_metadata = dict(remote_metadata, etag='"def456"')
+    assert find_local_copy_of_remote_file(str(tmp_path), changed_metadata) is None
+
+    # Incomplete local files are not reused
+    with open(zip_path, "wb") as f:
+        f.write(b"12")
+    assert find_local_copy_of_remote_file(str(tmp_path), remote_metadata) is None
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = headers or {}
+
+
+def test_get_remote_file_metadata(monkeypatch):
+    url = gen_url(time.strptime("2024-12-31", "%Y-%m-%d"))
+    timeouts = []
+
+    def head(url, timeout, **kwargs):
+        timeouts.append(timeout)
+        return Response(200, {"ETag": '"abc123"', "Content-Length": "4"})
+
+    monkeypatch.setattr(requests, "head", head)
+    assert get_remote_file_metadata(url) == {
+        "url": url,
+        "etag": '"abc123"',
+        "last_modified": None,
+        "content_length": 4,
+    }
+    assert timeouts == [HEAD_REQUEST_TIMEOUT]
+
+    def stalled_head(url, **kwargs):
+        raise requests.exceptions.ReadTimeout()
+
+    # A stalled server does not tell whether the export changed
+    monkeypatch.setattr(requests, "head", stalled_head)
+    assert get_remote_file_metadata(url)["etag"] is None
+
+
+def test_download_falls_back_to_yesterday(tmp_path, monkeypatch):
+    requested_urls = []
+
+    def get(url, **kwargs):
+        requested_urls.append(url)
+        return Response(404)
+
+    # The server does not answer HEAD requests properly
+    monkeypatch.setattr(requests, "head", lambda url, **kwargs: Response(405))
+    monkeypatch.setattr(requests, "get", get)
+    download_xml_Mastr(
+        str(tmp_path / "Gesamtdatenexport.zip"), "today", str(tmp_path / "xml")
+    )
+
+    today = time.localtime()
+    yesterday = time.localtime(time.mktime(today) - 24 * 60 * 60)
+    assert requested_urls == [gen_url(today), gen_url(yesterday)]
+
+
+def test_is_same_remote_file():
+    local_metadata = {
+        "etag": None,
+        "last_modified": "Tue, 31 Dec 2024 03:12:45 GMT",
+        "content_length": 100,
+    }
+    assert is_same_remote_file(local_metadata, dict(local_metadata))
+    assert not is_same_remote_file(
+        local_metadata, dict(local_metadata, content_length=101)
+    )
+    assert not is_same_remote_file(
+        {"etag": None, "last_modified": None, "content_length": None},
+        {"etag": None, "last_modified": None, "content_length": None},
+    )
+
+
+def test_verify_zip_file(tmp_path):
+    zip_path = os.path.join(tmp_path, "Gesamtdatenexport_20241231.zip")
+    with ZipFile(zip_path, "w", compression=ZIP_STORED) as zf:
+        zf.writestr("EinheitenWind.xml", b"<EinheitenWind></EinheitenWind>")
+        zf.writestr("EinheitenSolar_1.xml", b"<EinheitenSolar></EinheitenSolar>")
+
+    assert verify_zip_file(zip_path, max_workers=2)
+    assert os.path.isfile(zip_path + CHECKSUM_MANIFEST_SUFFIX)
+    # Verified checksums are taken from the manifest
+    assert verify_zip_file(zip_path)
+
+
+def test_verify_zip_file_corrupted(tmp_path):
+    zip_path = os.path.join(tmp_path, "Gesamtdatenexport_20241231.zip")
+    with ZipFile(zip_path, "w", compression=ZIP_STORED) as zf:
+        zf.writestr("EinheitenWind.xml", b"<EinheitenWind></EinheitenWind>")
+
+    # Corrupt the member data, the central directory stays intact
+    with open(zip_path, "rb") as f:
+        content = f.read()
+    content = content.replace(b"</EinheitenWind>", b"</EinheitenWinD>", 1)
+    with open(zip_path, "wb") as f:
+        f.write(content)
+
+    assert not verify_zip_file(zip_path)
+    assert not os.path.isfile(zip_path + CHECKSUM_MANIFEST_SUFFIX)